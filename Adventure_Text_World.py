@@ -1,19 +1,478 @@
 #!/usr/bin/env python3
-import json, os, random, time, copy
+import json, os, random, time, copy, sys, atexit, hashlib, lzma, marshal, shutil, struct, tempfile, threading, unicodedata, zlib
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from heapq import heappop, heappush
+from types import MappingProxyType
 
 SAVE_FILE = "atw.json"
 
-# === UTIL ===
-def slow(txt, delay=0.02):
-    for c in txt:
-        print(c, end='', flush=True)
-        time.sleep(delay)
-    print()
+# === OUTPUT ===
+# Semua teks game lewat satu sink: slow(), out() (pengganti print) dan
+# ask() (pengganti input). Mode:
+#   paced   - efek mengetik per karakter (default, kecepatan bisa diatur)
+#   instant - tanpa jeda sama sekali (batch run / test)
+#   skip    - seperti paced, tapi tekan tombol apa saja untuk langsung
+#             menampilkan sisa teks
+# Teks ditampung di buffer lalu ditulis sekaligus per baris ("line") atau
+# per layar ("screen", baru ditulis sebelum input/clear/jeda).
+# Bisa diatur lewat env ATW_TEXT_MODE, ATW_TEXT_SPEED (karakter/detik) dan
+# ATW_FLUSH, atau lewat set_text_mode().
+#
+# Layar (clear()) di terminal memakai renderer diff ANSI: frame baru hanya
+# menulis ulang baris yang berubah, tanpa menjalankan proses "clear".
+# Jika stdout bukan TTY (pipe, file) clear() cukup memberi baris kosong.
+# ATW_SCREEN=plain mematikan renderer diff.
+TEXT_MODES = ("paced", "instant", "skip")
+SCREEN_MODES = ("diff", "plain")
+
+class Output:
+    MIN_TICK = 0.015  # jeda terkecil yang masih masuk akal untuk sleep
+
+    def __init__(self, stream=None, mode=None, speed=None, flush_on=None, reader=None, screen=None):
+        self.stream = stream
+        self.reader = reader
+        self.mode = mode or os.environ.get("ATW_TEXT_MODE", "paced")
+        self.speed = float(speed or os.environ.get("ATW_TEXT_SPEED", 50))
+        self.flush_on = flush_on or os.environ.get("ATW_FLUSH", "line")
+        self._buf = []
+        self._diff = None
+        if self.mode not in TEXT_MODES:
+            self.mode = "paced"
+        self.use_screen(screen or os.environ.get("ATW_SCREEN", "diff"))
+
+    def use_screen(self, screen):
+        """Pakai renderer diff (hanya untuk stdout yang berupa terminal) atau teks biasa."""
+        if screen == "diff" and self.stream is None and self.reader is None and sys.stdout.isatty():
+            self._diff = _ScreenDiff(sys.stdout)
+        else:
+            self._diff = None
+
+    def _stream(self):
+        # dibaca saat dipakai supaya sys.stdout yang diganti tetap terpakai
+        return self._diff or self.stream or sys.stdout
+
+    def write(self, text):
+        self._buf.append(text)
+        if self.flush_on == "line" and "\n" in text:
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            stream = self._stream()
+            stream.write("".join(self._buf))
+            stream.flush()
+            self._buf.clear()
+
+    def slow(self, txt, delay=None):
+        if delay is None:
+            delay = 1.0 / self.speed if self.speed > 0 else 0
+        if self.mode == "instant" or delay <= 0:
+            self.write(txt + "\n")
+            return
+        self.flush()
+        stream = self._stream()
+        # tulis beberapa karakter sekaligus jika jeda per karakter terlalu kecil
+        chunk = max(1, round(self.MIN_TICK / delay))
+        with _KeyWatch(self.mode == "skip") as keys:
+            for i in range(0, len(txt), chunk):
+                stream.write(txt[i:i + chunk])
+                stream.flush()
+                if keys.wait(delay * chunk):
+                    stream.write(txt[i + chunk:])
+                    break
+        stream.write("\n")
+        stream.flush()
+
+    def pause(self, seconds):
+        if self.mode == "instant":
+            return
+        self.flush()
+        if self._diff is not None:
+            self._diff.settle()
+        time.sleep(seconds)
+
+    def clear(self):
+        """Mulai layar baru."""
+        self.flush()
+        if self._diff is not None:
+            self._diff.begin_frame()
+        elif self.stream is not None:
+            self.write("\x1b[2J\x1b[H")   # klien telnet server
+        else:
+            self.write("\n")
+
+    def ask(self, prompt=""):
+        self.flush()
+        if self._diff is not None:
+            self._diff.write(prompt)
+            self._diff.settle()
+            answer = input()
+            self._diff.echoed(answer)
+            return answer
+        if self.stream is None and self.reader is None:
+            return input(prompt)
+        stream = self._stream()
+        stream.write(prompt)
+        stream.flush()
+        if self.reader is not None:
+            return self.reader()
+        return sys.stdin.readline().rstrip("\n")
+
+class _KeyWatch:
+    """Deteksi tombol ditekan selama teks diketik (mode skip)."""
+
+    def __init__(self, enabled):
+        self.enabled = enabled and sys.stdin.isatty()
+        self._old = None
+
+    def __enter__(self):
+        if self.enabled and os.name != "nt":
+            import termios, tty
+            fd = sys.stdin.fileno()
+            self._old = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+        return self
+
+    def __exit__(self, *exc):
+        if self._old is not None:
+            import termios
+            termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, self._old)
+            self._old = None
+
+    def wait(self, seconds):
+        """Tidur `seconds`; True jika ada tombol ditekan (dan tombolnya dibuang)."""
+        if not self.enabled:
+            time.sleep(seconds)
+            return False
+        if os.name == "nt":
+            import msvcrt
+            time.sleep(seconds)
+            if msvcrt.kbhit():
+                msvcrt.getwch()
+                return True
+            return False
+        import select
+        ready, _, _ = select.select([sys.stdin], [], [], seconds)
+        if ready:
+            os.read(sys.stdin.fileno(), 64)
+            return True
+        return False
 
+def _display_width(text):
+    width = 0
+    for ch in text:
+        if unicodedata.combining(ch) or ch in "\u200d\ufe0f":
+            continue
+        width += 2 if unicodedata.east_asian_width(ch) in "WF" else 1
+    return width
+
+class _ScreenDiff:
+    """Stream terminal dengan frame buffer: setelah clear(), baris yang sama
+    dengan frame sebelumnya dilewati (kursor turun saja) dan hanya baris yang
+    berubah ditulis ulang. Frame yang lebih tinggi dari layar atau punya baris
+    yang terbungkus digambar ulang penuh pada clear() berikutnya."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.prev = []      # frame sebelumnya yang masih tampil, per baris
+        self.lines = []     # baris frame sekarang yang sudah selesai
+        self.cur = ""       # teks baris sekarang
+        self.live = False   # baris sekarang sudah mulai ditulis ke terminal
+        self.overflow = True  # frame pertama selalu digambar penuh
+
+    def _old(self):
+        row = len(self.lines)
+        return self.prev[row] if row < len(self.prev) else None
+
+    def write(self, text):
+        parts = []
+        segs = text.split("\n")
+        for i, seg in enumerate(segs):
+            if seg:
+                self._text(seg, parts)
+            if i < len(segs) - 1:
+                self._newline(parts)
+        if parts:
+            self.stream.write("".join(parts))
+
+    def _text(self, seg, parts):
+        self.cur += seg
+        if self.live:
+            parts.append(seg)
+            return
+        old = self._old()
+        if old is None or not old.startswith(self.cur):
+            parts.append("\r" + self.cur + "\x1b[K")
+            self.live = True
+
+    def _newline(self, parts):
+        if not self.live and self._old() != self.cur:
+            parts.append("\r" + self.cur + "\x1b[K")
+        parts.append("\n")
+        if _display_width(self.cur) >= shutil.get_terminal_size().columns:
+            self.overflow = True
+        self.lines.append(self.cur)
+        self.cur, self.live = "", False
+
+    def flush(self):
+        self.stream.flush()
+
+    def settle(self):
+        """Taruh kursor di akhir teks dan hapus sisa frame lama (sebelum input / jeda)."""
+        if self.cur and not self.live:
+            self.stream.write("\r" + self.cur + "\x1b[K")
+            self.live = True
+        if len(self.prev) > len(self.lines):
+            self.stream.write("\x1b[J")
+            self.prev = self.prev[:len(self.lines)]
+        self.stream.flush()
+
+    def echoed(self, answer):
+        # terminal sudah menampilkan jawaban + Enter di baris sekarang
+        self.lines.append(self.cur + answer)
+        self.cur, self.live = "", False
+
+    def begin_frame(self):
+        frame = self.lines + ([self.cur] if self.cur else [])
+        if self.overflow or len(frame) >= shutil.get_terminal_size().lines:
+            self.stream.write("\x1b[2J\x1b[H")
+            self.prev = []
+        else:
+            self.stream.write("\x1b[H")
+            self.prev = frame
+        self.lines, self.cur, self.live, self.overflow = [], "", False, False
+
+OUT = Output()
+
+# === SESSION ===
+# Semua state milik satu pemain (player, slot save, output, transaksi dan
+# journal save) disimpan di Session. Mode biasa memakai DEFAULT_SESSION;
+# server (atw_server.py) membuat satu Session per koneksi dan
+# mengaktifkannya di thread yang menjalankan game untuk koneksi itu.
+# Setiap Session punya RNG sendiri dengan seed eksplisit supaya satu sesi
+# bisa diulang persis (lihat REKAM & REPLAY).
+_SESSION = ContextVar("atw_session")
+
+class Session:
+    def __init__(self, player=None, save_file=None, out=None, seed=None):
+        self.player = player if player is not None else Player.from_dict(default_player())
+        self.save_file = save_file or SAVE_FILE
+        self.out = out or Output()
+        self.tx = {"depth": 0, "dirty": False}
+        self.journal = {"owner": None, "inv": None, "seq": 0, "records": 0, "shadow": {}}
+        self.save_stats = {"requests": 0, "writes": 0}
+        self.recording = None
+        self.auto_policy = None
+        self.save_codec = None   # None = SAVE_CODEC; load_game() memakai format file yang dimuat
+        self.reseed(seed)
+
+    def reseed(self, seed=None):
+        """Ganti seed RNG session; tanpa seed diambil dari os.urandom."""
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), "big")
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    @contextmanager
+    def active(self):
+        """Jadikan session ini target semua fungsi game di blok ini."""
+        token = _SESSION.set(self)
+        try:
+            yield self
+        finally:
+            _SESSION.reset(token)
+
+def current_session():
+    return _SESSION.get(DEFAULT_SESSION)
+
+def current_player():
+    """Objek Player milik session aktif (akses atribut, tanpa proxy)."""
+    return _SESSION.get(DEFAULT_SESSION).player
+
+def set_text_mode(mode=None, speed=None, flush_on=None, screen=None):
+    """Ubah mode teks secara global (mis. "instant" untuk batch run)."""
+    if mode is not None:
+        if mode not in TEXT_MODES:
+            raise ValueError(f"mode teks tidak dikenal: {mode}")
+        OUT.mode = mode
+    if speed is not None:
+        OUT.speed = float(speed)
+    if flush_on is not None:
+        OUT.flush_on = flush_on
+    if screen is not None:
+        if screen not in SCREEN_MODES:
+            raise ValueError(f"mode layar tidak dikenal: {screen}")
+        OUT.use_screen(screen)
+
+# === PROFILER ===
+# Opt-in lewat ATW_PROFILE=1 (atau ATW_PROFILE=file.json) / --profile.
+# @profiled hanya mendaftarkan fungsi; enable_profiling() mengganti nama
+# globalnya dengan versi bertimer, jadi saat profiler mati fungsi asli
+# yang dipanggil langsung. Waktu bersifat inklusif (battle sudah termasuk
+# save_game di dalamnya) dan dicatat di histogram kelipatan dua per label.
+PROFILE_ENV = "ATW_PROFILE"
+PROFILE_FILE = "atw_profile.json"
+PROFILE_STATS = {}     # label -> [jumlah, total_ns, min_ns, max_ns, {bucket: jumlah}]
+_PROFILED = []
+_PROFILING = False
+_PROFILE_LOCK = threading.Lock()
+_NULL_BLOCK = nullcontext()
+
+def profiled(label=None):
+    """Tandai fungsi level modul untuk diukur saat profiler aktif."""
+    def mark(fn):
+        _PROFILED.append((fn, label or fn.__name__))
+        return fn
+    return mark
+
+def profile_record(label, ns):
+    b = ns.bit_length()   # bucket: durasi <= 2**b ns
+    with _PROFILE_LOCK:
+        st = PROFILE_STATS.get(label)
+        if st is None:
+            st = PROFILE_STATS[label] = [0, 0, ns, ns, {}]
+        st[0] += 1
+        st[1] += ns
+        st[2] = min(st[2], ns)
+        st[3] = max(st[3], ns)
+        st[4][b] = st[4].get(b, 0) + 1
+
+def _timed(label, fn):
+    clock = time.perf_counter_ns
+
+    def timed(*args, **kwargs):
+        t0 = clock()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile_record(label, clock() - t0)
+    timed.__name__, timed.__doc__, timed.__wrapped__ = fn.__name__, fn.__doc__, fn
+    return timed
+
+@contextmanager
+def _timed_block(label):
+    t0 = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        profile_record(label, time.perf_counter_ns() - t0)
+
+def profile_block(label):
+    """Blok yang diukur saat profiler aktif (mati: nullcontext bersama)."""
+    return _NULL_BLOCK
+
+def profile_lap(label, t0):
+    """Catat durasi sejak `t0` ke `label` dan mulai putaran baru (mati: None)."""
+    return None
+
+def _profile_lap(label, t0):
+    now = time.perf_counter_ns()
+    if t0 is not None:
+        profile_record(label, now - t0)
+    return now
+
+def profiling_enabled():
+    return _PROFILING
+
+def enable_profiling(path=None, report=True):
+    """Aktifkan profiler; saat proses selesai cetak tabel dan tulis JSON ke `path`."""
+    global _PROFILING, profile_block, profile_lap
+    if _PROFILING:
+        return
+    _PROFILING = True
+    for fn, label in _PROFILED:
+        fn.__globals__[fn.__name__] = _timed(label, fn)
+    profile_block = _timed_block
+    profile_lap = _profile_lap
+    if report:
+        atexit.register(dump_profile, path or PROFILE_FILE)
+
+def _bucket_us(b):
+    return (1 << b) / 1000
+
+def profile_report():
+    """Statistik per label: jumlah, total, rata-rata, p50/p95/p99 (batas bucket), histogram."""
+    with _PROFILE_LOCK:
+        stats = {k: (v[0], v[1], v[2], v[3], dict(v[4])) for k, v in PROFILE_STATS.items()}
+    report = {}
+    for label, (n, total, lo, hi, buckets) in sorted(stats.items(), key=lambda kv: -kv[1][1]):
+        order = sorted(buckets)
+
+        def pct(q):
+            need, seen = q * n, 0
+            for b in order:
+                seen += buckets[b]
+                if seen >= need:
+                    return min(_bucket_us(b), hi / 1000)
+            return hi / 1000
+        report[label] = {
+            "count": n,
+            "total_ms": round(total / 1e6, 3),
+            "mean_us": round(total / n / 1000, 2),
+            "min_us": round(lo / 1000, 2),
+            "p50_us": round(pct(0.50), 2),
+            "p95_us": round(pct(0.95), 2),
+            "p99_us": round(pct(0.99), 2),
+            "max_us": round(hi / 1000, 2),
+            "histogram_us": {f"<={_bucket_us(b):g}": buckets[b] for b in order},
+        }
+    return report
+
+def profile_table(report):
+    rows = [f"{'label':<24} {'count':>8} {'total ms':>11} {'mean µs':>10} {'p50 µs':>10} "
+            f"{'p95 µs':>10} {'p99 µs':>10} {'max µs':>11}"]
+    for label, r in report.items():
+        rows.append(f"{label:<24} {r['count']:>8} {r['total_ms']:>11.2f} {r['mean_us']:>10.1f} "
+                    f"{r['p50_us']:>10.1f} {r['p95_us']:>10.1f} {r['p99_us']:>10.1f} {r['max_us']:>11.1f}")
+    return "\n".join(rows)
+
+def dump_profile(path=PROFILE_FILE, stream=None):
+    """Cetak tabel profil ke stderr dan tulis JSON-nya ke `path`."""
+    report = profile_report()
+    if not report:
+        return report
+    (stream or sys.stderr).write("\n=== PROFIL ===\n" + profile_table(report) + "\n")
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "labels": report}, f, indent=2, ensure_ascii=False)
+        (stream or sys.stderr).write(f"Profil ditulis ke {path}\n")
+    except OSError as e:
+        (stream or sys.stderr).write(f"Gagal menulis profil: {e}\n")
+    return report
+
+# === UTIL ===
+@profiled("slow (teks+jeda)")
+def slow(txt, delay=None):
+    current_session().out.slow(txt, delay)
+
+def out(*args, sep=" ", end="\n"):
+    current_session().out.write(sep.join(str(a) for a in args) + end)
+
+@profiled("ask (tunggu input)")
+def ask(prompt=""):
+    sess = current_session()
+    answer = sess.out.ask(prompt)
+    if sess.recording is not None:
+        sess.recording["inputs"].append(answer)
+    return answer
+
+@profiled("pause")
+def pause(seconds):
+    current_session().out.pause(seconds)
+
+@profiled()
 def clear():
-    os.system("clear" if os.name != "nt" else "cls")
+    current_session().out.clear()
 
 # === DEFAULT PLAYER ===
+SCHEMA_VERSION = 4   # naikkan bersama MIGRATIONS (SAVE / LOAD)
+
 def default_player():
     return {
         "name": "Hero",
@@ -29,74 +488,1369 @@ def default_player():
         "weapon": {"name": "Wooden Sword", "atk": 2, "value": 20},
         "armor": {"name": "Cloth Armor", "def": 1, "value": 15},
         "magic": {"name": "Tidak ada skill", "mp_cost": 0, "power": 0},
-        "inventory": ["Potion"],
-        # single quest active (None or dict)
-        "quest": None
+        "inventory": Inventory.from_data(["Potion"]),
+        "skills": [],
+        # quest aktif (bisa beberapa sekaligus)
+        "quests": QuestLog(),
+        "kills": 0,
+        # stok toko tersimpan (dibuat saat toko pertama kali dibuka)
+        "shop": None,
+        # run dungeon yang bisa dilanjutkan: {"seed", "floor"} (lantai dibuat ulang dari seed)
+        "dungeon": None,
+        "schema_version": SCHEMA_VERSION
     }
+# === CONTENT PACK ===
+# Data game (item, musuh, dungeon, resep, toko, quest, wilayah) ada di folder data/
+# sebagai JSON. load_content() memvalidasi isinya lalu menyimpan hasil
+# kompilasi (marshal) di data/__pycache__/. Start berikutnya langsung
+# membaca cache selama mtime+ukuran semua file sama; jika mtime berubah
+# tapi hash isinya sama, cache tetap dipakai. ATW_DATA_DIR mengganti
+# folder data, ATW_CONTENT_CACHE=0 mematikan cache.
+CONTENT_DIR = os.environ.get("ATW_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CONTENT_FILES = ("items", "enemies", "dungeon", "recipes", "shop", "quests", "regions")
+CONTENT_CACHE_VERSION = 1
+CONTENT_STATS = {"source": None, "seconds": 0.0}
+ITEM_TYPES = ("consumable", "weapon", "armor", "magic", "material")
+ENEMY_FIELDS = ("name", "hp", "atk", "def", "exp", "gold")
+
+class ContentError(ValueError):
+    """Content pack tidak bisa dibaca atau isinya tidak valid."""
+
+def _is_stat(v):
+    if isinstance(v, list):
+        return len(v) == 2 and all(isinstance(x, int) for x in v) and v[0] <= v[1]
+    return isinstance(v, int)
+
+def validate_content(content):
+    """Cek struktur dan referensi antar file; ContentError berisi semua masalah."""
+    problems = []
+    items_ = content["items"]
+    for name, d in items_.items():
+        if d.get("type") not in ITEM_TYPES:
+            problems.append(f"items/{name}: tipe tidak dikenal {d.get('type')!r}")
+        for k in ("atk", "def", "heal", "value"):
+            if k in d and not _is_stat(d[k]):
+                problems.append(f"items/{name}: {k} harus angka atau [min, max]")
+        for k, v in d.get("bonus", {}).items():
+            if not _is_stat(v):
+                problems.append(f"items/{name}: bonus {k} harus angka atau [min, max]")
+
+    def item_ref(name, where):
+        for n in (name if isinstance(name, list) else [name]):
+            if n is not None and n not in items_:
+                problems.append(f"{where}: item tidak dikenal {n!r}")
+
+    enemies, dungeon = content["enemies"], content["dungeon"]
+    rosters = {"enemies/normal": enemies["normal"], "enemies/mini_bosses": enemies["mini_bosses"],
+               "dungeon/mini_bosses": dungeon["mini_bosses"], "dungeon/boss": [dungeon["boss"]]}
+    for i, tier in enumerate(dungeon["tiers"]):
+        rosters[f"dungeon/tiers[{i}]"] = tier
+        if not tier:
+            problems.append(f"dungeon/tiers[{i}]: kosong")
+    names = set()
+    for where, roster in rosters.items():
+        for e in roster:
+            missing = [k for k in ENEMY_FIELDS if k not in e]
+            if missing:
+                problems.append(f"{where}/{e.get('name', '?')}: tidak ada {', '.join(missing)}")
+            names.add(e.get("name"))
+            item_ref(e.get("drop"), f"{where}/{e.get('name', '?')} drop")
+            if "spd" in e and not (isinstance(e["spd"], int) and e["spd"] >= 1):
+                problems.append(f"{where}/{e.get('name', '?')}: spd harus bilangan bulat >= 1")
+            pack = e.get("pack")
+            size = pack and pack.get("size")
+            if pack is not None and not (isinstance(size, list) and _is_stat(size) and size[0] >= 1
+                                         and 0 <= pack.get("chance", -1) <= 1):
+                problems.append(f"{where}/{e.get('name', '?')}: pack butuh size [min, max] dan chance 0..1")
+    for where, roster in rosters.items():
+        for e in roster:
+            summon = e.get("summon")
+            if summon is None:
+                continue
+            if summon.get("name") not in names:
+                problems.append(f"{where}/{e.get('name', '?')}: summon tidak dikenal {summon.get('name')!r}")
+            if not 0 <= summon.get("chance", -1) <= 1 or not isinstance(summon.get("max"), int) or summon["max"] < 1:
+                problems.append(f"{where}/{e.get('name', '?')}: summon butuh chance 0..1 dan max >= 1")
+    icons = enemies["icons"]
+    for e in enemies["normal"] + [e for tier in dungeon["tiers"] for e in tier]:
+        if e.get("name") not in icons:
+            problems.append(f"enemies/icons: tidak ada ikon untuk {e.get('name')!r}")
+    if not isinstance(dungeon["floors"], int) or dungeon["floors"] < 1:
+        problems.append("dungeon/floors: harus bilangan bulat >= 1")
+    for k in ("mini_boss_chance", "mini_boss_chance_step", "mini_boss_chance_max"):
+        if not 0 <= dungeon[k] <= 1:
+            problems.append(f"dungeon/{k}: harus 0..1")
+    if not isinstance(dungeon["depth_level_step"], int) or dungeon["depth_level_step"] < 0:
+        problems.append("dungeon/depth_level_step: harus bilangan bulat >= 0")
+    rooms = dungeon["rooms"]
+    if not (isinstance(rooms["max"], int) and rooms["max"] >= 1 and isinstance(rooms["per_floors"], int)
+            and rooms["per_floors"] >= 1):
+        problems.append("dungeon/rooms: max dan per_floors harus bilangan bulat >= 1")
+    if not (0 <= rooms["treasure"] and 0 <= rooms["spring"] and rooms["treasure"] + rooms["spring"] <= 1
+            and 0 <= rooms["spring_heal"] <= 1):
+        problems.append("dungeon/rooms: peluang treasure + spring dan spring_heal harus 0..1")
+    loot = dungeon["loot"]
+    if not (isinstance(loot["gold"], list) and _is_stat(loot["gold"])) or not 0 <= loot["item_chance"] <= 1:
+        problems.append("dungeon/loot: gold harus [min, max] dan item_chance 0..1")
+    for it in loot["items"]:
+        item_ref(it.get("name"), "dungeon/loot")
+        if not isinstance(it.get("weight"), int) or it["weight"] < 1:
+            problems.append(f"dungeon/loot/{it.get('name', '?')}: weight harus >= 1")
+    if not any(it.get("min_floor", 1) <= 1 for it in loot["items"]):
+        problems.append("dungeon/loot: butuh minimal satu item dengan min_floor 1")
+    item_ref(dungeon["clear_reward"].get("item"), "dungeon/clear_reward")
+
+    for key, r in content["recipes"].items():
+        req = r.get("requires")
+        if not req:
+            problems.append(f"recipes/{key}: requires kosong")
+        elif isinstance(req, dict):
+            if not all(isinstance(q, int) and q >= 1 for q in req.values()):
+                problems.append(f"recipes/{key}: jumlah bahan harus >= 1")
+            req = list(req)
+        item_ref(req, f"recipes/{key}")
+        item_ref(r.get("result"), f"recipes/{key}")
+
+    shop = content["shop"]
+    for it in shop["pool"]:
+        if not {"name", "price", "type"} <= it.keys():
+            problems.append(f"shop/{it.get('name', '?')}: butuh name, price, type")
+        elif it["type"] != "magic":    # magic di toko = skill, bukan item
+            item_ref(it["name"], f"shop/{it['name']}")
+    levels = shop["tier_levels"]
+    if not levels or levels[0] != 1 or levels != sorted(set(levels)):
+        problems.append("shop/tier_levels: harus naik dan mulai dari 1")
+    if len(shop["offers"]) != len(levels):
+        problems.append("shop/offers: harus satu angka per tier")
+    for lvl, n in zip(levels, shop["offers"]):
+        if n > sum(1 for it in shop["pool"] if it.get("min_lvl", 1) <= lvl):
+            problems.append(f"shop/offers: tier Lv.{lvl} menawarkan lebih banyak dari isi pool")
+
+    problems.extend(region_problems(content["regions"], names))
+
+    for q in content["quests"]:
+        if q.get("target") not in names:
+            problems.append(f"quests/{q.get('title', '?')}: target tidak dikenal {q.get('target')!r}")
+        if not isinstance(q.get("count"), int) or q["count"] < 1:
+            problems.append(f"quests/{q.get('title', '?')}: count harus >= 1")
+    if problems:
+        raise ContentError("Content pack tidak valid:\n  " + "\n  ".join(problems))
+
+def region_problems(regions, names):
+    """Masalah data wilayah; tiap level sejak min_lvl wilayah harus punya musuh."""
+    problems = []
+    if not any(r.get("min_lvl", 1) <= 1 for r in regions.values()):
+        problems.append("regions: butuh minimal satu wilayah dengan min_lvl 1")
+    for key, r in regions.items():
+        entries = r.get("encounters") or []
+        if not {"name", "intro"} <= r.keys() or not entries:
+            problems.append(f"regions/{key}: butuh name, intro dan encounters")
+            continue
+        for e in entries:
+            if e.get("enemy") not in names:
+                problems.append(f"regions/{key}: musuh tidak dikenal {e.get('enemy')!r}")
+            if not isinstance(e.get("weight"), (int, float)) or e["weight"] <= 0:
+                problems.append(f"regions/{key}/{e.get('enemy')}: weight harus > 0")
+        start = r.get("min_lvl", 1)
+        for lvl in sorted({start} | {e.get("min_lvl", 1) for e in entries}
+                          | {e["max_lvl"] + 1 for e in entries if "max_lvl" in e}):
+            if lvl >= start and not any(e.get("min_lvl", 1) <= lvl <= e.get("max_lvl", lvl)
+                                        for e in entries):
+                problems.append(f"regions/{key}: tidak ada musuh untuk Lv.{lvl}")
+    return problems
+
+def _content_cache_path(data_dir):
+    return os.path.join(data_dir, "__pycache__", f"content.{sys.implementation.cache_tag}.marshal")
+
+def _read_content_cache(path):
+    try:
+        with open(path, "rb") as f:
+            version, meta, content = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None, None
+    if version != CONTENT_CACHE_VERSION:
+        return None, None
+    return meta, content
+
+def _write_content_cache(path, meta, content):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            marshal.dump((CONTENT_CACHE_VERSION, meta, content), f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # folder data read-only: tetap jalan tanpa cache
+
+def load_content(data_dir=None, use_cache=None):
+    """Baca semua file content pack (lewat cache jika masih cocok)."""
+    t0 = time.perf_counter()
+    data_dir = data_dir or CONTENT_DIR
+    if use_cache is None:
+        use_cache = os.environ.get("ATW_CONTENT_CACHE", "1") != "0"
+    paths = {n: os.path.join(data_dir, n + ".json") for n in CONTENT_FILES}
+    try:
+        stats = {n: os.stat(p) for n, p in paths.items()}
+    except OSError as e:
+        raise ContentError(f"File content pack tidak ada: {e.filename}") from None
+    cache_path = _content_cache_path(data_dir)
+    meta, cached = _read_content_cache(cache_path) if use_cache else (None, None)
+    if meta is not None and all(meta.get(n, ())[:2] == (st.st_mtime_ns, st.st_size)
+                                for n, st in stats.items()):
+        content, source = cached, "cache"
+    else:
+        raw = {}
+        for n, path in paths.items():
+            with open(path, "rb") as f:
+                raw[n] = f.read()
+        hashes = {n: hashlib.sha1(b).hexdigest() for n, b in raw.items()}
+        if meta is not None and all(meta.get(n, (None,) * 3)[2] == h for n, h in hashes.items()):
+            content, source = cached, "cache (hash)"
+        else:
+            content = {}
+            for n, b in raw.items():
+                try:
+                    content[n] = json.loads(b)
+                except ValueError as e:
+                    raise ContentError(f"{paths[n]}: {e}") from None
+            validate_content(content)
+            source = "json"
+        if use_cache:
+            meta = {n: (stats[n].st_mtime_ns, stats[n].st_size, hashes[n]) for n in CONTENT_FILES}
+            _write_content_cache(cache_path, meta, content)
+    CONTENT_STATS.update(source=source, seconds=time.perf_counter() - t0)
+    return content
+
+CONTENT = load_content()
+
 # === ITEM LIST ===
-items = {
-    "Potion": {"type": "heal", "heal": 50},
-    "Hi-Potion": {"type": "heal", "heal": 150},
-    "Wooden Sword": {"type": "weapon", "atk": 1},
-    "Iron Sword": {"type": "weapon", "atk": 5},
-    "Steel Sword": {"type": "weapon", "atk": 10},
-    "Silver Sword": {"type": "weapon", "atk": 15},
-    "Cloth Armor": {"type": "armor", "def": 1},
-    "Leather Armor": {"type": "armor", "def": 3},
-    "Chain Armor": {"type": "armor", "def": 5},
-    "Knight Armor": {"type": "armor", "def": 8}
-}
-player = default_player()
+# Sumber tunggal semantik item (data/items.json). Dikompilasi sekali
+# menjadi ITEM_DB (nama -> ItemInfo) di bawah, jadi fungsi lain cukup
+# lookup dict. Nilai stat boleh angka tetap atau [min, max] untuk roll acak.
+items = CONTENT["items"]
+
+# === KATALOG ITEM ===
+
+@dataclass(frozen=True)
+class ItemInfo:
+    name: str
+    type: str
+    slot: object = None        # "weapon" / "armor" / None
+    kind: str = ""
+    heal: int = 0
+    atk: tuple = (0, 0)
+    defense: tuple = (0, 0)
+    bonus: object = None       # mapping stat -> angka atau (min, max)
+    legendary: bool = False
+    value: int = 0
+    spell: object = None
+
+def _range(v):
+    if isinstance(v, (list, tuple)):
+        return (v[0], v[1])
+    return (v, v)
+
+def build_item_db(raw):
+    """Kompilasi data mentah `items` menjadi nama -> ItemInfo (read-only)."""
+    db = {}
+    for name, d in raw.items():
+        kind = d.get("type", "material")
+        if kind not in ITEM_TYPES:
+            raise ValueError(f"Tipe item tidak dikenal untuk {name}: {kind}")
+        bonus = {k: (tuple(v) if isinstance(v, list) else v) for k, v in d.get("bonus", {}).items()}
+        db[name] = ItemInfo(
+            name=name,
+            type=kind,
+            slot=kind if kind in ("weapon", "armor") else None,
+            kind=d.get("kind", ""),
+            heal=d.get("heal", 0),
+            atk=_range(d.get("atk", 0)),
+            defense=_range(d.get("def", 0)),
+            bonus=MappingProxyType(bonus),
+            legendary=d.get("legendary", False),
+            value=d.get("value", 0),
+            spell=MappingProxyType(d["spell"]) if "spell" in d else None,
+        )
+    return MappingProxyType(db)
+
+ITEM_DB = build_item_db(items)
+_UNKNOWN_ITEMS = {}
+
+def item_info(name):
+    """ItemInfo untuk `name`; item tak dikenal dianggap material tanpa efek."""
+    info = ITEM_DB.get(name)
+    if info is None:
+        info = _UNKNOWN_ITEMS.get(name)
+        if info is None:
+            info = _UNKNOWN_ITEMS[name] = ItemInfo(name=name, type="material", bonus=MappingProxyType({}))
+    return info
+
+def roll_stat(v, rng=None):
+    """Angka tetap dikembalikan apa adanya, (min, max) di-roll."""
+    if isinstance(v, tuple):
+        if rng is None:
+            rng = current_session().rng
+        return rng.randint(v[0], v[1])
+    return v
+
+# === RUMUS PERTARUNGAN ===
+# Dipakai bersama oleh battle() dan simulator batch (atw_sim.py).
+# Sengaja hanya aritmetika biasa (tanpa max/min) supaya bisa dihitung
+# untuk angka tunggal maupun array NumPy; batas minimal damage ada di
+# konstanta MIN_DMG_* dan diterapkan oleh pemanggil.
+SLASH_MP_COST = 5
+FLEE_CHANCE = 0.5
+MIN_DMG_SERANG = 1
+MIN_DMG_SLASH = 5
+MIN_DMG_MAGIC = 10
+MIN_DMG_ENEMY = 1
+MAX_LEVEL = 100
+BATTLE_HEALS = {name: info.heal for name, info in ITEM_DB.items() if info.heal}
+
+def dmg_serang(atk, weapon_atk, lvl, enemy_def):
+    return atk + weapon_atk + lvl - enemy_def
+
+def dmg_slash(atk, weapon_atk, lvl, enemy_def):
+    return (atk + weapon_atk) * 2 + lvl - enemy_def
+
+def dmg_magic(atk, lvl, power, enemy_def):
+    return (atk + lvl) + power - enemy_def
+
+def dmg_enemy(enemy_atk, player_def, armor_def):
+    return enemy_atk - (player_def + armor_def)
+
+def max_hp_for(lvl):
+    return 100 + (lvl - 1) * 25
+
+def max_mp_for(lvl):
+    return 30 + (lvl - 1) * 10
+
+# === INVENTORY ===
+def item_type(name):
+    """Tipe item dari katalog: consumable/weapon/armor/magic/material."""
+    return item_info(name).type
+
+class Inventory:
+    """Inventory bertumpuk.
+
+    Item biasa disimpan sebagai nama -> jumlah, item unik hasil crafting
+    (dict) disimpan terpisah, dan ada indeks nama per tipe item. Tambah,
+    kurangi, hitung dan "semua consumable" tidak perlu menyapu isi tas.
+    Setiap perubahan dicatat di `ops` untuk journal save, dan perubahan
+    jumlah stack diteruskan ke pelacak crafting (`craft`) jika ada.
+    """
+    __slots__ = ("stacks", "unique", "by_type", "ops", "craft")
+
+    def __init__(self):
+        self.stacks = {}
+        self.unique = []
+        self.by_type = {}
+        self.ops = []
+        self.craft = None
+
+    @classmethod
+    def from_data(cls, data):
+        """Bangun dari format save: list lama, dict nama->jumlah, atau {"stacks", "unique"}."""
+        inv = cls()
+        if isinstance(data, Inventory):
+            data = data.to_data()
+        if isinstance(data, dict) and "stacks" in data:
+            for name, n in data["stacks"].items():
+                inv.add(name, n)
+            for it in data.get("unique", []):
+                inv.add(it)
+        elif isinstance(data, dict):
+            for name, n in data.items():
+                inv.add(name, n)
+        elif data:
+            for it in data:
+                inv.add(it)
+        inv.ops = []
+        return inv
+
+    def to_data(self):
+        return {"stacks": dict(self.stacks), "unique": list(self.unique)}
+
+    def _index(self, name):
+        self.by_type.setdefault(item_type(name), {})[name] = None
+
+    def _unindex(self, name):
+        if self.count(name) == 0:
+            self.by_type.get(item_type(name), {}).pop(name, None)
+
+    def add(self, item, n=1):
+        """Tambah item (nama, dict unik, atau list berisi keduanya)."""
+        if isinstance(item, list):
+            for it in item:
+                self.add(it, n)
+            return
+        if isinstance(item, dict):
+            self.unique.append(item)
+            self._index(item["name"])
+            self.ops.append({"op": "item+", "v": item})
+            return
+        if n <= 0:
+            return
+        have = self.stacks.get(item, 0)
+        self.stacks[item] = have + n
+        self._index(item)
+        self.ops.append({"op": "item+", "v": item, "n": n})
+        if self.craft is not None:
+            self.craft.changed(item, have, have + n)
+
+    def remove(self, item, n=1):
+        """Kurangi item; item unik dihapus per instance. False jika tidak cukup."""
+        if isinstance(item, dict):
+            for i, it in enumerate(self.unique):
+                if it is item:
+                    del self.unique[i]
+                    self._unindex(item["name"])
+                    self.ops.append({"op": "uniq-", "i": i})
+                    return True
+            return False
+        have = self.stacks.get(item, 0)
+        if have < n:
+            return False
+        if have == n:
+            del self.stacks[item]
+        else:
+            self.stacks[item] = have - n
+        self._unindex(item)
+        self.ops.append({"op": "item-", "v": item, "n": n})
+        if self.craft is not None:
+            self.craft.changed(item, have, have - n)
+        return True
+
+    def count(self, name):
+        n = self.stacks.get(name, 0)
+        if self.unique and name in self.by_type.get(item_type(name), ()):
+            n += sum(1 for it in self.unique if it["name"] == name)
+        return n
+
+    def of_type(self, kind):
+        """Nama item bertipe `kind` yang sedang dimiliki."""
+        return list(self.by_type.get(kind, ()))
+
+    def consumables(self):
+        return self.of_type("consumable")
+
+    def stacked(self):
+        """Daftar untuk ditampilkan: [(nama, jumlah, item)], item unik satu per baris."""
+        rows = [(name, n, name) for name, n in self.stacks.items()]
+        rows += [(it.get("desc", it["name"]), 1, it) for it in self.unique]
+        return rows
+
+    def __contains__(self, name):
+        return self.stacks.get(name, 0) > 0 or any(it["name"] == name for it in self.unique)
+
+    def __len__(self):
+        return sum(self.stacks.values()) + len(self.unique)
+
+    def __bool__(self):
+        return bool(self.stacks) or bool(self.unique)
+
+    def __repr__(self):
+        return f"Inventory({self.to_data()!r})"
+
+# === QUEST LOG ===
+# QuestLog menyimpan indeks nama target -> quest, jadi satu musuh tewas
+# hanya menyentuh quest yang mengincarnya. Nama target dinormalkan sekali
+# saat quest masuk ke log.
+@lru_cache(maxsize=None)
+def _roster_names():
+    rosters = ENEMIES_BASE + MINI_BOSSES + DUNGEON_MINI_BOSSES + [DUNGEON_BOSS]
+    rosters += [e for tier in DUNGEON_ENEMIES for e in tier]
+    return {e["name"].strip().lower(): e["name"] for e in rosters}
+
+def quest_target(name):
+    """Nama musuh resmi untuk target quest (tidak peka huruf besar/spasi)."""
+    name = str(name).strip()
+    return _roster_names().get(name.lower(), name)
+
+def normalize_quest(q):
+    """Quest dari save mana pun -> {"title", "target", "count", "progress", "reward"}."""
+    target, count = q.get("target_name", q.get("target")), q.get("count")
+    if count is None and isinstance(q.get("target"), int):
+        count = q["target"]   # format lama: "target" berisi jumlah, nama di "target_name"
+    if not isinstance(target, str):
+        target = "???"
+    return {"title": q.get("title", f"Bunuh {count} {target}"), "target": quest_target(target),
+            "count": int(count or 0), "progress": q.get("progress", 0),
+            "reward": dict(q.get("reward", {}))}
+
+class QuestLog:
+    """Daftar quest aktif + indeks target -> [quest]."""
+    __slots__ = ("active", "by_target")
+
+    def __init__(self):
+        self.active = []
+        self.by_target = {}
+
+    @classmethod
+    def from_data(cls, data):
+        """Bangun dari list quest; satu dict (save lama) atau None juga diterima."""
+        log = cls()
+        if isinstance(data, QuestLog):
+            data = data.to_data()
+        if isinstance(data, dict):
+            data = [data]
+        for q in data or ():
+            log.add(q)
+        return log
+
+    def to_data(self):
+        return [dict(q, reward=dict(q["reward"])) for q in self.active]
+
+    def add(self, q):
+        q = normalize_quest(q)
+        self.active.append(q)
+        self.by_target.setdefault(q["target"], []).append(q)
+        return q
+
+    def remove(self, q):
+        self.active = [x for x in self.active if x is not q]
+        bucket = self.by_target.get(q["target"], [])
+        bucket[:] = [x for x in bucket if x is not q]
+        if not bucket:
+            self.by_target.pop(q["target"], None)
+
+    def on_kill(self, name):
+        """Tambah progress semua quest yang mengincar `name`; kembalikan yang berubah."""
+        hit = []
+        for q in self.by_target.get(name, ()):
+            if q["progress"] < q["count"]:
+                q["progress"] += 1
+                hit.append(q)
+        return hit
+
+    def completed(self):
+        return [q for q in self.active if q["progress"] >= q["count"]]
+
+    def titles(self):
+        return {q["title"] for q in self.active}
+
+    def __iter__(self):
+        return iter(self.active)
+
+    def __len__(self):
+        return len(self.active)
+
+    def __bool__(self):
+        return bool(self.active)
+
+    def __eq__(self, other):
+        if isinstance(other, QuestLog):
+            return self.active == other.active
+        return NotImplemented
+
+    def __deepcopy__(self, memo):
+        return QuestLog.from_data(self.to_data())
+
+    def __repr__(self):
+        return f"QuestLog({self.active!r})"
+
+# === STATE OBJECT (Player / Equipment / Enemy) ===
+# Pengganti dict yang ringkas (__slots__). Tetap bisa dipakai seperti dict
+# (player["hp"], .get, .items) supaya kode menu lama tidak berubah, tapi
+# fungsi panas (battle, level_up_check, recalc_stats, handle_enemy_defeat)
+# memakai atribut langsung. Layout JSON save tetap sama lewat
+# to_dict()/from_dict(); kunci yang tidak dikenal disimpan di `extra`.
+class _SlotRecord:
+    __slots__ = ("extra",)
+    FIELDS = ()      # [(kunci_json, nama_atribut)]
+    _ATTR = {}
+
+    def __init__(self):
+        self.extra = None
+
+    def __init_subclass__(cls, **kw):
+        super().__init_subclass__(**kw)
+        cls._ATTR = dict(cls.FIELDS)
+
+    def _coerce(self, key, value):
+        return value
+
+    def __getitem__(self, key):
+        attr = self._ATTR.get(key)
+        if attr is not None:
+            try:
+                return getattr(self, attr)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        attr = self._ATTR.get(key)
+        if attr is not None:
+            setattr(self, attr, self._coerce(key, value))
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        attr = self._ATTR.get(key)
+        try:
+            if attr is not None:
+                delattr(self, attr)
+            else:
+                del self.extra[key]
+        except (AttributeError, KeyError, TypeError):
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        attr = self._ATTR.get(key)
+        if attr is not None:
+            return hasattr(self, attr)
+        return self.extra is not None and key in self.extra
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        try:
+            v = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return v
+
+    def keys(self):
+        ks = [k for k, attr in self.FIELDS if hasattr(self, attr)]
+        if self.extra:
+            ks.extend(self.extra)
+        return ks
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def to_dict(self):
+        return {k: _plain(v) for k, v in self.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls()
+        for k, v in data.items():
+            obj[k] = v
+        return obj
+
+    def __eq__(self, other):
+        if isinstance(other, (_SlotRecord, dict)):
+            return self.to_dict() == _plain(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class Equipment(_SlotRecord):
+    """Senjata / armor yang sedang dipakai."""
+    FIELDS = (("name", "name"), ("atk", "atk"), ("def", "defense"), ("value", "value"))
+    __slots__ = tuple(attr for _, attr in FIELDS)
+
+class Enemy(_SlotRecord):
+    """Satu musuh dalam pertarungan (hasil scaled_enemy)."""
+    FIELDS = (("name", "name"), ("hp", "hp"), ("atk", "atk"), ("def", "defense"),
+              ("exp", "exp"), ("gold", "gold"), ("drop", "drop"), ("spd", "spd"),
+              ("summon", "summon"))
+    __slots__ = tuple(attr for _, attr in FIELDS)
+
+class Player(_SlotRecord):
+    """State pemain. Kunci "def" di save menjadi atribut `defense`."""
+    FIELDS = (("name", "name"), ("lvl", "lvl"), ("exp", "exp"), ("next_exp", "next_exp"),
+              ("gold", "gold"), ("hp", "hp"), ("mp", "mp"), ("atk", "atk"), ("def", "defense"),
+              ("spd", "spd"), ("weapon", "weapon"), ("armor", "armor"), ("magic", "magic"),
+              ("inventory", "inventory"), ("quests", "quests"), ("skills", "skills"),
+              ("kills", "kills"), ("shop", "shop"), ("dungeon", "dungeon"),
+              ("schema_version", "schema_version"),
+              ("total_atk", "total_atk"), ("total_def", "total_def"),
+              ("bonus_hp_weapon", "bonus_hp_weapon"), ("bonus_mp_weapon", "bonus_mp_weapon"),
+              ("bonus_atk", "bonus_atk"), ("bonus_def", "bonus_def"))
+    __slots__ = tuple(attr for _, attr in FIELDS)
+
+    def _coerce(self, key, value):
+        if key in ("weapon", "armor") and isinstance(value, dict):
+            return Equipment.from_dict(value)
+        if key == "inventory" and not isinstance(value, Inventory):
+            return Inventory.from_data(value)
+        if key == "quests" and not isinstance(value, QuestLog):
+            return QuestLog.from_data(value)
+        return value
+
+def _plain(v):
+    if isinstance(v, _SlotRecord):
+        return v.to_dict()
+    if isinstance(v, (Inventory, QuestLog)):
+        return v.to_data()
+    return v
+
+def _json_default(o):
+    if isinstance(o, (Inventory, QuestLog, _SlotRecord)):
+        return _plain(o)
+    raise TypeError(f"{type(o).__name__} tidak bisa di-serialisasi")
+
+class _PlayerProxy:
+    """`player` level modul selalu menunjuk ke Player di session aktif."""
+    __slots__ = ()
+
+    def __getitem__(self, k):
+        return current_session().player[k]
+
+    def __setitem__(self, k, v):
+        current_session().player[k] = v
+
+    def __delitem__(self, k):
+        del current_session().player[k]
+
+    def __contains__(self, k):
+        return k in current_session().player
+
+    def __iter__(self):
+        return iter(current_session().player)
+
+    def __len__(self):
+        return len(current_session().player)
+
+    def __getattr__(self, name):
+        # get/items/keys/setdefault/pop/... milik dict asli
+        return getattr(current_session().player, name)
+
+    def __repr__(self):
+        return repr(current_session().player)
+
+class _RngProxy:
+    """`rng` level modul selalu menunjuk ke random.Random milik session aktif."""
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        return getattr(current_session().rng, name)
+
+def set_player(data):
+    """Ganti pemain di session aktif (new game / load)."""
+    if isinstance(data, dict):
+        data = Player.from_dict(data)
+    current_session().player = data
+
+DEFAULT_SESSION = Session(out=OUT)
+player = _PlayerProxy()
+rng = _RngProxy()
 
 # === HITUNG ULANG STATUS ===
-def recalc_stats():
+def recalc_stats(p=None):
     """Menghitung ulang total atk/def sesuai senjata & armor."""
-    base_atk = player["atk"]
-    base_def = player["def"]
-    wpn = player.get("weapon", {"atk": 0})
-    arm = player.get("armor", {"def": 0})
-    player["total_atk"] = base_atk + wpn.get("atk", 0)
-    player["total_def"] = base_def + arm.get("def", 0)
+    if p is None:
+        p = current_player()
+    p.total_atk = p.atk + p.weapon.get("atk", 0)
+    p.total_def = p.defense + p.armor.get("def", 0)
 
 # === SAVE / LOAD (backwards-compatible) ===
-def ensure_fields(data):
-    base = default_player()
-    changed = False
+# Setiap save menyimpan "schema_version". Saat dimuat, migrasi yang
+# versinya lebih tinggi dari milik save dijalankan berurutan satu kali,
+# lalu save ditulis ulang dengan versi terbaru; save yang sudah terbaru
+# tidak diperiksa lagi. Migrasi bekerja pada dict mentah hasil read_save().
+def _migrate_v1(data):
+    """Save lama tanpa versi: field dasar, senjata/armor, bentuk inventory, skills."""
+    base = json.loads(json.dumps(_V1_FIELDS, default=_json_default))
     for k, v in base.items():
-        if k not in data:
-            data[k] = v
-            changed = True
-    # nested checks
-    if "weapon" not in data or "name" not in data["weapon"]:
-        data["weapon"] = base["weapon"]; changed = True
-    if "armor" not in data or "name" not in data["armor"]:
-        data["armor"] = base["armor"]; changed = True
-    return data, changed
+        data.setdefault(k, v)
+    for slot in ("weapon", "armor"):
+        if not isinstance(data[slot], dict) or "name" not in data[slot]:
+            data[slot] = base[slot]
+    # list lama (boleh berisi list bersarang dari drop) -> {"stacks", "unique"}
+    inv = data["inventory"]
+    if not (isinstance(inv, dict) and "stacks" in inv):
+        data["inventory"] = Inventory.from_data(inv).to_data()
+    if not isinstance(data.get("skills"), list):
+        data["skills"] = []
+
+def _migrate_v2(data):
+    """Satu quest di "quest" -> daftar quest di "quests"."""
+    old = data.pop("quest", None)
+    quests = data.get("quests") or []
+    data["quests"] = [normalize_quest(q) for q in quests + ([old] if old else [])]
+
+def _migrate_v3(data):
+    """Penghitung kill dan stok toko tersimpan."""
+    data.setdefault("kills", 0)
+    data.setdefault("shop", None)
+
+def _migrate_v4(data):
+    """Progress dungeon (seed run + lantai)."""
+    data.setdefault("dungeon", None)
+
+_V1_FIELDS = {
+    "name": "Hero", "lvl": 1, "exp": 0, "next_exp": 100, "gold": 50, "hp": 100, "mp": 30,
+    "atk": 10, "def": 5, "spd": 7,
+    "weapon": {"name": "Wooden Sword", "atk": 2, "value": 20},
+    "armor": {"name": "Cloth Armor", "def": 1, "value": 15},
+    "magic": {"name": "Tidak ada skill", "mp_cost": 0, "power": 0},
+    "inventory": ["Potion"],
+}
+MIGRATIONS = (_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4)
+assert len(MIGRATIONS) == SCHEMA_VERSION, "tambahkan migrasi untuk setiap versi skema"
+
+def migrate_save(data):
+    """Jalankan migrasi yang belum diterapkan; kembalikan (data, versi_awal)."""
+    start = data.get("schema_version", 0)
+    if start > SCHEMA_VERSION:
+        raise ValueError(f"save dari versi game lebih baru (skema {start})")
+    for version in range(start + 1, SCHEMA_VERSION + 1):
+        MIGRATIONS[version - 1](data)
+        data["schema_version"] = version
+    return data, start
 
-def save_game():
-    global player
+def ensure_fields(data):
+    """Migrasi dict save ke skema terbaru; (data, berubah?)."""
+    data, start = migrate_save(data)
+    if not isinstance(data["inventory"], Inventory):
+        data["inventory"] = Inventory.from_data(data["inventory"])
+    return data, start != SCHEMA_VERSION
+
+# Dalam satu transaksi (satu aksi menu utama) save_game() hanya menandai
+# state "dirty"; penulisan ke disk dilakukan sekali saat transaksi selesai.
+# Status transaksi dan statistik disimpan per Session.
+SAVE_STATS = DEFAULT_SESSION.save_stats
+
+def mark_dirty():
+    """Tandai state pemain berubah; ditulis saat save_transaction() ditutup
+    atau bersama save_game() berikutnya."""
+    current_session().tx["dirty"] = True
+
+def writes_avoided():
+    """Jumlah permintaan save yang digabung ke penulisan lain."""
+    stats = current_session().save_stats
+    return stats["requests"] - stats["writes"]
+
+@contextmanager
+def save_transaction():
+    """Gabungkan semua save_game() di dalam blok menjadi satu penulisan."""
+    tx = current_session().tx
+    tx["depth"] += 1
     try:
-        with open(SAVE_FILE, "w") as f:
-            json.dump(player, f)
+        yield
+    finally:
+        tx["depth"] -= 1
+        if tx["depth"] == 0 and tx["dirty"]:
+            _write_save()
+
+# === SAVE CODEC ===
+# Snapshot save bisa JSON (default) atau biner. Format biner:
+#   b"ATWS" | versi (1 byte) | kompresi (1 byte: 0 tidak, 1 zlib, 2 lzma) | payload
+# Payload = tabel string (semua nama item/kunci ditulis sekali, lalu dirujuk
+# lewat indeks) diikuti satu nilai bertag. Angka ditulis sebagai varint
+# (zigzag), stack inventory sebagai pasangan (indeks nama, jumlah), dan
+# list berisi dict (item unik) sebagai tabel: dict dikelompokkan per
+# susunan kunci, lalu tiap kunci ditulis sebagai satu kolom. Kolom string
+# (indeks) dan angka disimpan sebagai array lebar tetap little-endian
+# yang bisa dibaca sekaligus, kolom campuran sebagai nilai bertag.
+# read_save() mengenali format dari header, jadi kedua format bisa dimuat.
+# Journal tetap JSON per baris (deltanya kecil).
+SAVE_MAGIC = b"ATWS"
+SAVE_BIN_VERSION = 1
+SAVE_CODECS = ("json", "bin", "bin+zlib", "bin+lzma")
+SAVE_CODEC = os.environ.get("ATW_SAVE_CODEC", "json")
+_COMPRESS = {"bin": 0, "bin+zlib": 1, "bin+lzma": 2}
+_T_NONE, _T_FALSE, _T_TRUE, _T_INT, _T_FLOAT, _T_STR, _T_LIST, _T_DICT, _T_INV, _T_ROWS = range(10)
+_DOUBLE = struct.Struct("<d")
+_COL_STR, _COL_INT, _COL_ANY = range(3)
+_SWAP = sys.byteorder != "little"
+
+class SaveFormatError(ValueError):
+    """File save biner rusak atau versinya tidak dikenal."""
+
+def _put_varint(buf, n):
+    while n > 0x7F:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+def _encode_value(v, buf, strings):
+    if v is None:
+        buf.append(_T_NONE)
+    elif v is True or v is False:
+        buf.append(_T_TRUE if v else _T_FALSE)
+    elif isinstance(v, int):
+        buf.append(_T_INT)
+        _put_varint(buf, v << 1 if v >= 0 else ((-v) << 1) - 1)
+    elif isinstance(v, float):
+        buf.append(_T_FLOAT)
+        buf += _DOUBLE.pack(v)
+    elif isinstance(v, str):
+        buf.append(_T_STR)
+        _put_varint(buf, strings.setdefault(v, len(strings)))
+    elif isinstance(v, Inventory):
+        buf.append(_T_INV)
+        _put_varint(buf, len(v.stacks))
+        for name, n in v.stacks.items():
+            _put_varint(buf, strings.setdefault(name, len(strings)))
+            _put_varint(buf, n)
+        _encode_value(v.unique, buf, strings)
+    elif isinstance(v, dict):
+        buf.append(_T_DICT)
+        _put_varint(buf, len(v))
+        for k, x in v.items():
+            _put_varint(buf, strings.setdefault(k, len(strings)))
+            _encode_value(x, buf, strings)
+    elif isinstance(v, (list, tuple)) and len(v) > 1 and all(type(x) is dict for x in v):
+        buf.append(_T_ROWS)
+        shapes, groups, order = {}, [], []
+        for x in v:
+            sid = shapes.setdefault(tuple(x), len(shapes))
+            if sid == len(groups):
+                groups.append([])
+            groups[sid].append(x)
+            order.append(sid)
+        _put_varint(buf, len(v))
+        _put_varint(buf, len(shapes))
+        _put_array(buf, order)
+        for keys, group in zip(shapes, groups):
+            _put_varint(buf, len(keys))
+            for k in keys:
+                _put_varint(buf, strings.setdefault(k, len(strings)))
+            _put_varint(buf, len(group))
+            for col in zip(*(x.values() for x in group)):
+                _put_column(buf, col, strings)
+    elif isinstance(v, (list, tuple)):
+        buf.append(_T_LIST)
+        _put_varint(buf, len(v))
+        for x in v:
+            _encode_value(x, buf, strings)
+    elif isinstance(v, (_SlotRecord, QuestLog)):
+        _encode_value(_plain(v), buf, strings)
+    else:
+        raise TypeError(f"{type(v).__name__} tidak bisa di-serialisasi")
+
+def _put_array(buf, nums):
+    """Angka bulat sebagai array lebar tetap terkecil yang muat (kode tipe + byte)."""
+    lo, hi = min(nums, default=0), max(nums, default=0)
+    for code in "bhiq":
+        limit = 1 << (8 * array(code).itemsize - 1)
+        if -limit <= lo and hi < limit:
+            break
+    arr = array(code, nums)
+    if _SWAP:
+        arr.byteswap()
+    buf.append(ord(code))
+    buf += arr.tobytes()
+
+def _put_column(buf, col, strings):
+    if all(type(x) is str for x in col):
+        buf.append(_COL_STR)
+        _put_array(buf, [strings.setdefault(x, len(strings)) for x in col])
+    elif all(type(x) is int for x in col) and -(1 << 63) <= min(col) and max(col) < (1 << 63):
+        buf.append(_COL_INT)
+        _put_array(buf, col)
+    else:
+        buf.append(_COL_ANY)
+        for x in col:
+            _encode_value(x, buf, strings)
+
+def encode_save(data, codec=None):
+    """Serialisasi dict save; JSON -> str, biner -> bytes."""
+    codec = codec or SAVE_CODEC
+    if codec == "json":
+        return json.dumps(data, default=_json_default)
+    if codec not in _COMPRESS:
+        raise ValueError(f"codec save tidak dikenal: {codec}")
+    body, strings = bytearray(), {}
+    _encode_value(data, body, strings)
+    head = bytearray()
+    _put_varint(head, len(strings))
+    for text in strings:
+        raw = text.encode("utf-8")
+        _put_varint(head, len(raw))
+        head += raw
+    payload = bytes(head + body)
+    if codec == "bin+zlib":
+        payload = zlib.compress(payload, 6)
+    elif codec == "bin+lzma":
+        payload = lzma.compress(payload)
+    return SAVE_MAGIC + bytes((SAVE_BIN_VERSION, _COMPRESS[codec])) + payload
+
+def save_codec_of(raw):
+    """Codec sebuah isi file save (cukup 6 byte pertama)."""
+    if raw[:4] != SAVE_MAGIC:
+        return "json"
+    return {v: k for k, v in _COMPRESS.items()}.get(raw[5], "bin")
+
+def save_file_codec(path=None):
+    with open(path or current_session().save_file, "rb") as f:
+        return save_codec_of(f.read(6))
+
+def decode_save(raw):
+    """Kebalikan encode_save(); menerima bytes atau str, format dideteksi dari header."""
+    if isinstance(raw, str):
+        return json.loads(raw)
+    if raw[:4] != SAVE_MAGIC:
+        return json.loads(raw)
+    if len(raw) < 6 or raw[4] != SAVE_BIN_VERSION:
+        raise SaveFormatError("versi save biner tidak dikenal")
+    payload = raw[6:]
+    try:
+        if raw[5] == 1:
+            payload = zlib.decompress(payload)
+        elif raw[5] == 2:
+            payload = lzma.decompress(payload)
+        elif raw[5] != 0:
+            raise SaveFormatError(f"kompresi tidak dikenal: {raw[5]}")
+        return _decode_payload(payload)
+    except SaveFormatError:
+        raise
+    except (IndexError, ValueError, zlib.error, lzma.LZMAError, struct.error) as e:
+        raise SaveFormatError(f"save biner rusak: {e}") from None
+
+def _decode_payload(buf):
+    # varint 1 byte (kasus paling umum) dibaca langsung tanpa panggilan fungsi
+    def varint(pos):
+        n, shift = 0, 0
+        while True:
+            b = buf[pos]
+            pos += 1
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                return n, pos
+            shift += 7
+
+    def get_array(pos, n):
+        arr = array(chr(buf[pos]))
+        end = pos + 1 + arr.itemsize * n
+        arr.frombytes(buf[pos + 1:end])
+        if _SWAP:
+            arr.byteswap()
+        return arr, end
+
+    count, pos = varint(0)
+    strings = []
+    for _ in range(count):
+        size, pos = varint(pos)
+        strings.append(buf[pos:pos + size].decode("utf-8"))
+        pos += size
+
+    def value(pos):
+        tag = buf[pos]
+        pos += 1
+        if tag == _T_STR:
+            i = buf[pos]
+            if i < 0x80:
+                return strings[i], pos + 1
+            i, pos = varint(pos)
+            return strings[i], pos
+        if tag == _T_INT:
+            n = buf[pos]
+            if n < 0x80:
+                pos += 1
+            else:
+                n, pos = varint(pos)
+            return (n >> 1) if not n & 1 else -((n + 1) >> 1), pos
+        if tag == _T_ROWS:
+            total, pos = varint(pos)
+            nshapes, pos = varint(pos)
+            order, pos = get_array(pos, total)
+            groups = []
+            for _ in range(nshapes):
+                k, pos = varint(pos)
+                keys = []
+                for _ in range(k):
+                    i, pos = varint(pos)
+                    keys.append(strings[i])
+                n, pos = varint(pos)
+                cols = []
+                for _ in keys:
+                    kind = buf[pos]
+                    pos += 1
+                    if kind == _COL_STR:
+                        idx, pos = get_array(pos, n)
+                        cols.append([strings[i] for i in idx])
+                    elif kind == _COL_INT:
+                        col, pos = get_array(pos, n)
+                        cols.append(col.tolist())
+                    else:
+                        col = []
+                        for _ in range(n):
+                            x, pos = value(pos)
+                            col.append(x)
+                        cols.append(col)
+                if keys:
+                    groups.append([dict(zip(keys, row)) for row in zip(*cols)])
+                else:
+                    groups.append([{} for _ in range(n)])
+            if nshapes == 1:
+                return groups[0], pos
+            its = [iter(g) for g in groups]
+            return [next(its[sid]) for sid in order], pos
+        if tag == _T_DICT:
+            n, pos = varint(pos)
+            d = {}
+            for _ in range(n):
+                k, pos = varint(pos)
+                d[strings[k]], pos = value(pos)
+            return d, pos
+        if tag == _T_LIST:
+            n, pos = varint(pos)
+            items_ = []
+            for _ in range(n):
+                x, pos = value(pos)
+                items_.append(x)
+            return items_, pos
+        if tag == _T_INV:
+            n, pos = varint(pos)
+            stacks = {}
+            for _ in range(n):
+                k, pos = varint(pos)
+                stacks[strings[k]], pos = varint(pos)
+            unique, pos = value(pos)
+            return {"stacks": stacks, "unique": unique}, pos
+        if tag == _T_NONE:
+            return None, pos
+        if tag == _T_TRUE or tag == _T_FALSE:
+            return tag == _T_TRUE, pos
+        if tag == _T_FLOAT:
+            return _DOUBLE.unpack_from(buf, pos)[0], pos + 8
+        raise SaveFormatError(f"tag tidak dikenal: {tag}")
+
+    data, pos = value(pos)
+    if pos != len(buf):
+        raise SaveFormatError("sisa data setelah save biner")
+    return data
+
+def write_save_file(path, data, seq=0, codec=None):
+    """Tulis `data` sebagai snapshot atomik di `path` dan kosongkan journal-nya."""
+    data = dict(data, journal_seq=seq)
+    encoded = encode_save(data, codec)
+    tmp = path + ".tmp"
+    _fsync_write(tmp, encoded, "wb" if isinstance(encoded, bytes) else "w")
+    os.replace(tmp, path)
+    if os.path.exists(journal_path(path)):
+        _fsync_write(journal_path(path), "")   # journal sudah dilebur ke snapshot
+
+def convert_save(src, dst, codec):
+    """Tulis ulang save `src` (snapshot + journal) sebagai satu snapshot `codec` di `dst`."""
+    data, seq, _ = read_save(src)
+    write_save_file(dst, data, seq, codec)
+    return data
+
+# === JOURNAL SAVE ===
+# atw.json adalah snapshot penuh; setiap commit hanya menambahkan satu baris
+# delta ke atw.json.journal (gold +N, item masuk/keluar, field yang berubah).
+# Setelah JOURNAL_COMPACT_EVERY baris, atau saat keluar game, journal
+# dipadatkan menjadi snapshot baru. Saat load, snapshot + sisa journal
+# diputar ulang; baris terakhir yang terpotong (crash) diabaikan.
+JOURNAL_COMPACT_EVERY = 50
+_MISSING = object()
+
+def journal_path(path=None):
+    return (path or current_session().save_file) + ".journal"
+
+def _apply_ops(data, ops):
+    """Terapkan op journal ke dict save (dipakai saat replay)."""
+    for op in ops:
+        kind = op["op"]
+        if kind == "set":
+            data[op["k"]] = op["v"]
+        elif kind == "add":
+            data[op["k"]] = data.get(op["k"], 0) + op["v"]
+        elif kind == "del":
+            data.pop(op["k"], None)
+        elif kind.startswith("inv"):
+            # op berbasis indeks dari journal versi list lama
+            inv = data.setdefault("inventory", [])
+            if kind == "inv+":
+                inv.append(op["v"])
+            elif kind == "inv^":
+                inv.insert(op["i"], op["v"])
+            elif kind == "inv-":
+                del inv[op["i"]]
+            elif kind == "inv=":
+                inv[:] = op["v"]
+        else:
+            inv = data.get("inventory")
+            if not isinstance(inv, Inventory):
+                inv = data["inventory"] = Inventory.from_data(inv)
+            if kind == "item+":
+                inv.add(op["v"], op.get("n", 1))
+            elif kind == "item-":
+                inv.remove(op["v"], op.get("n", 1))
+            elif kind == "uniq-":
+                inv.remove(inv.unique[op["i"]])
+
+def _diff_ops(shadow, current):
+    """Delta field non-inventory antara commit terakhir dan state sekarang."""
+    ops = []
+    for k, v in current.items():
+        if k == "inventory":
+            continue
+        old = shadow.get(k, _MISSING)
+        if old is not _MISSING and old == v:
+            continue
+        if (type(v) is int and type(old) is int):
+            ops.append({"op": "add", "k": k, "v": v - old})
+        else:
+            ops.append({"op": "set", "k": k, "v": v})
+    for k in shadow:
+        if k not in current:
+            ops.append({"op": "del", "k": k})
+    return ops
+
+def _journal_attach(seq=0, records=0):
+    """Jadikan pemain sekarang sebagai basis delta berikutnya."""
+    sess = current_session()
+    p, journal = sess.player, sess.journal
+    inv = p.get("inventory")
+    if not isinstance(inv, Inventory):
+        inv = p["inventory"] = Inventory.from_data(inv)
+    inv.ops = []
+    journal["owner"] = p
+    journal["inv"] = inv
+    journal["seq"] = seq
+    journal["records"] = records
+    journal["shadow"] = {k: copy.deepcopy(v) for k, v in p.items() if k != "inventory"}
+
+def _fsync_write(path, text, mode="w"):
+    with open(path, mode) as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _write_snapshot():
+    """Tulis snapshot penuh secara atomik lalu kosongkan journal."""
+    sess = current_session()
+    data = dict(sess.player)
+    data["journal_seq"] = sess.journal["seq"]
+    tmp = sess.save_file + ".tmp"
+    encoded = encode_save(data, sess.save_codec or SAVE_CODEC)
+    _fsync_write(tmp, encoded, "wb" if isinstance(encoded, bytes) else "w")
+    os.replace(tmp, sess.save_file)
+    _fsync_write(journal_path(), "")
+    _journal_attach(sess.journal["seq"])
+
+def _append_journal():
+    """Tambahkan delta sejak commit terakhir sebagai satu baris journal."""
+    sess = current_session()
+    p, journal = sess.player, sess.journal
+    inv = p["inventory"]
+    ops = _diff_ops(journal["shadow"], p) + inv.ops
+    if not ops:
+        return
+    journal["seq"] += 1
+    line = json.dumps({"seq": journal["seq"], "ops": ops}, default=_json_default) + "\n"
+    _fsync_write(journal_path(), line, "a")
+    inv.ops = []
+    journal["records"] += 1
+    shadow = journal["shadow"]
+    for op in ops:
+        if op["op"] in ("set", "add"):
+            shadow[op["k"]] = copy.deepcopy(p[op["k"]])
+        elif op["op"] == "del":
+            shadow.pop(op["k"], None)
+
+@profiled("save_game (tulis disk)")
+def _write_save():
+    """Commit state: delta ke journal, atau snapshot penuh jika perlu."""
+    sess = current_session()
+    journal = sess.journal
+    sess.tx["dirty"] = False
+    try:
+        if (journal["owner"] is not sess.player or sess.player.get("inventory") is not journal["inv"]
+                or not os.path.exists(sess.save_file)):
+            _write_snapshot()
+        else:
+            _append_journal()
+            if journal["records"] >= JOURNAL_COMPACT_EVERY:
+                _write_snapshot()
+        sess.save_stats["writes"] += 1
         slow("💾 Progress tersimpan.")
     except Exception as e:
         slow(f"❌ Gagal menyimpan: {e}")
 
+@profiled()
+def save_game():
+    sess = current_session()
+    sess.save_stats["requests"] += 1
+    mark_dirty()
+    if sess.tx["depth"] == 0:
+        _write_save()
+
+def compact_save():
+    """Padatkan journal menjadi snapshot penuh (dipanggil saat keluar)."""
+    sess = current_session()
+    if sess.journal["owner"] is sess.player and sess.journal["records"]:
+        try:
+            _write_snapshot()
+        except Exception as e:
+            slow(f"❌ Gagal memadatkan save: {e}")
+
+def read_save(path=None):
+    """Baca snapshot + replay journal. Mengembalikan (data, seq, jumlah record)."""
+    path = path or current_session().save_file
+    with open(path, "rb") as f:
+        data = decode_save(f.read())
+    if not isinstance(data, dict):
+        return data, 0, 0
+    seq = data.pop("journal_seq", 0)
+    records = 0
+    jpath = journal_path(path)
+    if os.path.exists(jpath):
+        with open(jpath) as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break  # baris terakhir terpotong
+                if rec["seq"] <= seq:
+                    continue
+                _apply_ops(data, rec["ops"])
+                seq = rec["seq"]
+                records += 1
+    return data, seq, records
+
+def save_exists():
+    return os.path.exists(current_session().save_file)
+
+def delete_save():
+    for path in (current_session().save_file, journal_path()):
+        if os.path.exists(path):
+            os.remove(path)
+
+@profiled()
 def load_game():
-    global player
-    if not os.path.exists(SAVE_FILE):
+    if not save_exists():
         slow("⚠️ Tidak ada file save ditemukan.")
         return False
     try:
-        with open(SAVE_FILE) as f:
-            data = json.load(f)
+        data, seq, records = read_save()
+        current_session().save_codec = save_file_codec()
         if not isinstance(data, dict) or "name" not in data:
             slow("❌ File save tidak valid.")
             return False
+        start = data.get("schema_version", 0)
         data, changed = ensure_fields(data)
-        player = data
+        set_player(data)
+        _journal_attach(seq, records)
         if changed:
-            slow("⚠️ Save file dicocokkan dengan field terbaru.")
+            slow(f"⚠️ Save dimigrasi dari skema v{start} ke v{SCHEMA_VERSION}.")
+            current_session().journal["owner"] = None  # paksa snapshot penuh
             save_game()
         slow("📂 Progress berhasil dimuat!")
         recalc_stats()  # pastikan senjata & armor diterapkan setelah load
@@ -120,61 +1874,201 @@ def show_stats():
     next_exp = player["next_exp"]
     weapon = player["weapon"]["name"]
     armor = player["armor"]["name"]
-    inv = ", ".join([f"{k} ({v})" for k, v in player["inventory"].items()]) if isinstance(player["inventory"], dict) else ", ".join(player["inventory"])
-
-    print("\n╔════════════════════════════════════╗")
-    print(f"║ {name}  Lv.{lvl:<3}                     ║")
-    print("╠════════════════════════════════════╣")
-    print(f"║ HP : {hp:<4} | MP : {mp:<4}              ║")
-    print(f"║ ATK: {atk} (Base {base_atk})                 ║")
-    print(f"║ DEF: {defense} (Base {base_def})                 ║")
-    print("╠════════════════════════════════════╣")
-    print(f"║ GOLD: {gold:<6} | EXP: {exp}/{next_exp:<4}       ║")
-    print("╠════════════════════════════════════╣")
-    print(f"║ Senjata: {weapon[:22]:<22}    ║")
-    print(f"║ Armor  : {armor[:22]:<22}    ║")
-    print("╠════════════════════════════════════╣")
+
+    out("\n╔════════════════════════════════════╗")
+    out(f"║ {name}  Lv.{lvl:<3}                     ║")
+    out("╠════════════════════════════════════╣")
+    out(f"║ HP : {hp:<4} | MP : {mp:<4}              ║")
+    out(f"║ ATK: {atk} (Base {base_atk})                 ║")
+    out(f"║ DEF: {defense} (Base {base_def})                 ║")
+    out("╠════════════════════════════════════╣")
+    out(f"║ GOLD: {gold:<6} | EXP: {exp}/{next_exp:<4}       ║")
+    out("╠════════════════════════════════════╣")
+    out(f"║ Senjata: {weapon[:22]:<22}    ║")
+    out(f"║ Armor  : {armor[:22]:<22}    ║")
+    out("╠════════════════════════════════════╣")
     # 🔹 Tampilkan inventory dengan jumlah item (Potion (5), Elixir (2), dst)
     if player['inventory']:
-        from collections import Counter
-        inv_count = Counter(player['inventory'])
-        formatted_inv = [f"{item} ({count})" for item, count in inv_count.items()]
-        print("Inventory:", ', '.join(formatted_inv))
+        formatted_inv = [f"{label} ({count})" for label, count, _ in player['inventory'].stacked()]
+        out("Inventory:", ', '.join(formatted_inv))
     else:
-        print(f"║  (kosong)                          ║")
-    print("╚════════════════════════════════════╝")
+        out(f"║  (kosong)                          ║")
+    out("╚════════════════════════════════════╝")
+
+# === REKAM & REPLAY ===
+# Rekaman = seed RNG + save awal + policy Auto + semua jawaban ask() + state akhir pemain.
+# replay() menjalankan ulang main_menu() dengan jawaban yang sama tanpa jeda
+# teks di folder sementara, lalu membandingkan state akhirnya. Jika sesi
+# asli berhenti karena exception, namanya ikut direkam ("error") dan replay
+# hanya cocok jika berhenti dengan exception yang sama.
+RECORDING_VERSION = 1
+# akhir input (EOF / Ctrl+C di terminal, rekaman habis saat replay)
+_INPUT_END = ("EOFError", "KeyboardInterrupt")
+
+class NullStream:
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+def start_recording(sess=None):
+    """Mulai merekam session (dipanggil sebelum main_menu)."""
+    sess = sess or current_session()
+    with sess.active():
+        start = read_save()[0] if save_exists() else None
+    sess.recording = {"version": RECORDING_VERSION, "seed": sess.seed,
+                      "start_save": start,
+                      "auto_policy": sess.auto_policy.name if sess.auto_policy else AUTO_POLICY,
+                      "inputs": []}
+
+def _final_state(sess):
+    # lewat JSON supaya bisa dibandingkan dengan rekaman yang dibaca dari file
+    return json.loads(json.dumps(sess.player, default=_json_default))
+
+def finish_recording(path, sess=None, error=None):
+    """Tulis rekaman session ke `path` beserta state akhir pemain.
+
+    `error` = exception yang menghentikan sesi (jika ada).
+    """
+    sess = sess or current_session()
+    name = type(error).__name__ if error is not None else None
+    rec = dict(sess.recording, final=_final_state(sess),
+               error=None if name in _INPUT_END else name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rec, f, ensure_ascii=False, default=_json_default)
+
+def replay(rec):
+    """Ulangi rekaman (dict atau path); kembalikan (cocok, state_akhir)."""
+    if isinstance(rec, str):
+        with open(rec, "r", encoding="utf-8") as f:
+            rec = json.load(f)
+    inputs = iter(rec["inputs"])
+
+    def reader():
+        try:
+            return next(inputs)
+        except StopIteration:
+            raise EOFError("rekaman habis") from None
+
+    with tempfile.TemporaryDirectory(prefix="atw-replay-") as tmp:
+        save_file = os.path.join(tmp, "replay.json")
+        if rec.get("start_save") is not None:
+            with open(save_file, "w", encoding="utf-8") as f:
+                json.dump(rec["start_save"], f)
+        out_ = Output(stream=NullStream(), mode="instant", flush_on="screen", reader=reader)
+        sess = Session(save_file=save_file, out=out_, seed=rec["seed"])
+        # opsi Auto harus memakai policy yang sama dengan sesi asli
+        sess.auto_policy = AUTO_POLICIES[rec.get("auto_policy", AUTO_POLICY)]()
+        error = None
+        with sess.active():
+            try:
+                main_menu()
+            except EOFError:
+                pass
+            except Exception as e:
+                error = type(e).__name__
+        final = _final_state(sess)
+    # exception selain yang direkam (atau tanpa rekaman error) = beda
+    if error != rec.get("error"):
+        return False, final
+    recorded = rec.get("final")
+    if not isinstance(recorded, dict) or not isinstance(final, dict):
+        return final == recorded, final
+    # rekaman lama: state akhir dimigrasi seperti save lama, dan field yang
+    # baru ada setelah rekaman dibuat hanya dibandingkan jika bukan default
+    expected = json.loads(json.dumps(ensure_fields(dict(recorded))[0], default=_json_default))
+    defaults = json.loads(json.dumps(default_player(), default=_json_default))
+    keys = [k for k in expected if k in recorded or expected[k] != defaults.get(k)]
+    keys += [k for k in final if k not in expected]
+    return all(final.get(k) == expected.get(k) for k in keys), final
 
 # === SHOP (buy/sell) ===
-def generate_shop_items(level=None):
-    tier_pool = [
-        {"name": "Iron Sword", "price": 50, "type": "weapon"},
-        {"name": "Steel Sword", "price": 80, "type": "weapon"},
-        {"name": "Leather Armor", "price": 60, "type": "armor"},
-        {"name": "Chain Armor", "price": 100, "type": "armor"},
-        {"name": "Potion", "price": 20, "type": "consumable"},
-        {"name": "Hi-Potion", "price": 60, "type": "consumable"},
-
-        # === Tambahan Skill Magic yang dijual di toko ===
-        {"name": "Fireball", "price": 120, "type": "magic", "desc": "Serangan api membakar musuh."},
-        {"name": "Ice Shard", "price": 150, "type": "magic", "desc": "Serangan es memperlambat musuh."},
-        {"name": "Heal", "price": 180, "type": "magic", "desc": "Memulihkan HP sebanyak 30%."},
-        {"name": "Thunder Strike", "price": 200, "type": "magic", "desc": "Serangan listrik yang kuat."}
-    ]
-
-    return random.sample(tier_pool, 4)
+# Toko punya tier per level pemain. Tabel tiap tier (barang yang boleh
+# muncul + harga) dikompilasi sekali saat start; stok yang sedang dijual
+# disimpan di player["shop"] dan hanya diacak ulang saat tier naik atau
+# setiap SHOP_RESTOCK_KILLS musuh dikalahkan. Harga jual berasal dari
+# `value` item dan turun jika item yang sama sering dijual belakangan ini.
+SHOP = CONTENT["shop"]
+SHOP_TIER_LEVELS = SHOP["tier_levels"]
+SHOP_STOCK = SHOP["stock"]
+SHOP_RESTOCK_KILLS = SHOP["restock_kills"]
+SELL_RATE, SELL_DECAY, SELL_FLOOR = SHOP["sell_rate"], SHOP["sell_decay"], SHOP["sell_floor"]
+
+@dataclass(frozen=True)
+class ShopTier:
+    min_lvl: int
+    offers: int
+    entries: tuple            # entri pool yang boleh dijual di tier ini
+    by_name: MappingProxyType  # nama -> entri (harga, tipe, stok awal)
+
+def build_shop_tiers(shop):
+    tiers = []
+    for lvl, offers in zip(shop["tier_levels"], shop["offers"]):
+        entries = tuple(it for it in shop["pool"] if it.get("min_lvl", 1) <= lvl)
+        tiers.append(ShopTier(lvl, offers, entries, MappingProxyType({it["name"]: it for it in entries})))
+    return tuple(tiers)
+
+SHOP_TIERS = build_shop_tiers(SHOP)
+
+def shop_tier(level):
+    """Indeks tier toko untuk level pemain."""
+    return max(0, bisect_right(SHOP_TIER_LEVELS, level) - 1)
+
+def shop_stock(entry):
+    """Stok awal entri toko; skill sihir hanya dibeli sekali, jadi stoknya 1."""
+    return entry.get("stock", 1 if entry["type"] == "magic" else SHOP_STOCK)
+
+def restock_shop(p=None):
+    """Acak ulang stok toko sesuai tier pemain sekarang."""
+    p = p or current_player()
+    tier = shop_tier(p.lvl)
+    old = p.shop or {}
+    entries = SHOP_TIERS[tier].entries
+    picked = rng.sample(entries, SHOP_TIERS[tier].offers)
+    # volume jual "belakangan ini" berkurang setengah setiap restock
+    sold = {k: v // 2 for k, v in old.get("sold", {}).items() if v // 2}
+    p.shop = {"tier": tier, "restocked_at": p.kills,
+              "stock": {it["name"]: shop_stock(it) for it in picked}, "sold": sold}
+    # stok baru harus ikut tersimpan, kalau tidak bisa diacak ulang dengan load
+    mark_dirty()
+    return p.shop
+
+def shop_state(p=None):
+    """Stok toko tersimpan; restock hanya jika tier berubah atau sudah jadwalnya."""
+    p = p or current_player()
+    st = p.shop
+    if (not st or st["tier"] != shop_tier(p.lvl)
+            or p.kills - st["restocked_at"] >= SHOP_RESTOCK_KILLS):
+        st = restock_shop(p)
+    return st
+
+def generate_shop_items():
+    """Barang yang sedang dijual: [(entri, sisa stok)]."""
+    st = shop_state()
+    tier = SHOP_TIERS[st["tier"]]
+    return [(tier.by_name[name], left) for name, left in st["stock"].items()]
+
+def sell_price(item, sold=0):
+    """Harga jual: SELL_RATE x value, turun SELL_DECAY per penjualan terakhir."""
+    name = item["name"] if isinstance(item, dict) else item
+    value = item.get("value", 0) if isinstance(item, dict) else 0
+    value = value or item_info(name).value
+    factor = max(SELL_FLOOR, 1 - SELL_DECAY * sold)
+    return max(1, int(value * SELL_RATE * factor))
 
 def shop_menu():
-    global player
     clear()
     slow("=== TOKO PETUALANG ===")
-    items = generate_shop_items(player["lvl"])
     while True:
-        print("\nBarang Tersedia:")
-        for i, it in enumerate(items, 1):
-            print(f"{i}. {it['name']} - {it['price']} gold")
-        print("B. Jual Barang")
-        print("K. Keluar Toko")
-        choice = input("> ").lower()
+        items = generate_shop_items()
+        out("\nBarang Tersedia:")
+        for i, (it, left) in enumerate(items, 1):
+            status = f"stok {left}" if left else "habis"
+            out(f"{i}. {it['name']} - {it['price']} gold ({status})")
+        out("B. Jual Barang")
+        out("K. Keluar Toko")
+        choice = ask("> ").lower()
         if choice == "k":
             break
         elif choice == "b":
@@ -182,144 +2076,142 @@ def shop_menu():
         elif choice.isdigit():
             idx = int(choice)-1
             if 0 <= idx < len(items):
-                buy_item(items[idx])
+                buy_item(items[idx][0])
         else:
             slow("Pilihan tidak valid.")
 
 def buy_item(item):
-    global player
+    stock = shop_state()["stock"]
+    if not stock.get(item["name"]):
+        slow("Stok barang ini sudah habis.")
+        return
     if player["gold"] < item["price"]:
         slow("Uangmu tidak cukup!")
         return
 
-    player["gold"] -= item["price"]
-
     # Jika item adalah magic skill
     if item["type"] == "magic":
-        if "skills" not in player:
-            player["skills"] = []
         if item["name"] in player["skills"]:
             slow("Kamu sudah memiliki skill ini.")
             return
+        player["gold"] -= item["price"]
         player["skills"].append(item["name"])
         slow(f"Kamu mempelajari skill baru: {item['name']}!")
     else:
-        player["inventory"].append(item["name"])
+        player["gold"] -= item["price"]
+        player["inventory"].add(item["name"])
         slow(f"Kamu membeli {item['name']}.")
+    stock[item["name"]] -= 1
 
     save_game()
 
 def sell_item():
-    global player
     if not player["inventory"]:
         slow("Inventori kosong.")
         return
-    show_inventory(short=True)
-    choice = input("\nPilih nomor item untuk dijual (atau enter untuk batal): ")
+    rows = show_inventory(short=True)
+    choice = ask("\nPilih nomor item untuk dijual (atau enter untuk batal): ")
     if not choice.isdigit():
         return
     idx = int(choice)-1
-    if idx < 0 or idx >= len(player["inventory"]):
+    if idx < 0 or idx >= len(rows):
         slow("Pilihan tidak valid.")
         return
-    item = player["inventory"].pop(idx)
-    # harga jual ~50% random range
-    value = random.randint(10, 50)
+    label, _, item = rows[idx]
+    name = item["name"] if isinstance(item, dict) else item
+    sold = shop_state()["sold"]
+    value = sell_price(item, sold.get(name, 0))
+    player["inventory"].remove(item)
+    sold[name] = sold.get(name, 0) + 1
     player["gold"] += value
-    slow(f"Kamu menjual {item} dan mendapatkan {value} gold.")
+    slow(f"Kamu menjual {label} dan mendapatkan {value} gold.")
     save_game()
 
 # === INVENTORY & EQUIP ===
 def show_inventory(short=False):
+    """Tampilkan inventory bertumpuk; mengembalikan baris (nama, jumlah, item)."""
     clear()
-    if not player["inventory"]:
+    rows = player["inventory"].stacked()
+    if not rows:
         slow("Inventori kosong.")
-        return
+        return rows
 
     if short:
-        for i, it in enumerate(player["inventory"], 1):
-            print(f"{i}. {it}")
-        return
+        for i, (label, count, _) in enumerate(rows, 1):
+            out(f"{i}. {label} ({count})")
+        return rows
 
     slow("=== INVENTORY ===")
-    for i, it in enumerate(player["inventory"], 1):
-        print(f"{i}. {it}")
+    for i, (label, count, _) in enumerate(rows, 1):
+        out(f"{i}. {label} ({count})")
 
-    choice = input("\nPilih nomor item untuk lihat detail (atau tekan Enter untuk kembali): ")
+    choice = ask("\nPilih nomor item untuk lihat detail (atau tekan Enter untuk kembali): ")
     if choice.isdigit():
         idx = int(choice) - 1
-        if 0 <= idx < len(player["inventory"]):
-            item = player["inventory"][idx]
-            describe_item(item)
+        if 0 <= idx < len(rows):
+            item = rows[idx][2]
+            describe_item(item["name"] if isinstance(item, dict) else item)
+    return rows
+
+def _bonus_text(bonus):
+    return ", ".join(f"+{v if not isinstance(v, tuple) else f'{v[0]}–{v[1]}'} {k.upper()}" for k, v in bonus.items())
 
 def describe_item(item):
     slow("\n=== DESKRIPSI ITEM ===")
-    desc = ""
+    info = item_info(item)
+    lvl = player["lvl"]
 
     # Item penyembuh
-    if item in ["Potion", "Hi-Potion", "Mega Potion"]:
-        heals = {"Potion": 50, "Hi-Potion": 100, "Mega Potion": 200}
-        desc = f"Memulihkan {heals.get(item, 0)} HP."
+    if info.heal:
+        desc = f"Memulihkan {info.heal} HP."
 
     # Senjata
-    elif "Sword" in item or "Dagger" in item or "Axe" in item or "Bow" in item:
-        base = {"Sword": 5, "Dagger": 3, "Axe": 7, "Bow": 4}
-        for key in base:
-            if key in item:
-                desc = f"Senjata jenis {key}. Menambah ATK sekitar {base[key]}–{base[key]*4}."
-                break
-
-        # Tambahan jika Legendary Sword
-        if "Legendary Sword" in item:
-            desc += " 🌟 Efek: +55 ATK, +100 HP, +50 MP."
+    elif info.slot == "weapon":
+        desc = f"Senjata jenis {info.kind}. Menambah ATK sekitar {info.atk[0] + lvl}–{info.atk[1] + lvl}."
 
     # Armor
-    elif "Armor" in item or "Robe" in item or "Mail" in item or "Shield" in item:
-        base = {"Armor": 3, "Robe": 2, "Mail": 4, "Shield": 3}
-        for key in base:
-            if key in item:
-                desc = f"Pelindung jenis {key}. Menambah DEF sekitar {base[key]}–{base[key]*4}."
-                break
+    elif info.slot == "armor":
+        desc = f"Pelindung jenis {info.kind}. Menambah DEF sekitar {info.defense[0] + lvl}–{info.defense[1] + lvl}."
 
-        # Tambahan jika Legendary Armor
-        if "Legendary Armor" in item:
-            desc += " 🌟 Efek: +50 DEF, +150 HP, +50 MP."
+    elif info.spell:
+        desc = f"Mengajarkan {info.spell['name']} ({info.spell['mp_cost']} MP, kekuatan {info.spell['power']})."
 
     else:
         desc = "Item khusus tanpa efek yang diketahui."
 
-    slow(f"🧾 {item}: {desc}")
-    input("\nTekan Enter untuk kembali ke inventori...")
+    # Bonus tambahan (item legendaris dan item langka)
+    if info.bonus:
+        desc += f" 🌟 Efek: {_bonus_text(info.bonus)}."
 
-from collections import Counter
+    slow(f"🧾 {item}: {desc}")
+    ask("\nTekan Enter untuk kembali ke inventori...")
 
 def get_stacked_inventory():
     """Mengembalikan daftar inventory yang sudah dikelompokkan"""
-    inv_count = Counter(player["inventory"])
-    return list(inv_count.items())
+    return [(label, count) for label, count, _ in player["inventory"].stacked()]
 
 def show_stacked_inventory():
     """Menampilkan inventory dengan format Item (jumlah)"""
     inv_list = get_stacked_inventory()
     if not inv_list:
-        print("Inventori kosong.")
+        out("Inventori kosong.")
         return
     for i, (item, count) in enumerate(inv_list, 1):
-        print(f"{i}. {item} ({count})")
+        out(f"{i}. {item} ({count})")
 
 def inventory_menu():
     while True:
         clear()
-        print("=== MENU INVENTORY ===")
-        print("1. Lihat Item")
-        print("2. Equip Senjata/Armor")
-        print("3. Gunakan Item")
-        print("4. Crafting")
-        print("5. kembali")
-        ch = input("> ")
+        out("=== MENU INVENTORY ===")
+        out("1. Lihat Item")
+        out("2. Equip Senjata/Armor")
+        out("3. Gunakan Item")
+        out("4. Crafting")
+        out("5. kembali")
+        ch = ask("> ")
         if ch == "1":
             show_stacked_inventory()
-            input("\nTekan ENTER untuk kembali.")
+            ask("\nTekan ENTER untuk kembali.")
         elif ch == "2":
             equip_item()
         elif ch == "3":
@@ -333,31 +2225,28 @@ def inventory_menu():
 
 def equip_item():
     """
-    Versi equip yang kompatibel dengan inventory stacked (Counter).
+    Versi equip yang kompatibel dengan inventory stacked (Inventory).
     Menampilkan daftar item ter-stack, memilih item berdasarkan nomor,
     mengurangi 1 dari stack (atau hapus jika tinggal 0), dan
     mengembalikan equipment lama ke inventory.
     """
-    global player
     # jika inventory kosong
     if not player.get("inventory"):
         slow("Inventori kosong.")
         return
 
     # siapkan daftar stacked
-    from collections import Counter
-    inv_count = Counter(player["inventory"])
-    stacked = list(inv_count.items())  # [(item_name, count), ...]
+    stacked = player["inventory"].stacked()  # [(label, count, item), ...]
 
     # tampilkan
     clear()
-    print("\n=== EQUIP ITEM ===")
-    for i, (name, cnt) in enumerate(stacked, 1):
-        print(f"{i}. {name} ({cnt})")
-    print("0. Batal")
+    out("\n=== EQUIP ITEM ===")
+    for i, (name, cnt, _) in enumerate(stacked, 1):
+        out(f"{i}. {name} ({cnt})")
+    out("0. Batal")
 
     # input pilihan
-    choice = input("\nPilih item untuk equip (nomor): ").strip()
+    choice = ask("\nPilih item untuk equip (nomor): ").strip()
     if not choice.isdigit():
         slow("Pilihan tidak valid.")
         return
@@ -368,76 +2257,129 @@ def equip_item():
         slow("Pilihan tidak valid.")
         return
 
-    item_name, item_count = stacked[idx]
+    _, item_count, item = stacked[idx]
+    item_name = item["name"] if isinstance(item, dict) else item
 
     # Pastikan kita mengurangi 1 item dari inventory (stack behavior)
-    # Hapus satu instance dari player['inventory'] (yang berupa list of names)
-    removed = False
-    for i, it in enumerate(player["inventory"]):
-        if it == item_name:
-            player["inventory"].pop(i)
-            removed = True
-            break
-    if not removed:
+    if not player["inventory"].remove(item):
         slow("Gagal mengambil item dari inventori.")
         return
 
+    info = item_info(item_name)
+    if info.slot is None:
+        # bukan equipable -> kembalikan item ke inventory
+        player["inventory"].add(item)
+        slow("Item ini tidak bisa di-equip.")
+        return
+
+    p = current_player()
+    unequip_gear(info.slot)
+    gear = resolve_gear(item, info)
+    bonus = gear_bonus(gear, info.slot)
+    p.hp += bonus["hp"]
+    p.mp += bonus["mp"]
+    p.atk += bonus["atk"]
+    p.defense += bonus["def"]
+
     # Jika item adalah senjata
-    if "Sword" in item_name or "Dagger" in item_name or "Bow" in item_name:
-        # simpan senjata lama ke inventory (jika ada dan bukan default)
-        if player.get("weapon") and player["weapon"].get("name") not in (None, "", "Tangan Kosong"):
-            player["inventory"].append(player["weapon"]["name"])
-
-        # reset bonus senjata lama
-        player["hp"] -= player.get("bonus_hp_weapon", 0)
-        player["mp"] -= player.get("bonus_mp_weapon", 0)
-        player["bonus_hp_weapon"] = 0
-        player["bonus_mp_weapon"] = 0
-
-        atk = random.randint(5, 10) + player["lvl"]
-        if "Legendary Sword" in item_name:
-            atk += 55
-            player["bonus_hp_weapon"] = 100
-            player["bonus_mp_weapon"] = 50
-            player["hp"] += 100
-            player["mp"] += 50
+    if info.slot == "weapon":
+        p.bonus_hp_weapon = bonus["hp"]
+        p.bonus_mp_weapon = bonus["mp"]
+        if info.legendary:
             slow("✨ Kekuatan legendaris mengalir ke tubuhmu!")
-
-        player["weapon"] = {"name": item_name, "atk": atk}
-        player["bonus_atk"] = atk
-        slow(f"⚔️ Kamu melengkapi senjata: {item_name} (+{atk} ATK)")
+        p["weapon"] = gear
+        p.bonus_atk = gear["atk"]
+        slow(f"⚔️ Kamu melengkapi senjata: {item_name} (+{gear['atk']} ATK)")
 
     # Jika item adalah armor
-    elif "Armor" in item_name or "Robe" in item_name or "Cloth" in item_name or "Mail" in item_name or "Shield" in item_name:
-        # simpan armor lama ke inventory (jika ada dan bukan default)
-        if player.get("armor") and player["armor"].get("name") not in (None, "", "Tanpa Armor"):
-            player["inventory"].append(player["armor"]["name"])
-
-        defense = random.randint(3, 7) + player["lvl"]
-        if "Legendary Armor" in item_name:
-            defense += 50
+    else:
+        if info.legendary:
             slow("✨ Kamu merasakan perlindungan suci di sekitarmu!")
+        p["armor"] = gear
+        p.bonus_def = gear["def"]
+        slow(f"🛡️ Kamu memakai armor: {item_name} (+{gear['def']} DEF)")
 
-        player["armor"] = {"name": item_name, "def": defense}
-        player["bonus_def"] = defense
-        slow(f"🛡️ Kamu memakai armor: {item_name} (+{defense} DEF)")
-
-    else:
-        # bukan equipable -> kembalikan item ke inventory
-        player["inventory"].append(item_name)
-        slow("Item ini tidak bisa di-equip.")
-        return
+    if any(bonus.values()):
+        slow(f"✨ Bonus: {_bonus_text({k: v for k, v in bonus.items() if v})}")
 
     # simpan otomatis dan perbarui stats
     save_game()
     recalc_stats()
 
+# === BONUS EQUIPMENT ===
+# Stat utama (atk senjata, def armor) ada di field "atk"/"def" item; bonus
+# lain disimpan di item sebagai bonus_<stat>_<slot>, sama seperti item hasil
+# crafting (bonus_hp_weapon, bonus_mp_armor, ...). Item yang sudah punya
+# stat tersimpan tidak di-roll lagi.
+GEAR_MAIN_STAT = {"weapon": "atk", "armor": "def"}
+GEAR_DEFAULTS = {"weapon": ("Tangan Kosong",), "armor": ("Tanpa Armor",)}
+
+def _bonus_key(stat, slot):
+    return f"bonus_{stat}_{slot}"
+
+def gear_bonus(gear, slot):
+    """{hp, mp, atk, def}: bonus item terpasang di luar stat utamanya."""
+    return {stat: gear.get(_bonus_key(stat, slot), 0) for stat in ("hp", "mp", "atk", "def")}
+
+def roll_gear(info, lvl_bonus=0):
+    """Roll stat gear katalog sekali: stat utama (+ `lvl_bonus`) lalu bonusnya."""
+    slot, main = info.slot, GEAR_MAIN_STAT[info.slot]
+    gear = {"name": info.name, main: roll_stat(info.atk if slot == "weapon" else info.defense) + lvl_bonus}
+    for stat, v in info.bonus.items():
+        if stat == main:
+            gear[main] += roll_stat(v)
+        else:
+            gear[_bonus_key(stat, slot)] = roll_stat(v)
+    return gear
+
+def gear_stats_text(gear, slot):
+    """Teks stat dict gear, mis. "+27 ATK, +22 HP" (stat utama dulu, lalu bonus)."""
+    main = GEAR_MAIN_STAT[slot]
+    parts = [f"+{gear[main]} {main.upper()}"]
+    for stat in ("atk", "def", "hp", "mp"):
+        v = gear.get(_bonus_key(stat, slot))
+        if v:
+            parts.append(f"+{v} {stat.upper()}")
+    return ", ".join(parts)
+
+def resolve_gear(item, info):
+    """Dict slot untuk `item`: item unik dipakai utuh, item katalog di-roll sekali."""
+    gear = dict(item, crafted=True) if isinstance(item, dict) else {"name": item}
+    if GEAR_MAIN_STAT[info.slot] not in gear:
+        gear.update(roll_gear(info, current_player().lvl))
+    return gear
+
+def unequip_gear(slot):
+    """Lepas item di `slot`: cabut bonusnya dan kembalikan item ke inventory."""
+    p = current_player()
+    old = p[slot]
+    bonus = gear_bonus(old, slot)
+    if slot == "weapon" and not any(bonus.values()):
+        # save lama: bonus senjata hanya tercatat di pemain
+        bonus["hp"], bonus["mp"] = p.get("bonus_hp_weapon", 0), p.get("bonus_mp_weapon", 0)
+    p.hp -= bonus["hp"]
+    p.mp -= bonus["mp"]
+    p.atk -= bonus["atk"]
+    p.defense -= bonus["def"]
+    if slot == "weapon":
+        p.bonus_hp_weapon = p.bonus_mp_weapon = 0
+    name = old.get("name")
+    if name in (None, "") or name in GEAR_DEFAULTS[slot]:
+        return
+    if old.get("crafted"):
+        # item unik kembali utuh bersama stat hasil roll-nya
+        item = old.to_dict()
+        del item["crafted"]
+        p.inventory.add(item)
+    else:
+        p.inventory.add(name)
+
 def equip_magic():
     if not player["inventory"]:
         slow("Inventory kosong.")
         return
 
-    magic_items = [item for item in player["inventory"] if "Scroll" in item or "Tome" in item or "Rune" in item]
+    magic_items = player["inventory"].of_type("magic")
     if not magic_items:
         slow("Kamu tidak punya skill magic untuk di-equip.")
         return
@@ -445,7 +2387,7 @@ def equip_magic():
     slow("\n=== PILIH SKILL MAGIC ===")
     for i, m in enumerate(magic_items, 1):
         slow(f"{i}. {m}")
-    choice = input("> ")
+    choice = ask("> ")
 
     if not choice.isdigit() or int(choice) < 1 or int(choice) > len(magic_items):
         slow("Pilihan tidak valid.")
@@ -455,17 +2397,11 @@ def equip_magic():
 
     # Kembalikan skill lama ke inventory (jika bukan default)
     if player["magic"]["name"] not in (None, "", "Tidak ada skill"):
-        player["inventory"].append(player["magic"]["name"])
-
-    # Tentukan atribut skill magic berdasarkan nama
-    if "Fireball" in chosen:
-        player["magic"] = {"name": "Fireball", "mp_cost": 10, "power": 25}
-    elif "Ice Spike" in chosen:
-        player["magic"] = {"name": "Ice Spike", "mp_cost": 8, "power": 18}
-    elif "Thunder Rune" in chosen:
-        player["magic"] = {"name": "Thunder", "mp_cost": 12, "power": 30}
-    else:
-        player["magic"] = {"name": chosen, "mp_cost": 10, "power": 20}
+        player["inventory"].add(player["magic"]["name"])
+
+    # Tentukan atribut skill magic dari katalog
+    spell = item_info(chosen).spell
+    player["magic"] = dict(spell) if spell else {"name": chosen, "mp_cost": 10, "power": 20}
 
     player["inventory"].remove(chosen)
     slow(f"✨ Kamu mempelajari skill magic {player['magic']['name']}!")
@@ -474,20 +2410,20 @@ def use_item_outside():
     if not player["inventory"]:
         slow("Inventori kosong.")
         return
-    show_inventory()
-    choice = input("\nGunakan item nomor (atau enter untuk batal): ")
+    rows = show_inventory(short=True)
+    choice = ask("\nGunakan item nomor (atau enter untuk batal): ")
     if not choice.isdigit():
         return
     idx = int(choice)-1
-    if idx < 0 or idx >= len(player["inventory"]):
+    if idx < 0 or idx >= len(rows):
         slow("Pilihan tidak valid.")
         return
-    item = player["inventory"].pop(idx)
-    if item in ["Potion","Hi-Potion","Mega Potion","Elixir","Phoenix Potion"]:
-        heals = {"Potion":50,"Hi-Potion":100,"Mega Potion":150,"Elixir":250,"Phoenix Potion":500}
-        heal = heals.get(item,50)
+    item = rows[idx][2]
+    heal = item_info(item).heal if isinstance(item, str) else 0
+    if heal:
+        player["inventory"].remove(item)
         player["hp"] += heal
-        maxhp = 100 + (player["lvl"]-1)*25
+        maxhp = max_hp_for(player["lvl"])
         if player["hp"] > maxhp: player["hp"] = maxhp
         slow(f"🧪 Kamu menggunakan {item} dan memulihkan {heal} HP.")
     else:
@@ -495,432 +2431,1162 @@ def use_item_outside():
     save_game()
 
 # --- SISTEM CRAFTING ---
-CRAFT_RECIPES = {
-    "Battle Axe": {
-        "requires": ["Iron Sword", "Orc Tooth"],
-        "result": "Battle Axe"
-    },
-    "Dragon Scale Armor": {
-        "requires": ["Leather Armor", "Lizard Scale"],
-        "result": "Dragon Scale Armor"
-    },
-    "Dark Claw": {
-        "requires": ["Bear Fur", "Shadow Essence"],
-        "result": "Dark Claw"
-    }
-}
+# Resep boleh menulis bahan sebagai list (nama boleh berulang) atau dict
+# nama -> jumlah. RecipeBook menyimpan indeks terbalik bahan -> resep;
+# CraftTracker per inventory menyimpan jumlah bahan yang masih kurang per
+# resep. Saat stack berubah hanya resep yang memakai item itu yang
+# disentuh, jadi daftar "bisa dibuat sekarang" selalu siap tanpa scan.
+# Item unik hasil crafting tidak dihitung sebagai bahan.
+CRAFT_RECIPES = CONTENT["recipes"]
+
+def recipe_needs(recipe):
+    """Bahan resep sebagai dict nama -> jumlah."""
+    req = recipe["requires"]
+    if isinstance(req, dict):
+        return dict(req)
+    needs = {}
+    for name in req:
+        needs[name] = needs.get(name, 0) + 1
+    return needs
+
+class RecipeBook:
+    """Resep terkompilasi: bahan per resep dan indeks bahan -> (resep, jumlah)."""
+    __slots__ = ("recipes", "needs", "by_ingredient")
+
+    def __init__(self, recipes):
+        self.recipes = recipes
+        self.needs = {key: tuple(recipe_needs(r).items()) for key, r in recipes.items()}
+        self.by_ingredient = {}
+        for key, needs in self.needs.items():
+            for name, qty in needs:
+                self.by_ingredient.setdefault(name, []).append((key, qty))
+
+class CraftTracker:
+    """Penghitung bahan kurang per resep untuk satu inventory."""
+    __slots__ = ("book", "missing", "ready")
+
+    def __init__(self, book, inv):
+        self.book = book
+        self.missing = {}
+        self.ready = {}
+        for key, needs in book.needs.items():
+            short = sum(1 for name, qty in needs if inv.stacks.get(name, 0) < qty)
+            self.missing[key] = short
+            if short == 0:
+                self.ready[key] = None
+
+    def changed(self, name, before, after):
+        for key, qty in self.book.by_ingredient.get(name, ()):
+            was, now = before >= qty, after >= qty
+            if was == now:
+                continue
+            short = self.missing[key] + (-1 if now else 1)
+            self.missing[key] = short
+            if short == 0:
+                self.ready[key] = None
+            else:
+                self.ready.pop(key, None)
+
+    def craftable(self):
+        """Kunci resep yang bahannya lengkap sekarang."""
+        return list(self.ready)
+
+RECIPE_BOOK = RecipeBook(CRAFT_RECIPES)
+
+def craft_tracker(inv=None):
+    """Pelacak crafting milik inventory (dibuat sekali, lalu dirawat inkremental)."""
+    inv = inv if inv is not None else player["inventory"]
+    if inv.craft is None or inv.craft.book is not RECIPE_BOOK:
+        inv.craft = CraftTracker(RECIPE_BOOK, inv)
+    return inv.craft
+
+def craft_max(key, inv=None):
+    """Berapa kali resep `key` bisa dibuat dengan isi tas sekarang."""
+    inv = inv if inv is not None else player["inventory"]
+    return min(inv.stacks.get(name, 0) // qty for name, qty in RECIPE_BOOK.needs[key])
+
+def _crafted_item(result_item):
+    """Item hasil crafting dan pesan untuk pemain.
+
+    Gear di-roll sekali dari katalog (stat utama + bonus) dan disimpan
+    sebagai item unik; hasil lain tetap item katalog biasa.
+    """
+    info = item_info(result_item)
+    if info.slot is None:
+        return result_item, f"⚒️ Kamu berhasil membuat {result_item}!"
+    gear = roll_gear(info)
+    stats = gear_stats_text(gear, info.slot)
+    gear["desc"] = f"{result_item} ({stats})"
+    icon = "🛡️" if info.slot == "armor" else "⚒️"
+    return gear, f"{icon} Kamu berhasil membuat {result_item}! ({stats})"
+
+def craft(key, times=1):
+    """Buat resep `key` sebanyak `times` kali; kembalikan jumlah yang berhasil."""
+    inv = player["inventory"]
+    times = min(times, craft_max(key, inv))
+    result_item = CRAFT_RECIPES[key]["result"]
+    for _ in range(times):
+        for name, qty in RECIPE_BOOK.needs[key]:
+            inv.remove(name, qty)
+        item, msg = _crafted_item(result_item)
+        inv.add(item)
+        slow(msg)
+    return times
 
 def craft_menu():
-    print("\n🧰 === MEJA CRAFTING ===")
-    for i, (k, v) in enumerate(CRAFT_RECIPES.items(), 1):
-        reqs = ", ".join(v["requires"])
-        print(f"{i}. {v['result']} (butuh: {reqs})")
-    print("0. Batal")
-    ch = input("> ")
+    out("\n🧰 === MEJA CRAFTING ===")
+    # hanya resep yang bahannya lengkap (dirawat inkremental oleh tracker)
+    keys = craft_tracker().craftable()
+    if not keys:
+        slow("❌ Belum ada resep yang bahannya lengkap.")
+        return
+    for i, key in enumerate(keys, 1):
+        reqs = ", ".join(name if qty == 1 else f"{qty}x {name}" for name, qty in RECIPE_BOOK.needs[key])
+        out(f"{i}. {CRAFT_RECIPES[key]['result']} (butuh: {reqs})")
+    out("0. Batal")
+    ch = ask("> ")
     if ch == "0":
         return
-
-    try:
-        key = list(CRAFT_RECIPES.keys())[int(ch) - 1]
-    except:
+    if not ch.isdigit() or not 1 <= int(ch) <= len(keys):
         slow("Pilihan tidak valid.")
         return
+    key = keys[int(ch) - 1]
+
+    most = craft_max(key)
+    times = 1
+    while most > 1:
+        ans = ask(f"Jumlah (1-{most}, M = maksimal, 0 = batal): ").strip().lower()
+        if ans == "m":
+            times = most
+            break
+        if ans == "0":
+            return
+        if ans.isdigit() and 1 <= int(ans) <= most:
+            times = int(ans)
+            break
+        slow(f"Jumlah harus 1-{most}.")
+    made = craft(key, times)
+    if made > 1:
+        slow(f"Total {made}x {CRAFT_RECIPES[key]['result']} dibuat.")
+
+# === QUEST / NPC (quest log) ===
+# Pemain bisa memegang beberapa quest sekaligus (lihat QuestLog).
+QUEST_OFFERS = CONTENT["quests"]
+MAX_ACTIVE_QUESTS = 5
+
+def _offer_quests(log):
+    titles = log.titles()
+    offers = [q for q in QUEST_OFFERS if q["title"] not in titles]
+    room = MAX_ACTIVE_QUESTS - len(log)
+    if not offers or room <= 0:
+        return
+    slow("'Kau bisa bantu kami? Banyak monster muncul di dekat hutan.'")
+    for i, q in enumerate(offers, 1):
+        out(f"{i}. {q['title']} (Reward: {q['reward']['exp']} EXP, {q['reward']['gold']} gold)")
+    out(f"{len(offers) + 1}. Tolak")
+    if room > 1:
+        out(f"(Boleh pilih beberapa sekaligus, mis. 1,3 — maksimal {room} lagi)")
+    ch = ask("> ")
+    picked = []
+    for part in ch.replace(",", " ").split():
+        if part.isdigit() and 1 <= int(part) <= len(offers) and offers[int(part) - 1] not in picked:
+            picked.append(offers[int(part) - 1])
+    if not picked:
+        slow("NPC: 'Baiklah, lain kali saja.'")
+        return
+    for q in picked[:room]:
+        log.add(q)
+        slow(f"Quest diterima: {q['title']}")
+    save_game()
 
-    recipe = CRAFT_RECIPES[key]
-    if all(req in player["inventory"] for req in recipe["requires"]):
-        # Hapus bahan dari inventory
-        for req in recipe["requires"]:
-            player["inventory"].remove(req)
-
-        result_item = recipe["result"]
-
-        # === Tambahkan bonus berdasarkan hasil crafting ===
-        if result_item == "Battle Axe":
-            atk = random.randint(25, 35)
-            bonus_hp = random.randint(20, 35)
-            player["inventory"].append({
-                "name": result_item,
-                "atk": atk,
-                "bonus_hp_weapon": bonus_hp,
-                "desc": f"Battle Axe (+{atk} ATK, +{bonus_hp} HP)"
-            })
-            slow(f"⚒️ Kamu berhasil membuat {result_item}! (+{atk} ATK, +{bonus_hp} HP)")
-
-        elif result_item == "Dragon Scale Armor":
-            defense = random.randint(25, 35)
-            bonus_mp = random.randint(25, 40)
-            player["inventory"].append({
-                "name": result_item,
-                "def": defense,
-                "bonus_mp_armor": bonus_mp,
-                "desc": f"Dragon Scale Armor (+{defense} DEF, +{bonus_mp} MP)"
-            })
-            slow(f"🛡️ Kamu berhasil membuat {result_item}! (+{defense} DEF, +{bonus_mp} MP)")
-
-        elif result_item == "Dark Claw":
-            atk = random.randint(20, 30)
-            bonus_def = random.randint(20, 30)
-            bonus_hp = random.randint(20, 35)
-            player["inventory"].append({
-                "name": result_item,
-                "atk": atk,
-                "bonus_def_weapon": bonus_def,
-                "bonus_hp_weapon": bonus_hp,
-                "desc": f"Dark Claw (+{atk} ATK, +{bonus_def} DEF, +{bonus_hp} HP)"
-            })
-            slow(f"🦴 Kamu berhasil membuat {result_item}! (+{atk} ATK, +{bonus_def} DEF, +{bonus_hp} HP)")
-
-    else:
-        slow("❌ Bahan tidak lengkap.")
-
-# === QUEST / NPC (single active quest) ===
 def talk_to_npc():
-    global player
     slow("\n👴 Penduduk Desa: 'Ah, kau petualang yang baru datang?'")
-    if not player.get("quest"):
-        slow("'Kau bisa bantu kami? Banyak monster muncul di dekat hutan.'")
-        print("1. Bunuh 5 Slime (Reward: 80 EXP, 40 gold)")
-        print("2. Bunuh 5 Goblin (Reward: 100 EXP, 50 gold)")
-        print("3. Bunuh 3 Wolf (Reward: 150 EXP, 80 gold)")
-        print("4. Bunuh 4 Kelelawar (Reward: 180 EXP, 90 gold)")
-        print("5. Bunuh 2 Beruang (Reward: 220 EXP, 120 gold)")
-        print("6. Bunuh 3 Orc (Reward: 250 EXP, 150 gold)")
-        print("7. Bunuh 2 Lizardman (Reward: 300 EXP, 180 gold)")
-        print("8. Tolak")
-        ch = input("> ")
-        if ch == "1":
-           player["quest"] = {"title": "Bunuh 5 Slime", "target": "Slime", "count": 5, "progress": 0, "reward": {"exp": 80, "gold": 40}}
-        elif ch == "2":
-           player["quest"] = {"title": "Bunuh 5 Goblin", "target": "Goblin", "count": 5, "progress": 0, "reward": {"exp": 100, "gold": 50}}
-        elif ch == "3":
-           player["quest"] = {"title": "Bunuh 3 Wolf", "target": "Wolf", "count": 3, "progress": 0, "reward": {"exp": 150, "gold": 80}}
-        elif ch == "4":
-           player["quest"] = {"title": "Bunuh 4 Kelelawar", "target": "Kelelawar", "count": 4, "progress": 0, "reward": {"exp": 180, "gold": 90}}
-        elif ch == "5":
-           player["quest"] = {"title": "Bunuh 2 Beruang", "target": "Beruang", "count": 2, "progress": 0, "reward": {"exp": 220, "gold": 120}}
-        elif ch == "6":
-           player["quest"] = {"title": "Bunuh 3 Orc", "target": "Orc", "count": 3, "progress": 0, "reward": {"exp": 250, "gold": 150}}
-        elif ch == "7":
-           player["quest"] = {"title": "Bunuh 2 Lizardman", "target": "Lizardman", "count": 2, "progress": 0, "reward": {"exp": 300, "gold": 180}}
-        else:
-            slow("NPC: 'Baiklah, lain kali saja.'")
-            return
-        slow(f"Quest diterima: {player['quest']['title']}")
-    else:
-        q = player["quest"]
-        icon = MONSTER_ICONS.get(q.get("target"), "❓")
-        target_name = q.get("target", "???")
-        progress = q.get("progress", 0)
-        target = q.get("count", q.get("target", 0)) or q.get("target", 0)
-
-        # Jika quest selesai
-        if progress >= q.get("count", q.get("target", 0)):
-            slow(f"NPC: 'Luar biasa! Kau berhasil membasmi semua {icon} {target_name}!'")
-            rew = q.get("reward", {})
-            player["exp"] += rew.get("exp", 0)
-            player["gold"] += rew.get("gold", 0)
-            slow(f"🎁 Kamu menerima {rew.get('exp', 0)} EXP dan {rew.get('gold', 0)} gold!")
-            player["quest"] = None
-            level_up_check()
-            save_game()
-        else:
-            left = q.get("count", q.get("target", 0)) - progress
-            total = q.get("count", q.get("target", 0))
-            slow(f"Quest aktif: {icon} {target_name} — {progress}/{total} terbunuh.")
-            slow(f"NPC: 'Masih ada {left} yang tersisa, lanjutkan perjuanganmu!'")
+    log = player["quests"]
+    done = log.completed()
+    for q in done:
+        icon = MONSTER_ICONS.get(q["target"], "❓")
+        slow(f"NPC: 'Luar biasa! Kau berhasil membasmi semua {icon} {q['target']}!'")
+        rew = q["reward"]
+        player["exp"] += rew.get("exp", 0)
+        player["gold"] += rew.get("gold", 0)
+        slow(f"🎁 Kamu menerima {rew.get('exp', 0)} EXP dan {rew.get('gold', 0)} gold!")
+        log.remove(q)
+    if done:
+        level_up_check()
+        save_game()
+    for q in log:
+        icon = MONSTER_ICONS.get(q["target"], "❓")
+        left = q["count"] - q["progress"]
+        slow(f"Quest aktif: {icon} {q['target']} — {q['progress']}/{q['count']} terbunuh.")
+        slow(f"NPC: 'Masih ada {left} yang tersisa, lanjutkan perjuanganmu!'")
+    _offer_quests(log)
 
 # === ENEMY SCALING ===
-def scaled_enemy(enemy_base):
-    scale = max(0.0, (player["lvl"] - 1) / 10.0)
-    enemy = copy.deepcopy(enemy_base)
-    enemy["hp"] = max(1, int(enemy_base["hp"] * (1 + scale)))
-    enemy["atk"] = max(1, int(enemy_base["atk"] * (1 + scale)))
-    enemy["def"] = max(0, int(enemy_base["def"] * (1 + scale)))
-    enemy["exp"] = max(1, int(enemy_base["exp"] * (1 + scale)))
-    enemy["gold"] = max(0, int(enemy_base["gold"] * (1 + scale)))
+# Stat musuh per level dihitung sekali per musuh dasar menjadi tabel
+# (indeks = level 1..MAX_LEVEL), jadi encounter cukup lookup + satu Enemy.
+def _scale_row(hp, atk, defense, exp, gold, lvl):
+    scale = 1 + max(0.0, (lvl - 1) / 10.0)
+    return (max(1, int(hp * scale)), max(1, int(atk * scale)), max(0, int(defense * scale)),
+            max(1, int(exp * scale)), max(0, int(gold * scale)))
+
+@lru_cache(maxsize=None)
+def _level_table(hp, atk, defense, exp, gold):
+    return tuple(_scale_row(hp, atk, defense, exp, gold, lvl) for lvl in range(MAX_LEVEL + 1))
+
+def _base_stats(enemy_base):
+    return (enemy_base["hp"], enemy_base["atk"], enemy_base["def"],
+            enemy_base["exp"], enemy_base["gold"])
+
+def build_enemy_tables(*rosters):
+    """Validasi musuh dasar lalu isi tabel level; ValueError jika ada field yang hilang."""
+    problems = []
+    for roster in rosters:
+        for base in roster:
+            missing = [k for k in ENEMY_FIELDS if k not in base]
+            if missing:
+                problems.append(f"{base.get('name', '?')}: tidak ada {', '.join(missing)}")
+            else:
+                _level_table(*_base_stats(base))
+    if problems:
+        raise ValueError("Data musuh tidak lengkap: " + "; ".join(problems))
+
+@profiled()
+def scaled_enemy(enemy_base, lvl=None):
+    """Buat Enemy dari musuh dasar dengan stat diskalakan ke level pemain (atau `lvl`)."""
+    if lvl is None:
+        lvl = current_player().lvl
+    stats = _base_stats(enemy_base)
+    if lvl <= MAX_LEVEL:
+        row = _level_table(*stats)[max(lvl, 0)]
+    else:
+        row = _scale_row(*stats, lvl)
+    enemy = Enemy()
+    enemy.name = enemy_base["name"]
+    enemy.hp, enemy.atk, enemy.defense, enemy.exp, enemy.gold = row
+    enemy.drop = enemy_base.get("drop")
+    enemy.spd = enemy_base.get("spd", DEFAULT_ENEMY_SPD)
+    enemy.summon = enemy_base.get("summon")
     return enemy
 
 # === ENEMY BASE (semua musuh normal & baru) ===
-ENEMIES_BASE = [
-    # Musuh awal
-    {"name":"Slime","hp":60,"atk":6,"def":1,"exp":25,"gold":10,"drop":"Potion"},
-    {"name":"Goblin","hp":80,"atk":8,"def":2,"exp":30,"gold":20,"drop":"Iron Sword"},
-    {"name":"Wolf","hp":100,"atk":10,"def":3,"exp":40,"gold":35,"drop":"Leather Armor"},
-
-    # Musuh baru
-    {"name":"Kelelawar","hp":55,"atk":10,"def":2,"exp":45,"gold":25,"drop":"Hi-Potion"},
-    {"name":"Beruang","hp":160,"atk":20,"def":8,"exp":90,"gold":50,"drop":["Steel Armor","Bear Fur"]},
-    {"name":"Lizardman","hp":180,"atk":28,"def":12,"exp":150,"gold":85,"drop":["Mega Potion","alizard Scale"]},
-]
+ENEMIES_BASE = CONTENT["enemies"]["normal"]
 
 # === MINI BOSS DATA ===
-MINI_BOSSES = [
-    {"name":"Orc Warlord 🪓","hp":300,"atk":35,"def":10,"exp":350,"gold":200,"drop":["Battle Axe","Orch Tooth"]},
-    {"name":"Lizard King 🦎👑","hp":400,"atk":42,"def":14,"exp":450,"gold":280,"drop":"Dragon Scale Armor"},
-    {"name":"Shadow Bear 🐻‍⬛","hp":500,"atk":50,"def":18,"exp":600,"gold":350,"drop":["Dark Claw","Shadow Essence"]},
+MINI_BOSSES = CONTENT["enemies"]["mini_bosses"]
+
+# === DUNGEON DATA ===
+# Musuh per kelompok lantai (1–3, 4–6, 7–9), mini boss dungeon dan bos tiap
+# lantai ke-10. Setiap putaran 10 lantai berikutnya musuh naik
+# DUNGEON_DEPTH_LEVEL_STEP level dan peluang mini boss naik (sampai batas).
+DUNGEON_ENEMIES = CONTENT["dungeon"]["tiers"]
+DUNGEON_MINI_BOSSES = CONTENT["dungeon"]["mini_bosses"]
+DUNGEON_BOSS = CONTENT["dungeon"]["boss"]
+DUNGEON_FLOORS = CONTENT["dungeon"]["floors"]
+DUNGEON_MINI_BOSS_CHANCE = CONTENT["dungeon"]["mini_boss_chance"]
+DUNGEON_CLEAR_REWARD = CONTENT["dungeon"]["clear_reward"]
+DUNGEON_MINI_BOSS_STEP = CONTENT["dungeon"]["mini_boss_chance_step"]
+DUNGEON_MINI_BOSS_MAX = CONTENT["dungeon"]["mini_boss_chance_max"]
+DUNGEON_DEPTH_LEVEL_STEP = CONTENT["dungeon"]["depth_level_step"]
+DUNGEON_ROOMS = CONTENT["dungeon"]["rooms"]
+DUNGEON_LOOT = CONTENT["dungeon"]["loot"]
+
+def dungeon_enemy_base(floor, rng=None, mini_boss_chance=None):
+    """Pilih musuh dasar untuk lantai `floor`; kembalikan (base, mini_boss?).
+
+    Lantai kelipatan DUNGEON_FLOORS selalu bos; di antaranya kelompok musuh
+    mengikuti posisi lantai dalam putaran (1–3, 4–6, 7–9).
+    """
+    if rng is None:
+        rng = current_session().rng
+    if floor % DUNGEON_FLOORS == 0:
+        return DUNGEON_BOSS, False
+    if mini_boss_chance is None:
+        mini_boss_chance = DUNGEON_MINI_BOSS_CHANCE
+    if rng.random() < mini_boss_chance:
+        return rng.choice(DUNGEON_MINI_BOSSES), True
+    tier = min(((floor - 1) % DUNGEON_FLOORS) // 3, len(DUNGEON_ENEMIES) - 1)
+    return rng.choice(DUNGEON_ENEMIES[tier]), False
+
+build_enemy_tables(ENEMIES_BASE, MINI_BOSSES, DUNGEON_MINI_BOSSES, [DUNGEON_BOSS], *DUNGEON_ENEMIES)
+
+@lru_cache(maxsize=None)
+def _enemy_bases():
+    bases = {}
+    for e in ENEMIES_BASE + MINI_BOSSES + DUNGEON_MINI_BOSSES + [DUNGEON_BOSS]:
+        bases.setdefault(e["name"], e)
+    for tier in DUNGEON_ENEMIES:
+        for e in tier:
+            bases.setdefault(e["name"], e)
+    return bases
+
+def enemy_base(name):
+    """Musuh dasar bernama `name` dari semua roster (untuk summon)."""
+    return _enemy_bases()[name]
+
+def pack_size(base, rng=None):
+    """Jumlah musuh satu encounter: 1, atau ukuran kawanan jika base punya "pack"."""
+    pack = base.get("pack")
+    if not pack:
+        return 1
+    if rng is None:
+        rng = current_session().rng
+    if rng.random() >= pack["chance"]:
+        return 1
+    return rng.randint(*pack["size"])
+
+# === WILAYAH & TABEL ENCOUNTER ===
+# Setiap wilayah (data/regions.json) punya tabel encounter berbobot yang
+# dibatasi level. Daftar musuh yang boleh muncul hanya berubah di level
+# min_lvl / max_lvl+1 entri, jadi satu AliasTable dibuat per rentang level
+# itu dan band_of memetakan level -> rentang. Satu undian = satu lookup +
+# satu random(), berapa pun jumlah entri. reload_regions() membaca ulang
+# file saat berubah dan hanya membangun ulang wilayah yang isinya berbeda;
+# saat berburu file cukup diperiksa sekali per REGION_RELOAD_EVERY detik
+# (poll_regions), bukan setiap kali.
+REGION_FILE = os.path.join(CONTENT_DIR, "regions.json")
+REGION_LOCKED = 0xFFFF
+REGION_RELOAD_EVERY = 5.0
+
+class AliasTable:
+    """Sampling berbobot O(1) dengan metode alias (Vose)."""
+    __slots__ = ("items", "prob", "alias")
+
+    def __init__(self, items, weights):
+        n = len(items)
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        prob, alias = [1.0] * n, list(range(n))
+        small = [i for i, w in enumerate(scaled) if w < 1.0]
+        large = [i for i, w in enumerate(scaled) if w >= 1.0]
+        while small and large:
+            lo, hi = small.pop(), large.pop()
+            prob[lo], alias[lo] = scaled[lo], hi
+            scaled[hi] -= 1.0 - scaled[lo]
+            (small if scaled[hi] < 1.0 else large).append(hi)
+        # sisa di small/large bernilai ~1.0 (pembulatan float): prob tetap 1
+        self.items = tuple(items)
+        self.prob = array("d", prob)
+        self.alias = array("l", alias)
+
+    def sample(self, rng):
+        u = rng.random() * len(self.items)
+        i = int(u)
+        return self.items[i if u - i < self.prob[i] else self.alias[i]]
+
+    def sample_many(self, n, rng):
+        """`n` undian sekaligus (untuk simulator)."""
+        items, prob, alias, k = self.items, self.prob, self.alias, len(self.items)
+        picks = []
+        for _ in range(n):
+            u = rng.random() * k
+            i = int(u)
+            picks.append(items[i if u - i < prob[i] else alias[i]])
+        return picks
+
+@dataclass(frozen=True, eq=False)
+class Region:
+    key: str
+    name: str
+    intro: str
+    min_lvl: int
+    spec: dict        # data mentah, dibandingkan saat reload
+    tables: tuple     # AliasTable per rentang level
+    band_of: array    # level (0..MAX_LEVEL) -> indeks di tables, REGION_LOCKED = terkunci
+
+def build_region(key, spec):
+    """Region dari data mentah: satu AliasTable per rentang level yang isinya sama."""
+    entries = spec["encounters"]
+    start = spec.get("min_lvl", 1)
+    edges = sorted({start} | {e.get("min_lvl", 1) for e in entries}
+                   | {e["max_lvl"] + 1 for e in entries if "max_lvl" in e})
+    edges = [lvl for lvl in edges if start <= lvl <= MAX_LEVEL]
+    tables = []
+    for lvl in edges:
+        live = [e for e in entries if e.get("min_lvl", 1) <= lvl <= e.get("max_lvl", MAX_LEVEL)]
+        tables.append(AliasTable([enemy_base(e["enemy"]) for e in live], [e["weight"] for e in live]))
+    band_of = array("H", (bisect_right(edges, lvl) - 1 if lvl >= start else REGION_LOCKED
+                          for lvl in range(MAX_LEVEL + 1)))
+    return Region(key, spec["name"], spec["intro"], start, spec, tuple(tables), band_of)
+
+def _region_stamp():
+    try:
+        st = os.stat(REGION_FILE)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+REGIONS = {key: build_region(key, spec) for key, spec in CONTENT["regions"].items()}
+_REGION_STATE = {"stamp": _region_stamp(), "checked": time.monotonic()}
+_REGION_LOCK = threading.Lock()
 
-]
+def reload_regions(force=False):
+    """Baca ulang regions.json jika berubah; kembalikan kunci wilayah yang dibangun ulang/dihapus.
+
+    Data yang tidak valid diabaikan (tabel lama tetap dipakai) dan dilaporkan
+    lewat ContentError.
+    """
+    global REGIONS
+    stamp = _region_stamp()
+    if not force and stamp == _REGION_STATE["stamp"]:
+        return []
+    with _REGION_LOCK:
+        if not force and stamp == _REGION_STATE["stamp"]:
+            return []
+        _REGION_STATE["stamp"] = stamp
+        try:
+            with open(REGION_FILE, "rb") as f:
+                raw = json.loads(f.read())
+        except (OSError, ValueError) as e:
+            raise ContentError(f"{REGION_FILE}: {e}") from None
+        problems = region_problems(raw, _enemy_bases().keys())
+        if problems:
+            raise ContentError("Data wilayah tidak valid:\n  " + "\n  ".join(problems))
+        regions, changed = {}, []
+        for key, spec in raw.items():
+            old = REGIONS.get(key)
+            if old is not None and old.spec == spec:
+                regions[key] = old
+            else:
+                regions[key] = build_region(key, spec)
+                changed.append(key)
+        changed.extend(k for k in REGIONS if k not in raw)
+        REGIONS = regions
+    return changed
+
+def poll_regions(now=None):
+    """reload_regions() paling sering sekali per REGION_RELOAD_EVERY detik."""
+    now = time.monotonic() if now is None else now
+    if now - _REGION_STATE["checked"] < REGION_RELOAD_EVERY:
+        return []
+    _REGION_STATE["checked"] = now
+    return reload_regions()
+
+def unlocked_regions(lvl):
+    return [r for r in REGIONS.values() if r.min_lvl <= lvl]
+
+def encounter_table(region, lvl):
+    """AliasTable wilayah untuk level `lvl`; None jika wilayah belum terbuka."""
+    band = region.band_of[max(0, min(lvl, MAX_LEVEL))]
+    return None if band == REGION_LOCKED else region.tables[band]
+
+def encounter_base(region, lvl=None, rng=None):
+    """Satu musuh dasar acak dari wilayah sesuai level (O(1))."""
+    if lvl is None:
+        lvl = current_player().lvl
+    if rng is None:
+        rng = current_session().rng
+    return encounter_table(region, lvl).sample(rng)
+
+def encounter_batch(region, lvl, n, rng=None):
+    """`n` musuh dasar sekaligus untuk simulator."""
+    if rng is None:
+        rng = current_session().rng
+    return encounter_table(region, lvl).sample_many(n, rng)
+
+def choose_region(p):
+    """Tanya wilayah berburu jika lebih dari satu yang terbuka."""
+    regions = unlocked_regions(p.lvl)
+    if len(regions) == 1:
+        return regions[0]
+    out("\nPilih wilayah berburu:")
+    for i, r in enumerate(regions, 1):
+        out(f"{i}. {r.name} (Lv.{r.min_lvl}+)")
+    ch = ask("Wilayah> ")
+    if ch.isdigit() and 1 <= int(ch) <= len(regions):
+        return regions[int(ch) - 1]
+    return regions[0]
 
 # === HUNT / RANDOM ENCOUNTER ===
 def random_hunt():
-    slow("\n🌲 Kamu memulai perburuan di hutan...")
-    base = random.choice(ENEMIES_BASE)  # Ambil musuh acak dari ENEMIES_BASE
-    enemy = scaled_enemy(base)          # Sesuaikan level musuh dengan pemain
-    battle(enemy)                       # Mulai pertarungan
+    try:
+        poll_regions()
+    except ContentError as e:
+        out(f"⚠️ {e}")   # data wilayah rusak: tetap pakai tabel lama
+    p = current_player()
+    region = choose_region(p)
+    slow("\n" + region.intro)
+    base = encounter_base(region, p.lvl)
+    # Sesuaikan level musuh dengan pemain; Slime/Wolf kadang datang berkawanan
+    battle([scaled_enemy(base) for _ in range(pack_size(base))])
 
 # === CENTRALIZED DEFEAT HANDLER (QUEST FIX) ===
 def handle_enemy_defeat(enemy):
-    """Tangani reward, quest progress, drop, level up dan simpan saat musuh tewas."""
-    global player
+    """Tangani reward, quest progress, drop, level up dan simpan saat musuh tewas.
 
-    slow(f"\n🏆 Kamu mengalahkan {enemy['name']}!")
-    player["exp"] += enemy.get("exp", 0)
-    player["gold"] += enemy.get("gold", 0)
-    slow(f"Kamu mendapatkan {enemy.get('exp', 0)} EXP dan {enemy.get('gold', 0)} gold.")
+    Kembalikan drop yang didapat (None jika tidak ada).
+    """
+    p = current_player()
+
+    slow(f"\n🏆 Kamu mengalahkan {enemy.name}!")
+    p.exp += enemy.exp
+    p.gold += enemy.gold
+    p.kills += 1
+    slow(f"Kamu mendapatkan {enemy.exp} EXP dan {enemy.gold} gold.")
 
     # === Update progress quest ===
-    q = player.get("quest")
-    if q:
-        enemy_name = str(enemy.get("name", "")).strip().lower()
-        target_name = str(q.get("target_name", q.get("target", ""))).strip().lower()
-        if enemy_name == target_name:
-            q["progress"] = q.get("progress", 0) + 1
-            total = q.get("count", q.get("target", 0))
-            icon = MONSTER_ICONS.get(enemy["name"], "❓")
-            slow(f"📜 Quest Update: {icon} {enemy['name']} {q['progress']}/{total}")
-            save_game()
-            # === Jika quest selesai ===
-            if q["progress"] >= total:
-                slow("🎉 Kamu telah menyelesaikan quest! Kembali ke NPC untuk klaim hadiah!")
+    for q in p.quests.on_kill(enemy.name):
+        icon = MONSTER_ICONS.get(enemy.name, "❓")
+        slow(f"📜 Quest Update: {icon} {enemy.name} {q['progress']}/{q['count']}")
+        # === Jika quest selesai ===
+        if q["progress"] >= q["count"]:
+            slow(f"🎉 Quest '{q['title']}' selesai! Kembali ke NPC untuk klaim hadiah!")
 
     # === Drop chance ===
-    if random.random() < min(0.75, 0.3 + player["lvl"] / 200):
-        drop = enemy.get("drop")
+    if rng.random() < min(0.75, 0.3 + p.lvl / 200):
+        drop = enemy.drop
         if drop:
-            player["inventory"].append(drop)
-            slow(f"🎁 {enemy['name']} menjatuhkan {drop}!")
+            p.inventory.add(drop)
+            drop_txt = ", ".join(drop) if isinstance(drop, list) else drop
+            slow(f"🎁 {enemy.name} menjatuhkan {drop_txt}!")
+    else:
+        drop = None
 
     # === Level up check ===
     level_up_check()
     save_game()
+    return drop
 
 # === Ikon untuk monster ===
-MONSTER_ICONS = {
-    "Slime": "🟢",
-    "Goblin": "👺",
-    "Wolf": "🐺",
-    "Kelelawar": "🦇",
-    "Beruang": "🐻",
-    "Orc": "💀",
-    "Lizardman": "🦎",
+MONSTER_ICONS = CONTENT["enemies"]["icons"]
+
+# === AUTO BATTLE (policy) ===
+# Policy memilih kode menu battle() tiap giliran. Dipakai opsi "Auto" di
+# menu battle dan oleh simulator (atw_sim.py) sebagai lawan pembanding.
+ACT_SERANG, ACT_SLASH, ACT_MAGIC, ACT_ITEM, ACT_KABUR = "1", "2", "3", "4", "5"
+ACTION_NAMES = {ACT_SERANG: "Serang", ACT_SLASH: "Slash", ACT_MAGIC: "Magic",
+                ACT_ITEM: "Item", ACT_KABUR: "Kabur"}
+BOSS_NAMES = frozenset(e["name"] for e in MINI_BOSSES + DUNGEON_MINI_BOSSES + [DUNGEON_BOSS])
+AUTO_POLICY = "expectimax"
+
+def has_magic(p):
+    return p.magic["name"] != "Tidak ada skill"
+
+def battle_potions(p):
+    """Consumable yang bisa dipakai di battle, heal terbesar dulu."""
+    return sorted((k for k in p.inventory.consumables() if BATTLE_HEALS.get(k)),
+                  key=lambda k: -BATTLE_HEALS[k])
+
+def action_damage(p, enemy):
+    """{aksi: damage} untuk aksi serangan yang MP-nya cukup."""
+    wpn = p.weapon.get("atk", 0)
+    dmg = {ACT_SERANG: max(MIN_DMG_SERANG, dmg_serang(p.atk, wpn, p.lvl, enemy.defense))}
+    if p.mp >= SLASH_MP_COST:
+        dmg[ACT_SLASH] = max(MIN_DMG_SLASH, dmg_slash(p.atk, wpn, p.lvl, enemy.defense))
+    if has_magic(p) and p.mp >= p.magic["mp_cost"]:
+        dmg[ACT_MAGIC] = max(MIN_DMG_MAGIC, dmg_magic(p.atk, p.lvl, p.magic["power"], enemy.defense))
+    return dmg
+
+def enemy_damage(p, enemy):
+    return max(MIN_DMG_ENEMY, dmg_enemy(enemy.atk, p.defense, p.armor.get("def", 0)))
+
+class BattlePolicy:
+    """Dasar policy: choose() -> kode aksi, pick_item() -> potion yang dipakai."""
+    name = "dasar"
+
+    def choose(self, p, enemy):
+        raise NotImplementedError
+
+    def pick_item(self, p):
+        potions = battle_potions(p)
+        return potions[0] if potions else None
+
+class GreedyPolicy(BattlePolicy):
+    """Damage terbesar; minum potion hanya jika serangan musuh berikutnya mematikan."""
+    name = "greedy"
+
+    def choose(self, p, enemy):
+        dmg = action_damage(p, enemy)
+        best = max(dmg, key=dmg.get)
+        if dmg[best] < enemy.hp and p.hp <= enemy_damage(p, enemy) and battle_potions(p):
+            return ACT_ITEM
+        return best
+
+class RulePolicy(BattlePolicy):
+    """Heal di bawah `heal_below` HP; di luar boss sisakan `mp_reserve` MP untuk boss."""
+    name = "rule"
+
+    def __init__(self, heal_below=0.35, mp_reserve=0.5):
+        self.heal_below = heal_below
+        self.mp_reserve = mp_reserve
+
+    def choose(self, p, enemy):
+        dmg = action_damage(p, enemy)
+        if dmg[ACT_SERANG] >= enemy.hp:
+            return ACT_SERANG
+        if p.hp < max_hp_for(p.lvl) * self.heal_below and battle_potions(p):
+            return ACT_ITEM
+        if enemy.name in BOSS_NAMES:
+            return max(dmg, key=dmg.get)
+        reserve = max_mp_for(p.lvl) * self.mp_reserve
+        cost = {ACT_SERANG: 0, ACT_SLASH: SLASH_MP_COST, ACT_MAGIC: p.magic["mp_cost"]}
+        usable = {a: d for a, d in dmg.items() if p.mp - cost[a] >= reserve or a == ACT_SERANG}
+        return max(usable, key=usable.get)
+
+class ExpectimaxPolicy(BattlePolicy):
+    """Pencarian expectimax sedalam `depth` giliran memakai rumus damage battle().
+
+    Satu-satunya simpul acak adalah kabur (FLEE_CHANCE); gagal kabur tidak
+    memberi giliran ke musuh. Nilai simpul di-memo pada (hp, mp, hp musuh,
+    potion, kedalaman) dan memo dikosongkan saat damage/potion berubah.
+    """
+    name = "expectimax"
+    WIN, LOSS, FLED = 1000.0, -1000.0, -300.0
+    MEMO_LIMIT = 200000
+
+    def __init__(self, depth=4):
+        self.depth = depth
+        self._ctx = None
+        self._memo = {}
+
+    def _prepare(self, p, enemy):
+        wpn = p.weapon.get("atk", 0)
+        potions = battle_potions(p)
+        magic = has_magic(p)
+        ctx = (
+            max(MIN_DMG_SERANG, dmg_serang(p.atk, wpn, p.lvl, enemy.defense)),
+            max(MIN_DMG_SLASH, dmg_slash(p.atk, wpn, p.lvl, enemy.defense)),
+            max(MIN_DMG_MAGIC, dmg_magic(p.atk, p.lvl, p.magic["power"], enemy.defense)) if magic else 0,
+            p.magic["mp_cost"] if magic else None,
+            enemy_damage(p, enemy),
+            max_hp_for(p.lvl),
+            max_mp_for(p.lvl),
+            tuple(BATTLE_HEALS[k] for k in potions),
+        )
+        if ctx != self._ctx or len(self._memo) > self.MEMO_LIMIT:
+            self._ctx = ctx
+            self._memo = {}
+        return tuple(p.inventory.count(k) for k in potions)
+
+    def _moves(self, php, pmp, ehp, pots):
+        """(aksi, [(peluang, hasil)]); hasil = nilai terminal atau state berikut."""
+        d_serang, d_slash, d_magic, magic_cost, d_enemy, max_hp, max_mp, heals = self._ctx
+        hits = [(ACT_SERANG, d_serang, 0)]
+        if pmp >= SLASH_MP_COST:
+            hits.append((ACT_SLASH, d_slash, SLASH_MP_COST))
+        if magic_cost is not None and pmp >= magic_cost:
+            hits.append((ACT_MAGIC, d_magic, magic_cost))
+        for act, dmg, cost in hits:
+            if ehp - dmg <= 0:
+                # menang: sisa HP, MP dan potion tetap bernilai untuk lantai berikutnya
+                spare = php + sum(h * n for h, n in zip(heals, pots))
+                yield act, [(1.0, self.WIN + 100.0 * spare / max_hp + 50.0 * (pmp - cost) / max_mp)]
+            else:
+                yield act, [(1.0, (php - d_enemy, pmp - cost, ehp - dmg, pots))]
+        for i, n in enumerate(pots):
+            if n:
+                left = pots[:i] + (n - 1,) + pots[i + 1:]
+                yield ACT_ITEM, [(1.0, (min(php + heals[i], max_hp) - d_enemy, pmp, ehp, left))]
+                break
+        yield ACT_KABUR, [(FLEE_CHANCE, self.FLED), (1.0 - FLEE_CHANCE, (php, pmp, ehp, pots))]
+
+    def _eval(self, php, pmp, ehp, pots):
+        d_serang, d_slash, _, _, d_enemy, _, _, heals = self._ctx
+        # perbandingan giliran untuk bertahan vs giliran untuk menghabisi musuh,
+        # dinormalkan ke (-500, 500) supaya selalu di antara LOSS dan WIN
+        survive = (php + sum(h * n for h, n in zip(heals, pots))) / d_enemy
+        kill = ehp / max(d_serang, d_slash if pmp >= SLASH_MP_COST else 0)
+        return 500.0 * (survive - kill) / (survive + kill)
+
+    def _value(self, state, depth):
+        if state[0] <= 0:
+            return self.LOSS
+        key = state + (depth,)
+        v = self._memo.get(key)
+        if v is not None:
+            return v
+        if depth == 0:
+            v = self._eval(*state)
+        else:
+            v = max(self._expect(outcomes, depth) for _, outcomes in self._moves(*state))
+        self._memo[key] = v
+        return v
+
+    def _expect(self, outcomes, depth):
+        total = 0.0
+        for prob, res in outcomes:
+            # bonus kedalaman: menang lebih cepat lebih baik
+            total += prob * (res + depth if isinstance(res, float) else self._value(res, depth - 1))
+        return total
+
+    def choose(self, p, enemy):
+        state = (p.hp, p.mp, enemy.hp, self._prepare(p, enemy))
+        best, best_v = ACT_SERANG, None
+        for act, outcomes in self._moves(*state):
+            v = self._expect(outcomes, self.depth)
+            if best_v is None or v > best_v:
+                best, best_v = act, v
+        return best
+
+AUTO_POLICIES = {
+    "greedy": GreedyPolicy,
+    "rule": RulePolicy,
+    "expectimax": ExpectimaxPolicy,
 }
 
+def auto_policy():
+    """Policy auto-battle milik session aktif (dibuat saat pertama dipakai)."""
+    sess = current_session()
+    if sess.auto_policy is None:
+        sess.auto_policy = AUTO_POLICIES[AUTO_POLICY]()
+    return sess.auto_policy
+
+# === TURN SCHEDULER ===
+# Urutan giliran diatur antrian prioritas (heap) berisi (waktu aksi berikut,
+# nomor urut, spd, aktor). Jeda antar aksi = ACTION_TICKS // spd, jadi aktor
+# yang lebih cepat bertindak lebih sering; nomor urut memecah seri sesuai
+# urutan masuk (pemain selalu masuk pertama). Dengan spd sama, 1v1 tetap
+# bergantian pemain-musuh seperti dulu. Aktor yang tewas tidak dicari di
+# heap: ia dibuang saat keluar dari antrian, jadi pop/push tetap O(log n).
+ACTION_TICKS = 1000
+DEFAULT_ENEMY_SPD = 7   # sama dengan spd awal pemain
+
+def action_delay(spd):
+    return ACTION_TICKS // max(1, min(spd, ACTION_TICKS))
+
+class TurnQueue:
+    """Antrian giliran berbasis heap; aktor berikut didapat dalam O(log n)."""
+    __slots__ = ("now", "_heap", "_seq")
+
+    def __init__(self):
+        self.now = 0
+        self._heap = []
+        self._seq = 0
+
+    def add(self, actor, spd, delay=0):
+        """Masukkan aktor yang bertindak `delay` tick dari sekarang."""
+        self._seq += 1
+        heappush(self._heap, (self.now + delay, self._seq, spd, actor))
+
+    def pop(self):
+        """(aktor, spd) yang bertindak berikutnya; jam maju ke waktunya."""
+        self.now, _, spd, actor = heappop(self._heap)
+        return actor, spd
+
+    def requeue(self, actor, spd):
+        """Jadwalkan aksi berikut aktor satu jeda dari sekarang."""
+        self.add(actor, spd, action_delay(spd))
+
+    def __len__(self):
+        return len(self._heap)
+
+class BattleGroup:
+    """Peserta satu pertarungan: pemain, musuh (termasuk summon) dan antriannya."""
+
+    def __init__(self, p, foes):
+        self.p = p
+        self.queue = TurnQueue()
+        self.foes = []
+        self.labels = {}
+        self.summoned = {}
+        self.defeated = []   # [(musuh, drop)] sesuai urutan tewas
+        self._names = {}
+        self._seen = {}
+        for e in foes:
+            self._names[e.name] = self._names.get(e.name, 0) + 1
+        self.queue.add(p, p.spd)
+        for e in foes:
+            self.join(e)
+
+    def join(self, enemy, delay=0):
+        """Tambahkan musuh; nama kembar diberi nomor (Slime #1, Slime #2, ...)."""
+        n = self._seen[enemy.name] = self._seen.get(enemy.name, 0) + 1
+        many = n > 1 or self._names.get(enemy.name, 0) > 1
+        self.labels[id(enemy)] = f"{enemy.name} #{n}" if many else enemy.name
+        self.foes.append(enemy)
+        self.queue.add(enemy, enemy.get("spd") or DEFAULT_ENEMY_SPD, delay)
+
+    def label(self, enemy):
+        return self.labels[id(enemy)]
+
+    def alive(self):
+        """Musuh yang masih hidup (yang tewas sekalian dibuang dari daftar)."""
+        self.foes = [e for e in self.foes if e.hp > 0]
+        return self.foes
+
+    def try_summon(self, enemy):
+        """Musuh dengan data "summon" kadang memanggil bantuan; True jika berhasil."""
+        summon = enemy.get("summon")
+        if not summon or self.summoned.get(id(enemy), 0) >= summon["max"]:
+            return False
+        if rng.random() >= summon["chance"]:
+            return False
+        self.summoned[id(enemy)] = self.summoned.get(id(enemy), 0) + 1
+        ally = scaled_enemy(enemy_base(summon["name"]))
+        self.join(ally, action_delay(ally.spd))
+        icon = MONSTER_ICONS.get(ally.name, "❓")
+        slow(f"📣 {self.label(enemy)} memanggil bantuan: {icon} {self.label(ally)}!")
+        return True
+
+def _pick_target(group, foes):
+    """Tanya target jika musuh lebih dari satu; None jika pilihan tidak valid."""
+    if len(foes) == 1:
+        return foes[0]
+    for i, e in enumerate(foes, 1):
+        out(f"{i}. {group.label(e)} HP:{e.hp}")
+    ch = ask("Target> ")
+    if not ch.isdigit() or not 1 <= int(ch) <= len(foes):
+        slow("Pilihan tidak valid.")
+        return None
+    return foes[int(ch) - 1]
+
 # === BATTLE (dengan skill MP) ===
-def battle(enemy):
-    global player
-    icon = MONSTER_ICONS.get(enemy["name"], "❓")
-    slow(f"\nKamu menghadapi {icon} {enemy['name']}!")
+@profiled()
+def battle(enemies, policy=None):
+    """Pertarungan melawan satu musuh atau kelompok (list); 1v1 = kelompok berisi satu.
 
-    # Ambil bonus dari weapon & armor
-    weapon_bonus = player.get("weapon", {}).get("atk", 0)
-    armor_bonus = player.get("armor", {}).get("def", 0)
-
-    while enemy["hp"] > 0 and player["hp"] > 0:
-        print(f"\n{player['name']} HP:{player['hp']} MP:{player['mp']} | {enemy['name']} HP:{enemy['hp']}")
-        print("1. Serang")
-        print("2. Skill Slash (5 MP)")
-        if player["magic"]["name"] != "Tidak ada skill":
-            print(f"3. Gunakan Magic ({player['magic']['name']} - {player['magic']['mp_cost']} MP)")
-        print("4. Gunakan Item (dari inventory)")
-        print("5. Kabur")
-        ch = input("> ")
-
-        # === Serangan Normal ===
-        if ch == "1":
-            dmg = player["atk"] + weapon_bonus + player["lvl"] - enemy["def"]
-            dmg = max(1, dmg)
-            enemy["hp"] -= dmg
-            slow(f"🗡️ Kamu menyerang dan memberi {dmg} damage!")
+    Kembalikan "menang", "kalah" atau "kabur".
+    """
+    if not isinstance(enemies, list):
+        enemies = [enemies]
+    foes = [Enemy.from_dict(e) if isinstance(e, dict) else e for e in enemies]
+    p = current_player()
+    if len(foes) == 1:
+        icon = MONSTER_ICONS.get(foes[0].name, "❓")
+        slow(f"\nKamu menghadapi {icon} {foes[0].name}!")
+    else:
+        counts = {}
+        for e in foes:
+            counts[e.name] = counts.get(e.name, 0) + 1
+        slow("\nKamu menghadapi kawanan " + ", ".join(
+            f"{MONSTER_ICONS.get(n, '❓')} {n} x{c}" for n, c in counts.items()) + "!")
 
-        # === Skill Slash ===
-        elif ch == "2":
-            if player["mp"] < 5:
-                slow("❌ MP tidak cukup untuk Slash!")
-                continue
-            player["mp"] -= 5
-            dmg = (player["atk"] + weapon_bonus) * 2 + player["lvl"] - enemy["def"]
-            dmg = max(5, dmg)
-            enemy["hp"] -= dmg
-            slow(f"💥 Slash! Kamu memberi {dmg} damage! (MP -5)")
-
-        # === Skill Magic ===
-        elif ch == "3" and player["magic"]["name"] != "Tidak ada skill":
-            skill = player["magic"]
-            if player["mp"] < skill["mp_cost"]:
-                slow(f"❌ MP tidak cukup untuk {skill['name']}!")
-                continue
+    return run_battle(BattleGroup(p, foes), policy)
 
-            player["mp"] -= skill["mp_cost"]
-            dmg = (player["atk"] + player["lvl"]) + skill["power"]
-            dmg = max(10, dmg - enemy["def"])
-            enemy["hp"] -= dmg
-            slow(f"🔥 Kamu melempar {skill['name']} dan memberi {dmg} damage! (-{skill['mp_cost']} MP)")
+def run_battle(group, policy=None):
+    """Jalankan giliran `group` sampai selesai; hasil sama dengan battle().
 
-        # === Gunakan Item ===
-        elif ch == "4":
-            use_item_in_battle()
+    Dengan `policy` (BattlePolicy) semua aksi pemain dipilih otomatis sejak
+    giliran pertama, jadi bisa dijalankan tanpa input (atw_sim.py).
+    """
+    p = group.p
+    # Ambil bonus dari weapon & armor
+    weapon_bonus = p.weapon.get("atk", 0)
+    armor_bonus = p.armor.get("def", 0)
+    lap = profile_lap("battle_turn", None)
 
-        # === Kabur ===
-        elif ch == "5":
-            if random.random() < 0.5:
-                slow("🏃 Kamu berhasil kabur!")
-                return
-            else:
-                slow("❌ Gagal kabur!")
+    try:
+        while True:
+            actor, spd = group.queue.pop()
+            if actor is not p:
+                enemy = actor
+                if enemy.hp <= 0:
+                    continue   # tewas sebelum gilirannya: keluar dari antrian
+
+                # === Giliran musuh ===
+                if not group.try_summon(enemy):
+                    enemy_dmg = max(MIN_DMG_ENEMY, dmg_enemy(enemy.atk, p.defense, armor_bonus))
+                    p.hp -= enemy_dmg
+                    slow(f"⚔️ {group.label(enemy)} menyerang dan memberi {enemy_dmg} damage! (HP kamu: {p.hp})")
+
+                # === Jika pemain kalah ===
+                if p.hp <= 0:
+                    slow("💀 Kamu kalah... Respawn sebagian.")
+                    p.hp = max_hp_for(p.lvl)
+                    p.mp = max_mp_for(p.lvl)
+                    p.gold = max(0, p.gold - 10)
+                    save_game()
+                    return "kalah"
+                group.queue.requeue(enemy, spd)
                 continue
-        else:
-            slow("Pilihan tidak valid.")
-            continue
 
-        # === Cek jika musuh mati ===
-        if enemy["hp"] <= 0:
-            slow(f"\n🏆 Kamu mengalahkan {enemy['name']}!")
-            handle_enemy_defeat(enemy)
-            return
+            # === Giliran pemain (diulang sampai ada aksi yang memakai giliran) ===
+            lap = profile_lap("battle_turn", lap)
+            while True:
+                foes = group.alive()
+                out(f"\n{p.name} HP:{p.hp} MP:{p.mp} | "
+                    + " | ".join(f"{group.label(e)} HP:{e.hp}" for e in foes))
+                target = None
+                if policy is None:
+                    out("1. Serang")
+                    out("2. Skill Slash (5 MP)")
+                    if p.magic["name"] != "Tidak ada skill":
+                        out(f"3. Gunakan Magic ({p.magic['name']} - {p.magic['mp_cost']} MP)")
+                    out("4. Gunakan Item (dari inventory)")
+                    out("5. Kabur")
+                    out("6. Auto")
+                    ch = ask("> ")
+                    if ch == "6":
+                        policy = auto_policy()
+                        slow(f"🤖 Auto-battle ({policy.name}) aktif sampai pertarungan selesai.")
+                if policy is not None:
+                    # auto: habisi musuh dengan HP terkecil dulu
+                    target = min(foes, key=lambda e: e.hp)
+                    ch = policy.choose(p, target)
+                    slow(f"🤖 Auto: {ACTION_NAMES[ch]}")
+
+                # === Serangan Normal ===
+                if ch == "1":
+                    if target is None:
+                        target = _pick_target(group, foes)
+                        if target is None:
+                            continue
+                    dmg = max(MIN_DMG_SERANG, dmg_serang(p.atk, weapon_bonus, p.lvl, target.defense))
+                    target.hp -= dmg
+                    slow(f"🗡️ Kamu menyerang dan memberi {dmg} damage!")
+
+                # === Skill Slash ===
+                elif ch == "2":
+                    if p.mp < SLASH_MP_COST:
+                        slow("❌ MP tidak cukup untuk Slash!")
+                        continue
+                    if target is None:
+                        target = _pick_target(group, foes)
+                        if target is None:
+                            continue
+                    p.mp -= SLASH_MP_COST
+                    dmg = max(MIN_DMG_SLASH, dmg_slash(p.atk, weapon_bonus, p.lvl, target.defense))
+                    target.hp -= dmg
+                    slow(f"💥 Slash! Kamu memberi {dmg} damage! (MP -{SLASH_MP_COST})")
+
+                # === Skill Magic ===
+                elif ch == "3" and p.magic["name"] != "Tidak ada skill":
+                    skill = p.magic
+                    if p.mp < skill["mp_cost"]:
+                        slow(f"❌ MP tidak cukup untuk {skill['name']}!")
+                        continue
+                    if target is None:
+                        target = _pick_target(group, foes)
+                        if target is None:
+                            continue
+
+                    p.mp -= skill["mp_cost"]
+                    dmg = max(MIN_DMG_MAGIC, dmg_magic(p.atk, p.lvl, skill["power"], target.defense))
+                    target.hp -= dmg
+                    slow(f"🔥 Kamu melempar {skill['name']} dan memberi {dmg} damage! (-{skill['mp_cost']} MP)")
+
+                # === Gunakan Item ===
+                elif ch == "4":
+                    use_item_in_battle(policy.pick_item(p) if policy is not None else None)
+
+                # === Kabur ===
+                elif ch == "5":
+                    if rng.random() < FLEE_CHANCE:
+                        slow("🏃 Kamu berhasil kabur!")
+                        return "kabur"
+                    else:
+                        slow("❌ Gagal kabur!")
+                        continue
+                else:
+                    slow("Pilihan tidak valid.")
+                    continue
+                break
 
-        # === Giliran musuh ===
-        enemy_dmg = enemy["atk"] - (player["def"] + armor_bonus)
-        enemy_dmg = max(1, enemy_dmg)
-        player["hp"] -= enemy_dmg
-        slow(f"⚔️ {enemy['name']} menyerang dan memberi {enemy_dmg} damage! (HP kamu: {player['hp']})")
-
-        # === Jika pemain kalah ===
-        if player["hp"] <= 0:
-            slow("💀 Kamu kalah... Respawn sebagian.")
-            player["hp"] = 100 + (player["lvl"] - 1) * 25
-            player["mp"] = 30 + (player["lvl"] - 1) * 10
-            player["gold"] = max(0, player["gold"] - 10)
-            save_game()
-            return
-def use_item_in_battle():
+            # === Cek jika musuh mati ===
+            for enemy in foes:
+                if enemy.hp <= 0:
+                    slow(f"\n🏆 Kamu mengalahkan {group.label(enemy)}!")
+                    group.defeated.append((enemy, handle_enemy_defeat(enemy)))
+            if not group.alive():
+                return "menang"
+            group.queue.requeue(p, spd)
+    finally:
+        profile_lap("battle_turn", lap)
+
+def use_item_in_battle(item=None):
+    """Pakai consumable di battle; `item` diisi auto-battle, kosong = tanya pemain."""
     if not player["inventory"]:
         slow("Tidak ada item.")
         return False
-    consumables = [it for it in player["inventory"] if it in ["Potion","Hi-Potion","Mega Potion","Elixir","Phoenix Potion"]]
+    consumables = [it for it in player["inventory"].consumables() if item_info(it).heal]
     if not consumables:
         slow("Tidak ada consumable yang bisa dipakai.")
         return False
-    slow("Consumable:")
-    for i, it in enumerate(consumables,1):
-        print(f"{i}. {it}")
-    ch = input("> ")
-    if not ch.isdigit():
-        return False
-    idx = int(ch)-1
-    if idx < 0 or idx >= len(consumables):
+    if item is None:
+        slow("Consumable:")
+        for i, it in enumerate(consumables,1):
+            out(f"{i}. {it} ({player['inventory'].count(it)})")
+        ch = ask("> ")
+        if not ch.isdigit():
+            return False
+        idx = int(ch)-1
+        if idx < 0 or idx >= len(consumables):
+            return False
+        item = consumables[idx]
+    elif item not in consumables:
         return False
-    item = consumables[idx]
     player["inventory"].remove(item)
-    heals = {"Potion":50,"Hi-Potion":100,"Mega Potion":150,"Elixir":250,"Phoenix Potion":500}
-    heal = heals.get(item,50)
+    heal = item_info(item).heal
     player["hp"] += heal
-    maxhp = 100 + (player["lvl"]-1)*25
+    maxhp = max_hp_for(player["lvl"])
     if player["hp"] > maxhp: player["hp"] = maxhp
     slow(f"🧪 Kamu memakai {item} dan memulihkan {heal} HP.")
     return True
 
+# === DUNGEON (lantai prosedural) ===
+# Setiap lantai dibangun dari (seed run, nomor lantai) dengan random.Random
+# sendiri, jadi lantai yang sama selalu identik dan bisa dibuat ulang kapan
+# saja. Save hanya menyimpan {"seed", "floor"}; dungeon_floors() membuat
+# lantai satu per satu saat diminta, tanpa batas kedalaman dan tanpa
+# menyimpan lantai yang sudah lewat.
+ROOM_ENEMY, ROOM_MINI_BOSS, ROOM_BOSS = "musuh", "mini boss", "bos"
+ROOM_TREASURE, ROOM_SPRING = "harta", "mata air"
+
+@dataclass(frozen=True)
+class DungeonFloor:
+    """Satu lantai: ruang berurutan, ruang terakhir selalu musuh atau bos.
+
+    Ruang musuh = (jenis, base, jumlah), harta = (ROOM_TREASURE, gold, item),
+    mata air = (ROOM_SPRING, porsi HP/MP yang dipulihkan).
+    """
+    number: int
+    rooms: tuple
+    lvl_bonus: int    # tambahan level musuh di putaran yang lebih dalam
+    boss: bool = False
+
+def _enemy_room(number, frng, chance):
+    base, mini_boss = dungeon_enemy_base(number, frng, chance)
+    if mini_boss:
+        return (ROOM_MINI_BOSS, base, 1)
+    return (ROOM_ENEMY, base, pack_size(base, frng))
+
+def _treasure_room(number, frng):
+    gold = frng.randint(*DUNGEON_LOOT["gold"]) * (1 + (number - 1) // 5)
+    item = None
+    if frng.random() < DUNGEON_LOOT["item_chance"]:
+        table = [it for it in DUNGEON_LOOT["items"] if it.get("min_floor", 1) <= number]
+        item = frng.choices([it["name"] for it in table], [it["weight"] for it in table])[0]
+    return (ROOM_TREASURE, gold, item)
+
+def dungeon_floor(seed, number):
+    """Bangun lantai `number` dari seed run; hasilnya sama setiap kali dipanggil."""
+    frng = random.Random(f"atw-dungeon:{seed}:{number}")
+    depth = (number - 1) // DUNGEON_FLOORS
+    lvl_bonus = depth * DUNGEON_DEPTH_LEVEL_STEP
+    if number % DUNGEON_FLOORS == 0:
+        return DungeonFloor(number, ((ROOM_BOSS, DUNGEON_BOSS, 1),), lvl_bonus, True)
+    chance = min(DUNGEON_MINI_BOSS_MAX, DUNGEON_MINI_BOSS_CHANCE + depth * DUNGEON_MINI_BOSS_STEP)
+    rooms = []
+    for _ in range(frng.randint(0, min(DUNGEON_ROOMS["max"] - 1, number // DUNGEON_ROOMS["per_floors"]))):
+        roll = frng.random()
+        if roll < DUNGEON_ROOMS["treasure"]:
+            rooms.append(_treasure_room(number, frng))
+        elif roll < DUNGEON_ROOMS["treasure"] + DUNGEON_ROOMS["spring"]:
+            rooms.append((ROOM_SPRING, DUNGEON_ROOMS["spring_heal"]))
+        else:
+            rooms.append(_enemy_room(number, frng, chance))
+    rooms.append(_enemy_room(number, frng, chance))
+    return DungeonFloor(number, tuple(rooms), lvl_bonus)
+
+def dungeon_floors(seed, start=1):
+    """Lantai `start`, `start`+1, ... dibuat saat diminta (memori konstan)."""
+    number = start
+    while True:
+        yield dungeon_floor(seed, number)
+        number += 1
+
+def open_treasure(room):
+    _, gold, item = room
+    p = current_player()
+    p.gold += gold
+    slow(f"💰 Kamu menemukan peti harta berisi {gold} gold!")
+    if item:
+        p.inventory.add(item)
+        slow(f"🎁 Di dalamnya ada {item}!")
+
+def rest_at_spring(room):
+    p = current_player()
+    hp = max(1, int(max_hp_for(p.lvl) * room[1]))
+    mp = max(1, int(max_mp_for(p.lvl) * room[1]))
+    p.hp = min(p.hp + hp, max_hp_for(p.lvl))
+    p.mp = min(p.mp + mp, max_mp_for(p.lvl))
+    slow(f"⛲ Kamu beristirahat di mata air. HP +{hp}, MP +{mp}.")
+
+def dungeon_encounter(room, floor):
+    """Musuh ruang `room` pada lantai `floor`, diskalakan ke level pemain + bonus lantai."""
+    _, base, count = room
+    lvl = current_player().lvl + floor.lvl_bonus
+    return [scaled_enemy(base, lvl) for _ in range(count)]
+
 def enter_dungeon():
+    p = current_player()
     slow("\n🏰 Kamu memasuki dungeon yang gelap...")
-    time.sleep(1)
-
-    # Daftar musuh per lantai
-    dungeon_enemies = [
-        ["Slime", "Goblin"],          # Lantai 1–3
-        ["Kelelawar", "Serigala"],    # Lantai 4–6
-        ["Orc", "Troll"],             # Lantai 7–9
-    ]
-
-    # Daftar mini boss (bisa dikembangkan)
-    mini_bosses = [
-        {"name": "Minotaur", "hp": 220, "atk": 25},
-        {"name": "Lizard King", "hp": 260, "atk": 28},
-        {"name": "Shadow Knight", "hp": 240, "atk": 30},
-    ]
-
-    for floor in range(1, 11):
-        slow(f"\n⚔️ == Dungeon Lantai {floor} ==")
-        time.sleep(1)
-
-        # Tentukan musuh acak berdasarkan lantai
-        if floor < 10:
-            # Peluang 25% untuk mini boss muncul
-            if random.random() < 0.25:
-                boss = random.choice(mini_bosses)
+    pause(1)
+
+    seed, start = None, 1
+    if p.dungeon:
+        out(f"Progress tersimpan: lantai {p.dungeon['floor']}")
+        out("1. Lanjutkan")
+        out("2. Mulai lagi dari lantai 1")
+        if ask("> ") != "2":
+            seed, start = p.dungeon["seed"], p.dungeon["floor"]
+    if seed is None:
+        seed = rng.getrandbits(32)
+
+    for floor in dungeon_floors(seed, start):
+        slow(f"\n⚔️ == Dungeon Lantai {floor.number} ==")
+        pause(1)
+        p.dungeon = {"seed": seed, "floor": floor.number}
+
+        for room in floor.rooms:
+            kind = room[0]
+            if kind == ROOM_TREASURE:
+                open_treasure(room)
+                continue
+            if kind == ROOM_SPRING:
+                rest_at_spring(room)
+                continue
+            if kind == ROOM_MINI_BOSS:
                 slow(f"\n⚡ Aura kekuatan terasa di udara...")
-                slow(f"🔥 MINI BOSS muncul! {boss['name']} menghadangmu!")
-                enemy = scaled_enemy(boss)
-            else:
-                if floor <= 3:
-                    base = random.choice([{"name": e, "hp": 80, "atk": 10} for e in dungeon_enemies[0]])
-                elif floor <= 6:
-                    base = random.choice([{"name": e, "hp": 120, "atk": 15} for e in dungeon_enemies[1]])
-                else:
-                    base = random.choice([{"name": e, "hp": 160, "atk": 20} for e in dungeon_enemies[2]])
-                enemy = scaled_enemy(base)
-
-            battle(enemy)
-
-        else:
-            # Boss terakhir dungeon
-            base = {"name": "Dark Lord", "hp": 300, "atk": 30}
-            enemy = scaled_enemy(base)
-            slow("\n💀 Bos besar muncul! Aura kegelapan menyelimuti ruangan!")
-            battle(enemy)
-
-            if player["hp"] > 0:
-                slow("\n🏆 Kamu mengalahkan Dark Lord dan menaklukkan dungeon!")
-                player["exp"] += 500
-                player["gold"] += 300
-                player["inventory"].append("Legendary Sword")
+                slow(f"🔥 MINI BOSS muncul! {room[1]['name']} menghadangmu!")
+            elif kind == ROOM_BOSS:
+                slow("\n💀 Bos besar muncul! Aura kegelapan menyelimuti ruangan!")
+            outcome = battle(dungeon_encounter(room, floor))
+
+            # Jika gugur di tengah dungeon, progress run hilang
+            if outcome == "kalah":
+                slow("\n☠️ Kamu gugur di tengah dungeon...")
+                p.dungeon = None
                 save_game()
-                level_up_check()
-            break
+                return
+            # Kabur dari bos: kembali ke kota, bos bisa ditantang lagi nanti
+            if kind == ROOM_BOSS and outcome == "kabur":
+                save_game()
+                return
 
-        # Jika gugur di tengah dungeon
-        if player["hp"] <= 0:
-            slow("\n☠️ Kamu gugur di tengah dungeon...")
-            break
+        p.dungeon = {"seed": seed, "floor": floor.number + 1}
+        if floor.boss:
+            slow(f"\n🏆 Kamu mengalahkan {DUNGEON_BOSS['name']} dan menaklukkan lantai {floor.number}!")
+            p.exp += DUNGEON_CLEAR_REWARD["exp"]
+            p.gold += DUNGEON_CLEAR_REWARD["gold"]
+            p.inventory.add(DUNGEON_CLEAR_REWARD["item"])
+            save_game()
+            level_up_check()
+            out("\n1. Kembali ke kota (lantai tersimpan)")
+            out(f"2. Turun ke lantai {floor.number + 1}")
+            if ask("> ") != "2":
+                return
 
 # === LEVEL UP ===
+@profiled()
 def level_up_check():
-    global player
+    p = current_player()
     leveled = False
-    player["next_exp"] = player["lvl"] * 100
-    # Naik level sebanyak mungkin jika EXP cukup (sampai cap 100)
-    while player["lvl"] < 100 and player["exp"] >= player["lvl"] * 100:
-        player["exp"] -= player["lvl"] * 100
-        player["lvl"] += 1
-        player["next_exp"] = player["lvl"] * 100
+    p.next_exp = p.lvl * 100
+    # Naik level sebanyak mungkin jika EXP cukup (sampai cap MAX_LEVEL)
+    while p.lvl < MAX_LEVEL and p.exp >= p.lvl * 100:
+        p.exp -= p.lvl * 100
+        p.lvl += 1
+        p.next_exp = p.lvl * 100
     # kenaikan stat per level (sesuai versi 3.4_fix)
-        player["hp"] += 25
-        player["mp"] += 10    # <- pastikan MP bertambah setiap level
-        player["atk"] += 4
-        player["def"] += 3
+        p.hp += 25
+        p.mp += 10    # <- pastikan MP bertambah setiap level
+        p.atk += 4
+        p.defense += 3
         leveled = True
-        slow(f"✨ Level Up! Sekarang Lv.{player['lvl']}! Stat meningkat!")
+        slow(f"✨ Level Up! Sekarang Lv.{p.lvl}! Stat meningkat!")
 
     # Pastikan tidak melebihi cap level dan EXP
-    if player["lvl"] >= 100:
-        player["lvl"] = 100
-        player["exp"] = min(player["exp"], player["lvl"] * 100)
+    if p.lvl >= MAX_LEVEL:
+        p.lvl = MAX_LEVEL
+        p.exp = min(p.exp, p.lvl * 100)
 
     # Terapkan cap/limit maksimum current HP/MP agar tidak overflow
-    max_hp = 100 + (player["lvl"] - 1) * 25
-    max_mp = 30 + (player["lvl"] - 1) * 10
-    if player["hp"] > max_hp:
-        player["hp"] = max_hp
-    if player["mp"] > max_mp:
-        player["mp"] = max_mp
+    max_hp = max_hp_for(p.lvl)
+    max_mp = max_mp_for(p.lvl)
+    if p.hp > max_hp:
+        p.hp = max_hp
+    if p.mp > max_mp:
+        p.mp = max_mp
 
     # Jika ada kenaikan level, simpan perubahan
     if leveled:
@@ -932,60 +3598,64 @@ def intro_story():
     slow("🌌 Dunia yang dulunya damai kini diselimuti kegelapan...")
     slow("Monster menyerang, desa-desa terbakar. Seorang petualang bangkit...")
     slow("Dialah kamu — satu-satunya harapan.")
-    input("\nTekan ENTER untuk memulai perjalananmu...")
+    ask("\nTekan ENTER untuk memulai perjalananmu...")
 
 # === NEW / START / MENU ===
 def new_game():
-    global player
-    player = default_player()
+    set_player(Player.from_dict(default_player()))
     intro_story()
-    player["name"] = input("Masukkan nama karaktermu: ") or player["name"]
+    player["name"] = ask("Masukkan nama karaktermu: ") or player["name"]
     slow(f"Selamat datang, {player['name']}!")
     save_game()
     start_game()
 
+MENU_LABELS = {"1": "status", "2": "berburu", "3": "inventory", "4": "toko",
+               "5": "npc", "6": "dungeon", "7": "simpan"}
+
 def start_game():
     while True:
-        print("\n=== MENU UTAMA ===")
-        print("1. Status")
-        print("2. Berburu")
-        print("3. Inventory")
-        print("4. Toko")
-        print("5. Bicara dengan NPC (Quest)")
-        print("6. Masuk Dungeon")
-        print("7. Simpan")
-        print("8. Keluar (Simpan otomatis)")
-        ch = input("> ")
-        if ch == "1":
-            show_stats()
-        elif ch == "2":
-            random_hunt()
-        elif ch == "3":
-            inventory_menu()
-        elif ch == "4":
-            shop_menu()
-        elif ch == "5":
-            talk_to_npc()
-        elif ch == "6":
-            enter_dungeon()
-        elif ch == "7":
-            save_game()
-        elif ch == "8":
+        out("\n=== MENU UTAMA ===")
+        out("1. Status")
+        out("2. Berburu")
+        out("3. Inventory")
+        out("4. Toko")
+        out("5. Bicara dengan NPC (Quest)")
+        out("6. Masuk Dungeon")
+        out("7. Simpan")
+        out("8. Keluar (Simpan otomatis)")
+        ch = ask("> ")
+        if ch == "8":
             save_game()
+            compact_save()
             slow("Sampai jumpa, petualang!")
             break
-        else:
-            slow("Pilihan tidak valid.")
+        with save_transaction(), profile_block(f"menu:{MENU_LABELS.get(ch, 'lain')}"):
+            if ch == "1":
+                show_stats()
+            elif ch == "2":
+                random_hunt()
+            elif ch == "3":
+                inventory_menu()
+            elif ch == "4":
+                shop_menu()
+            elif ch == "5":
+                talk_to_npc()
+            elif ch == "6":
+                enter_dungeon()
+            elif ch == "7":
+                save_game()
+            else:
+                slow("Pilihan tidak valid.")
 
 def main_menu():
     clear()
     slow("=== Adventure Text Worlds v3.8 ===")
-    if os.path.exists(SAVE_FILE):
-        print("1. Muat Game")
-        print("2. Game Baru")
-        print("3. Hapus Save")
-        print("4. Keluar")
-        choice = input("> ")
+    if save_exists():
+        out("1. Muat Game")
+        out("2. Game Baru")
+        out("3. Hapus Save")
+        out("4. Keluar")
+        choice = ask("> ")
         if choice == "1":
             ok = load_game()
             if ok:
@@ -997,10 +3667,10 @@ def main_menu():
         elif choice == "2":
             new_game()
         elif choice == "3":
-            confirm = input("Yakin hapus save? (y/n): ")
+            confirm = ask("Yakin hapus save? (y/n): ")
             if confirm.lower() == "y":
                 try:
-                    os.remove(SAVE_FILE)
+                    delete_save()
                     slow("Save dihapus.")
                 except:
                     slow("Gagal menghapus save.")
@@ -1011,5 +3681,53 @@ def main_menu():
     else:
         new_game()
 
+if os.environ.get(PROFILE_ENV, "0") not in ("", "0"):
+    enable_profiling(None if os.environ[PROFILE_ENV] == "1" else os.environ[PROFILE_ENV])
+
 if __name__ == "__main__":
-    main_menu()
+    import argparse
+    ap = argparse.ArgumentParser(description="Adventure Text World")
+    ap.add_argument("--text-mode", choices=TEXT_MODES, help="paced / instant / skip")
+    ap.add_argument("--text-speed", type=float, help="kecepatan teks (karakter per detik)")
+    ap.add_argument("--flush", choices=("line", "screen"), help="tulis output per baris atau per layar")
+    ap.add_argument("--screen", choices=SCREEN_MODES, help="diff = hanya tulis baris yang berubah, plain = teks biasa")
+    ap.add_argument("--seed", type=int, help="seed RNG sesi (hasil acak bisa diulang)")
+    ap.add_argument("--auto-policy", choices=sorted(AUTO_POLICIES), help="policy untuk opsi Auto di battle")
+    ap.add_argument("--record", metavar="FILE", help="rekam seed dan semua input ke FILE")
+    ap.add_argument("--replay", metavar="FILE", nargs="+", help="ulangi rekaman tanpa jeda dan cek state akhir")
+    ap.add_argument("--save-codec", choices=SAVE_CODECS,
+                    help="format save baru: json (default) atau biner, opsional terkompresi")
+    ap.add_argument("--profile", metavar="FILE", nargs="?", const=PROFILE_FILE,
+                    help=f"ukur aksi & fungsi panas, tulis tabel + JSON saat keluar (default {PROFILE_FILE})")
+    args = ap.parse_args()
+    if args.save_codec:
+        SAVE_CODEC = args.save_codec
+    if args.profile:
+        enable_profiling(args.profile)
+    set_text_mode(args.text_mode, args.text_speed, args.flush, args.screen)
+    if args.auto_policy:
+        AUTO_POLICY = args.auto_policy
+    if args.replay:
+        t0 = time.perf_counter()
+        failed = 0
+        for path in args.replay:
+            ok, _ = replay(path)
+            failed += not ok
+            print(f"{'OK  ' if ok else 'BEDA'} {path}")
+        dt = time.perf_counter() - t0
+        print(f"{len(args.replay)} rekaman, {failed} beda, {len(args.replay) / dt * 60:.0f} sesi/menit")
+        sys.exit(1 if failed else 0)
+    if args.seed is not None:
+        DEFAULT_SESSION.reseed(args.seed)
+    if args.record:
+        start_recording()
+    error = None
+    try:
+        main_menu()
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        OUT.flush()
+        if args.record:
+            finish_recording(args.record, error=error)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""Statistik gabungan dari folder berisi banyak file save.
+
+    python atw_analytics.py saves --out laporan.json --csv laporan.csv
+    python atw_analytics.py saves --workers 4 --recursive
+
+Setiap save dibaca seperti load_game() (snapshot + journal, lalu migrasi
+skema) tanpa menyentuh Session/pemain global. Pekerja di process pool
+meringkas potongan file menjadi Stats berukuran tetap, lalu hasilnya
+digabung; memori tidak bertambah walau jumlah file bertambah.
+"""
+import argparse, csv, fnmatch, json, os, sys, time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import Adventure_Text_World as atw
+
+OTHER_ITEM = "(lainnya)"
+MAX_FAILURES = 20     # contoh file gagal yang disimpan di laporan
+
+# === RINGKASAN PER SAVE ===
+def read_player(path):
+    """Dict pemain hasil migrasi; ValueError jika bukan save yang valid."""
+    data, _, _ = atw.read_save(path)
+    if not isinstance(data, dict) or "name" not in data:
+        raise ValueError("bukan file save")
+    data, _ = atw.ensure_fields(data)
+    return data
+
+def _legendary(name):
+    info = atw.ITEM_DB.get(name)
+    return info is not None and info.legendary
+
+def summarize(data, mtime):
+    """Ringkasan kecil satu pemain (hanya angka dan nama katalog)."""
+    inv = data["inventory"]
+    held = dict(inv.stacks)
+    for it in inv.unique:
+        held[it["name"]] = held.get(it["name"], 0) + 1
+    equipped = [data["weapon"].get("name"), data["armor"].get("name")]
+    quests = atw.QuestLog.from_data(data.get("quests"))
+    return {
+        "lvl": data["lvl"],
+        "gold": data["gold"],
+        "kills": data.get("kills", 0),
+        "month": time.strftime("%Y-%m", time.localtime(mtime)),
+        "held": held,
+        "legendary": [n for n in set(held) | set(equipped) if _legendary(n)],
+        "quests_active": len(quests),
+        "quests_done": len(quests.completed()),
+    }
+
+# === AGREGAT ===
+def _bucket(n):
+    """Bucket kelipatan dua untuk gold: 0, 1, 2-3, 4-7, ..."""
+    return 0 if n <= 0 else 1 << (int(n).bit_length() - 1)
+
+class Stats:
+    """Agregat yang bisa digabung; ukurannya dibatasi katalog item dan level."""
+
+    def __init__(self):
+        self.saves = 0
+        self.failed = 0
+        self.failures = []
+        self.levels = {}
+        self.gold_total = 0
+        self.gold_min = None
+        self.gold_max = None
+        self.gold_hist = {}
+        self.gold_by_level = {}   # lvl -> [jumlah save, total gold]
+        self.gold_by_month = {}   # YYYY-MM (waktu ubah file) -> [jumlah save, total gold]
+        self.items = {}           # nama -> [pemilik, total jumlah]
+        self.legendary = {}       # nama -> jumlah save
+        self.legendary_saves = 0
+        self.quests_active = 0
+        self.quests_done = 0
+        self.kills = 0
+
+    def add(self, s):
+        self.saves += 1
+        lvl, gold = s["lvl"], s["gold"]
+        self.levels[lvl] = self.levels.get(lvl, 0) + 1
+        self.gold_total += gold
+        self.gold_min = gold if self.gold_min is None else min(self.gold_min, gold)
+        self.gold_max = gold if self.gold_max is None else max(self.gold_max, gold)
+        b = _bucket(gold)
+        self.gold_hist[b] = self.gold_hist.get(b, 0) + 1
+        for table, key in ((self.gold_by_level, lvl), (self.gold_by_month, s["month"])):
+            row = table.setdefault(key, [0, 0])
+            row[0] += 1
+            row[1] += gold
+        for name, n in s["held"].items():
+            # nama di luar katalog (item crafted custom) digabung supaya tabel tetap kecil
+            row = self.items.setdefault(name if name in atw.ITEM_DB else OTHER_ITEM, [0, 0])
+            row[0] += 1
+            row[1] += n
+        for name in s["legendary"]:
+            self.legendary[name] = self.legendary.get(name, 0) + 1
+        self.legendary_saves += bool(s["legendary"])
+        self.quests_active += s["quests_active"]
+        self.quests_done += s["quests_done"]
+        self.kills += s["kills"]
+
+    def fail(self, path, err):
+        self.failed += 1
+        if len(self.failures) < MAX_FAILURES:
+            self.failures.append({"path": path, "error": err})
+
+    def merge(self, other):
+        self.saves += other.saves
+        self.failed += other.failed
+        self.failures = (self.failures + other.failures)[:MAX_FAILURES]
+        for mine, theirs in ((self.levels, other.levels), (self.gold_hist, other.gold_hist),
+                             (self.legendary, other.legendary)):
+            for k, v in theirs.items():
+                mine[k] = mine.get(k, 0) + v
+        for mine, theirs in ((self.gold_by_level, other.gold_by_level),
+                             (self.gold_by_month, other.gold_by_month), (self.items, other.items)):
+            for k, (a, b) in theirs.items():
+                row = mine.setdefault(k, [0, 0])
+                row[0] += a
+                row[1] += b
+        self.gold_total += other.gold_total
+        mins = [g for g in (self.gold_min, other.gold_min) if g is not None]
+        maxs = [g for g in (self.gold_max, other.gold_max) if g is not None]
+        self.gold_min = min(mins) if mins else None
+        self.gold_max = max(maxs) if maxs else None
+        self.legendary_saves += other.legendary_saves
+        self.quests_active += other.quests_active
+        self.quests_done += other.quests_done
+        self.kills += other.kills
+        return self
+
+    def _gold_percentile(self, q):
+        need, seen = q * self.saves, 0
+        for b in sorted(self.gold_hist):
+            seen += self.gold_hist[b]
+            if seen >= need:
+                return b
+        return 0
+
+    def report(self, top=20):
+        n = self.saves or 1
+        items = sorted(self.items.items(), key=lambda kv: (-kv[1][0], kv[0]))[:top]
+        return {
+            "saves": self.saves,
+            "failed": self.failed,
+            "failures": self.failures,
+            "level_distribution": {str(k): v for k, v in sorted(self.levels.items())},
+            "gold": {
+                "mean": round(self.gold_total / n, 1),
+                "min": self.gold_min,
+                "max": self.gold_max,
+                "p50_bucket": self._gold_percentile(0.5),
+                "p90_bucket": self._gold_percentile(0.9),
+                "histogram": {f">={k}": v for k, v in sorted(self.gold_hist.items())},
+                "mean_by_level": {str(k): round(t / c, 1) for k, (c, t) in sorted(self.gold_by_level.items())},
+                "mean_by_month": {k: round(t / c, 1) for k, (c, t) in sorted(self.gold_by_month.items())},
+            },
+            "top_items": [{"item": k, "holders": h, "holders_pct": round(100 * h / n, 1), "total": t}
+                          for k, (h, t) in items],
+            "legendary": {
+                "saves_with_any": self.legendary_saves,
+                "saves_with_any_pct": round(100 * self.legendary_saves / n, 1),
+                "by_item": dict(sorted(self.legendary.items())),
+            },
+            "quests": {
+                "active": self.quests_active,
+                "completed_unclaimed": self.quests_done,
+                "completion_pct": round(100 * self.quests_done / self.quests_active, 1)
+                                  if self.quests_active else 0.0,
+            },
+            "kills_mean": round(self.kills / n, 1),
+        }
+
+# === PEMINDAI ===
+def iter_saves(folder, pattern="*", recursive=False):
+    """Path save satu per satu (tanpa membuat daftar semua file)."""
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__") if recursive else []
+        for name in sorted(files):
+            if fnmatch.fnmatch(name, pattern) and not name.endswith((".journal", ".tmp")):
+                yield os.path.join(root, name)
+
+def scan_chunk(paths):
+    stats = Stats()
+    for path in paths:
+        try:
+            stats.add(summarize(read_player(path), os.path.getmtime(path)))
+        except Exception as e:
+            stats.fail(path, f"{type(e).__name__}: {e}")
+    return stats
+
+def _chunks(paths, size):
+    chunk = []
+    for p in paths:
+        chunk.append(p)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def scan(folder, workers=None, chunk=64, pattern="*", recursive=False):
+    """Pindai folder; paling banyak 2 potongan per pekerja yang sedang diproses."""
+    total = Stats()
+    chunks = _chunks(iter_saves(folder, pattern, recursive), chunk)
+    if workers == 1:
+        for c in chunks:
+            total.merge(scan_chunk(c))
+        return total
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for c in chunks:
+            pending.add(pool.submit(scan_chunk, c))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    total.merge(f.result())
+        for f in pending:
+            total.merge(f.result())
+    return total
+
+# === KELUARAN ===
+def write_csv(report, path):
+    """Laporan datar: section, key, value."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["section", "key", "value"])
+        w.writerow(["summary", "saves", report["saves"]])
+        w.writerow(["summary", "failed", report["failed"]])
+        w.writerow(["summary", "kills_mean", report["kills_mean"]])
+        for k, v in report["level_distribution"].items():
+            w.writerow(["level", k, v])
+        for k in ("mean", "min", "max", "p50_bucket", "p90_bucket"):
+            w.writerow(["gold", k, report["gold"][k]])
+        for k, v in report["gold"]["mean_by_level"].items():
+            w.writerow(["gold_by_level", k, v])
+        for k, v in report["gold"]["mean_by_month"].items():
+            w.writerow(["gold_by_month", k, v])
+        for row in report["top_items"]:
+            w.writerow(["item_holders", row["item"], row["holders"]])
+        for k, v in report["legendary"]["by_item"].items():
+            w.writerow(["legendary", k, v])
+        w.writerow(["legendary", "saves_with_any", report["legendary"]["saves_with_any"]])
+        for k, v in report["quests"].items():
+            w.writerow(["quests", k, v])
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Statistik gabungan folder save Adventure Text World")
+    ap.add_argument("folder")
+    ap.add_argument("--workers", type=int, default=None, help="jumlah proses (default: jumlah core)")
+    ap.add_argument("--chunk", type=int, default=64, help="file per tugas pekerja")
+    ap.add_argument("--pattern", default="*", help="pola nama file save (mis. *.json)")
+    ap.add_argument("--recursive", action="store_true", help="ikut memindai subfolder")
+    ap.add_argument("--top", type=int, default=20, help="jumlah item terpopuler di laporan")
+    ap.add_argument("--out", help="tulis laporan JSON ke file (default: stdout)")
+    ap.add_argument("--csv", help="tulis juga laporan CSV")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    report = scan(args.folder, args.workers, args.chunk, args.pattern, args.recursive).report(args.top)
+    report["seconds"] = round(time.perf_counter() - t0, 3)
+    if args.csv:
+        write_csv(report, args.csv)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"{report['saves']} save dipindai, {report['failed']} gagal, {report['seconds']} s -> {args.out}")
+    else:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""Benchmark jalur panas Adventure Text World.
+
+Bisa dijalankan mandiri atau lewat pytest-benchmark:
+
+    python atw_bench.py run --out bench.json
+    python atw_bench.py run --baseline                       # vs bench_baseline.json, gagal jika ada regresi
+    python atw_bench.py run --out bench_baseline.json        # perbarui baseline (mesin sendiri)
+    python atw_bench.py run --only save_ load_
+    python atw_bench.py state                                # byte per pemain, dict vs __slots__
+    python atw_bench.py startup                              # import & menu pertama, cache dingin vs hangat
+    python atw_bench.py codecs                               # ukuran & kecepatan save JSON vs biner
+    pytest atw_bench.py --benchmark-only
+
+Semua kasus memakai Session sendiri: output dibuang, input dari naskah,
+RNG ber-seed dan file save di folder sementara yang dihapus saat proses
+selesai. bench_baseline.json adalah hasil acuan yang ikut di repo; angkanya
+bergantung mesin, jadi buat ulang dengan --out sebelum membandingkan di
+mesin lain.
+"""
+import argparse, json, os, platform, re, shutil, statistics, subprocess, sys, tempfile, time, timeit
+
+import Adventure_Text_World as atw
+
+INVENTORY_SIZES = (10, 100, 1000, 10000, 100000)
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+# === SESSION BENCHMARK ===
+_save_root = None
+
+def _bench_dir():
+    """Folder save baru per session, di dalam satu TemporaryDirectory yang
+    dihapus otomatis saat interpreter selesai."""
+    global _save_root
+    if _save_root is None:
+        _save_root = tempfile.TemporaryDirectory(prefix="atw-bench-")
+    return tempfile.mkdtemp(dir=_save_root.name)
+
+def bench_session(reader=None, inventory_size=0, save_dir=None, seed=0, defer_saves=True):
+    """Session untuk benchmark: teks instan, output dibuang, input dari `reader`."""
+    save_dir = save_dir or _bench_dir()
+    out = atw.Output(stream=atw.NullStream(), mode="instant", flush_on="screen",
+                     reader=reader or (lambda: "1"))
+    sess = atw.Session(save_file=os.path.join(save_dir, "bench.json"), out=out, seed=seed)
+    if inventory_size:
+        sess.player.inventory = make_inventory(inventory_size)
+    if defer_saves:
+        # transaksi yang tidak pernah ditutup: save_game() hanya menandai dirty
+        sess.tx["depth"] = 1
+    return sess
+
+def make_inventory(n):
+    """Inventory berisi `n` item: campuran stack katalog dan item crafted unik."""
+    names = sorted(atw.ITEM_DB)
+    inv = atw.Inventory()
+    uniques = n // 10
+    for i in range(n - uniques):
+        inv.add(names[i % len(names)])
+    for i in range(uniques):
+        inv.add({"name": f"Crafted Blade {i}", "type": "weapon", "atk": 20 + i % 10, "value": 100})
+    return inv
+
+def _strong(p, lvl=100):
+    p.lvl, p.exp = lvl, 0
+    p.hp = atw.max_hp_for(lvl) * 10
+    p.mp = atw.max_mp_for(lvl)
+    p.atk = 10 + 4 * (lvl - 1)
+    p.defense = 5 + 3 * (lvl - 1)
+
+# === KASUS ===
+# Tiap kasus: fungsi tanpa argumen yang mengembalikan callable yang diukur
+# (persiapan di luar pengukuran).
+def case_scaled_enemy():
+    base = atw.ENEMIES_BASE[-1]
+    return lambda: atw.scaled_enemy(base, 50)
+
+def case_battle():
+    sess = bench_session()
+    base = next(e for e in atw.ENEMIES_BASE if e["name"] == "Goblin")
+
+    def run():
+        with sess.active():
+            _strong(sess.player, 10)
+            atw.battle(atw.scaled_enemy(base))
+    return run
+
+def case_battle_horde():
+    sess = bench_session()
+    base = next(e for e in atw.ENEMIES_BASE if e["name"] == "Slime")
+
+    def run():
+        with sess.active():
+            _strong(sess.player)
+            atw.battle([atw.scaled_enemy(base, 1) for _ in range(40)])
+    return run
+
+def case_level_up_check():
+    sess = bench_session()
+
+    def run():
+        with sess.active():
+            p = sess.player
+            p.lvl, p.exp, p.hp, p.mp = 1, 10 ** 7, 100, 30
+            atw.level_up_check()
+    return run
+
+def case_get_stacked_inventory():
+    sess = bench_session(inventory_size=1000)
+
+    def run():
+        with sess.active():
+            atw.get_stacked_inventory()
+    return run
+
+def case_enter_dungeon():
+    sess = bench_session()
+
+    def run():
+        with sess.active():
+            _strong(sess.player)
+            sess.player.dungeon = None   # selalu run baru dari lantai 1
+            atw.enter_dungeon()
+    return run
+
+def case_shop_open():
+    sess = bench_session()
+
+    def run():
+        with sess.active():
+            atw.generate_shop_items()
+    return run
+
+def make_recipe_book(n, seed=0):
+    """RecipeBook sintetis berisi `n` resep, 1-4 bahan katalog, jumlah 1-3."""
+    import random
+    r = random.Random(seed)
+    names = sorted(atw.ITEM_DB)
+    recipes = {f"resep{i}": {"requires": {nm: r.randint(1, 3) for nm in r.sample(names, r.randint(1, 4))},
+                             "result": r.choice(names)} for i in range(n)}
+    return atw.RecipeBook(recipes)
+
+def case_craftable():
+    book = make_recipe_book(5000)
+    inv = make_inventory(1000)
+    inv.craft = atw.CraftTracker(book, inv)
+    name = sorted(atw.ITEM_DB)[0]
+
+    def run():
+        inv.add(name, 3)
+        inv.craft.craftable()
+        inv.remove(name, 3)
+        inv.craft.craftable()
+    return run
+
+def case_encounter_draw():
+    # wilayah sintetis 500 entri dengan batas level berbeda-beda
+    names = [e["name"] for e in atw.ENEMIES_BASE]
+    spec = {"name": "Bench", "intro": "", "min_lvl": 1, "encounters": [
+        {"enemy": names[i % len(names)], "weight": 1 + i % 7, "min_lvl": 1 + i % 40}
+        for i in range(500)]}
+    region = atw.build_region("bench", spec)
+    import random
+    rng = random.Random(0)
+    return lambda: atw.encounter_batch(region, 50, 1000, rng)
+
+def _case_save(n):
+    def case():
+        sess = bench_session(inventory_size=n, defer_saves=False)
+
+        def run():
+            with sess.active():
+                sess.journal["owner"] = None   # paksa snapshot penuh
+                atw.save_game()
+        return run
+    return case
+
+def _case_load(n):
+    def case():
+        sess = bench_session(inventory_size=n, defer_saves=False)
+        with sess.active():
+            atw.save_game()
+
+        def run():
+            with sess.active():
+                atw.load_game()
+        return run
+    return case
+
+CASES = {
+    "scaled_enemy": case_scaled_enemy,
+    "battle": case_battle,
+    "battle_horde": case_battle_horde,
+    "level_up_check": case_level_up_check,
+    "get_stacked_inventory": case_get_stacked_inventory,
+    "enter_dungeon": case_enter_dungeon,
+    "craftable": case_craftable,
+    "shop_open": case_shop_open,
+    "encounter_draw": case_encounter_draw,
+}
+for _n in INVENTORY_SIZES:
+    CASES[f"save_{_n}"] = _case_save(_n)
+    CASES[f"load_{_n}"] = _case_load(_n)
+
+# === RUNNER MANDIRI ===
+def measure(fn, min_time=0.2, repeat=5):
+    """Kalibrasi jumlah loop sampai >= `min_time`, lalu ulang `repeat` kali."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    while True:
+        t = timer.timeit(number)
+        if t >= min_time or number >= 10 ** 7:
+            break
+        number *= 2
+    runs = [t / number] + [x / number for x in timer.repeat(repeat - 1, number)]
+    return {
+        "min_s": min(runs),
+        "median_s": statistics.median(runs),
+        "loops": number,
+        "rounds": repeat,
+    }
+
+def run_cases(names=None, min_time=0.2, repeat=5, log=None):
+    results = {}
+    for name, case in CASES.items():
+        if names and not any(name.startswith(n) for n in names):
+            continue
+        try:
+            results[name] = measure(case(), min_time, repeat)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+        if log:
+            log(name, results[name])
+    return results
+
+def compare(results, baseline, tolerance=0.2, names=None):
+    """Bandingkan median dengan baseline; kembalikan daftar (nama, rasio, regresi?).
+
+    Kasus yang error, atau ada di baseline (dan cocok dengan `names`) tapi
+    tidak ada lagi di hasil, dihitung regresi dengan rasio None.
+    """
+    rows = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if "median_s" not in res:
+            rows.append((name, None, True))
+        elif base and "median_s" in base:
+            ratio = res["median_s"] / base["median_s"]
+            rows.append((name, ratio, ratio > 1 + tolerance))
+    for name in baseline:
+        if name not in results and (not names or any(name.startswith(n) for n in names)):
+            rows.append((name, None, True))
+    return rows
+
+def bench_report(results):
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+# === UKURAN MEMORI ===
+def deep_sizeof(obj, seen=None):
+    """sys.getsizeof rekursif: dict/list/tuple/set dan objek ber-__slots__."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, (str, int, float, bool, type(None))):
+        # string/angka kecil di-intern dan dipakai bersama oleh semua pemain
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    else:
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(obj, name):
+                    size += deep_sizeof(getattr(obj, name), seen)
+    return size
+
+def _player_dict():
+    p = atw.default_player()
+    p["inventory"] = p["inventory"].to_data()
+    return p
+
+# === POLA AKSES SATU GILIRAN ===
+# Sama dengan satu putaran battle(): serang, lalu musuh membalas.
+def _turn_dict(p, e):
+    dmg = max(atw.MIN_DMG_SERANG, atw.dmg_serang(p["atk"], p["weapon"]["atk"], p["lvl"], e["def"]))
+    e["hp"] -= dmg
+    p["hp"] -= max(atw.MIN_DMG_ENEMY, atw.dmg_enemy(e["atk"], p["def"], p["armor"]["def"]))
+    if p["hp"] <= 0 or e["hp"] <= 0:
+        p["hp"], e["hp"] = 10 ** 9, 10 ** 9
+
+def _turn_obj(p, e):
+    dmg = max(atw.MIN_DMG_SERANG, atw.dmg_serang(p.atk, p.weapon.atk, p.lvl, e.defense))
+    e.hp -= dmg
+    p.hp -= max(atw.MIN_DMG_ENEMY, atw.dmg_enemy(e.atk, p.defense, p.armor.defense))
+    if p.hp <= 0 or e.hp <= 0:
+        p.hp, e.hp = 10 ** 9, 10 ** 9
+
+def bench_state(number=200000, repeat=5):
+    base = atw.ENEMIES_BASE[0]
+    pd = _player_dict()
+    po = atw.Player.from_dict(pd)
+    ed = dict(atw.scaled_enemy(base, 1).to_dict())
+    eo = atw.scaled_enemy(base, 1)
+
+    t_dict = min(timeit.repeat(lambda: _turn_dict(pd, ed), number=number, repeat=repeat))
+    t_obj = min(timeit.repeat(lambda: _turn_obj(po, eo), number=number, repeat=repeat))
+    return {
+        "player_bytes_dict": deep_sizeof(_player_dict()),
+        "player_bytes_slots": deep_sizeof(atw.Player.from_dict(_player_dict())),
+        "enemy_bytes_dict": deep_sizeof(dict(ed)),
+        "enemy_bytes_slots": deep_sizeof(atw.scaled_enemy(base, 1)),
+        "turn_ns_dict": round(t_dict / number * 1e9, 1),
+        "turn_ns_slots": round(t_obj / number * 1e9, 1),
+    }
+
+# === STARTUP ===
+# Diukur di proses baru: `python -X importtime` untuk biaya import modul,
+# dan waktu dinding sampai menu utama pertama tampil. "dingin" = cache
+# content pack dihapus dulu, "hangat" = cache sudah ada. Proses memakai
+# salinan folder data (ATW_DATA_DIR), jadi cache data/ asli tidak disentuh.
+_GAME_DIR = os.path.dirname(os.path.abspath(atw.__file__))
+_IMPORTTIME = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|\s+Adventure_Text_World$", re.M)
+
+def _startup_env(data_dir):
+    env = dict(os.environ, PYTHONPATH=_GAME_DIR, ATW_DATA_DIR=data_dir)
+    env.pop("ATW_CONTENT_CACHE", None)
+    return env
+
+def _clear_content_cache(data_dir):
+    shutil.rmtree(os.path.join(data_dir, "__pycache__"), ignore_errors=True)
+
+def _import_us(env):
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", "import Adventure_Text_World"],
+                         env=env, capture_output=True, text=True, check=True)
+    return int(_IMPORTTIME.search(res.stderr).group(1))
+
+def _first_menu_s(env, cwd):
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.join(_GAME_DIR, "Adventure_Text_World.py"),
+                             "--text-mode", "instant", "--screen", "plain"],
+                            cwd=cwd, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL)
+    try:
+        for line in proc.stdout:
+            if b"=== Adventure Text Worlds" in line:
+                return time.perf_counter() - t0
+        raise RuntimeError("menu utama tidak muncul")
+    finally:
+        proc.kill()
+        proc.wait()
+
+def bench_startup(repeat=5):
+    report = {}
+    with tempfile.TemporaryDirectory(prefix="atw-startup-") as cwd:
+        data_dir = os.path.join(cwd, "data")
+        shutil.copytree(atw.CONTENT_DIR, data_dir, ignore=shutil.ignore_patterns("__pycache__"))
+        env = _startup_env(data_dir)
+        for label, cold in (("cold", True), ("warm", False)):
+            imports, menus = [], []
+            for _ in range(repeat):
+                if cold:
+                    _clear_content_cache(data_dir)
+                imports.append(_import_us(env))
+                if cold:
+                    _clear_content_cache(data_dir)
+                menus.append(_first_menu_s(env, cwd))
+            report[f"import_ms_{label}"] = round(statistics.median(imports) / 1000, 2)
+            report[f"first_menu_ms_{label}"] = round(statistics.median(menus) * 1000, 2)
+    return report
+
+# === CODEC SAVE ===
+CODEC_SIZES = (1000, 10000, 100000)
+
+def bench_codecs(sizes=CODEC_SIZES, repeat=5):
+    """Byte, waktu encode dan decode snapshot per codec dan ukuran inventory."""
+    rows = []
+    for n in sizes:
+        p = atw.Player.from_dict(atw.default_player())
+        p.inventory = make_inventory(n)
+        data = dict(p)
+        for codec in atw.SAVE_CODECS:
+            blob = atw.encode_save(data, codec)
+            raw = blob if isinstance(blob, bytes) else blob.encode()
+            enc = min(timeit.repeat(lambda: atw.encode_save(data, codec), number=1, repeat=repeat))
+            dec = min(timeit.repeat(lambda: atw.decode_save(raw), number=1, repeat=repeat))
+            rows.append({"items": n, "codec": codec, "bytes": len(raw),
+                         "encode_ms": round(enc * 1000, 3), "decode_ms": round(dec * 1000, 3)})
+    return rows
+
+# === PYTEST-BENCHMARK ===
+# pytest atw_bench.py --benchmark-only  (butuh paket pytest-benchmark)
+def _pytest_case(name):
+    def test(benchmark):
+        benchmark(CASES[name]())
+    test.__name__ = f"test_{name}"
+    return test
+
+for _name in CASES:
+    globals()[f"test_{_name}"] = _pytest_case(_name)
+
+# === CLI ===
+def _fmt_time(s):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if s >= scale:
+            return f"{s / scale:.2f} {unit}"
+    return f"{s / 1e-9:.0f} ns"
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark Adventure Text World")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    rp = sub.add_parser("run", help="jalankan kasus benchmark")
+    rp.add_argument("--only", nargs="+", metavar="PREFIX", help="hanya kasus dengan awalan ini")
+    rp.add_argument("--out", help="tulis hasil ke file JSON")
+    rp.add_argument("--baseline", nargs="?", const=BASELINE_FILE, metavar="FILE",
+                    help="bandingkan dengan hasil JSON sebelumnya (tanpa FILE: bench_baseline.json)")
+    rp.add_argument("--tolerance", type=float, default=0.2, help="batas regresi (0.2 = 20%% lebih lambat)")
+    rp.add_argument("--min-time", type=float, default=0.2, help="detik minimal per ronde")
+    rp.add_argument("--repeat", type=int, default=5)
+    sp = sub.add_parser("state", help="byte per pemain dan biaya akses per giliran")
+    sp.add_argument("--json", action="store_true", help="cetak hasil sebagai JSON")
+    up = sub.add_parser("startup", help="waktu import dan menu pertama, cache dingin vs hangat")
+    up.add_argument("--repeat", type=int, default=5)
+    up.add_argument("--json", action="store_true", help="cetak hasil sebagai JSON")
+    cp = sub.add_parser("codecs", help="ukuran dan kecepatan save JSON vs biner")
+    cp.add_argument("--sizes", type=int, nargs="+", default=list(CODEC_SIZES))
+    cp.add_argument("--repeat", type=int, default=5)
+    cp.add_argument("--json", action="store_true", help="cetak hasil sebagai JSON")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "codecs":
+        rows = bench_codecs(args.sizes, args.repeat)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+            return
+        print(f"{'item':>7} {'codec':<9} {'byte':>10} {'encode':>11} {'decode':>11}")
+        for r in rows:
+            print(f"{r['items']:>7} {r['codec']:<9} {r['bytes']:>10} {r['encode_ms']:>8.2f} ms "
+                  f"{r['decode_ms']:>8.2f} ms")
+        return
+
+    if args.cmd in ("state", "startup"):
+        report = bench_state() if args.cmd == "state" else bench_startup(args.repeat)
+        if args.json:
+            print(json.dumps(report, indent=2))
+            return
+        for k, v in report.items():
+            print(f"{k:<20} {v}")
+        return
+
+    def log(name, res):
+        if "error" in res:
+            print(f"{name:<24} ERROR {res['error']}")
+        else:
+            print(f"{name:<24} {_fmt_time(res['median_s']):>12}  (min {_fmt_time(res['min_s'])}, "
+                  f"{res['loops']} loop x {res['rounds']})")
+
+    results = run_cases(args.only, args.min_time, args.repeat, log)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(bench_report(results), f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        rows = compare(results, baseline, args.tolerance, args.only)
+        print(f"\n{'Kasus':<24} {'vs baseline':>12}")
+        for name, ratio, regressed in rows:
+            if ratio is None:
+                status = "ERROR" if name in results else "HILANG"
+                print(f"{name:<24} {status:>12}  REGRESI")
+            else:
+                print(f"{name:<24} {ratio:>11.2f}x{'  REGRESI' if regressed else ''}")
+        if any(r for _, _, r in rows):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
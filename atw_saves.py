@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Alat file save Adventure Text World.
+
+    python atw_saves.py convert atw.json atw.bin --codec bin+zlib
+    python atw_saves.py convert atw.bin atw.json --codec json
+    python atw_saves.py info saves/*.json
+    python atw_saves.py migrate saves --workers 4
+
+Format sumber dikenali dari header; journal (.journal) ikut dilebur ke
+snapshot hasil konversi dan migrasi.
+"""
+import argparse, fnmatch, os, sys
+from concurrent.futures import ProcessPoolExecutor
+
+import Adventure_Text_World as atw
+
+# === KONVERSI ===
+def convert(src, dst, codec):
+    """Konversi satu save; kembalikan (byte sebelum, byte sesudah)."""
+    before = os.path.getsize(src)
+    if os.path.exists(atw.journal_path(src)):
+        before += os.path.getsize(atw.journal_path(src))
+    atw.convert_save(src, dst, codec)
+    return before, os.path.getsize(dst)
+
+def info(path):
+    data, seq, records = atw.read_save(path)
+    inv = data.get("inventory") if isinstance(data, dict) else None
+    if isinstance(inv, dict) and "stacks" in inv:
+        items = sum(inv["stacks"].values()) + len(inv.get("unique", []))
+    else:
+        items = len(inv or ())
+    return {
+        "codec": atw.save_file_codec(path),
+        "bytes": os.path.getsize(path),
+        "journal_seq": seq,
+        "journal_records": records,
+        "items": items,
+    }
+
+# === MIGRASI MASSAL ===
+def save_files(folder, pattern="*"):
+    """File save di `folder` (journal dan file sementara dilewati)."""
+    for entry in sorted(os.scandir(folder), key=lambda e: e.name):
+        if (entry.is_file() and fnmatch.fnmatch(entry.name, pattern)
+                and not entry.name.endswith((".journal", ".tmp"))):
+            yield entry.path
+
+def migrate_file(path, dry_run=False):
+    """Migrasi satu save ke skema terbaru, format file dipertahankan.
+
+    Kembalikan (path, status, keterangan); status "upgraded", "current" atau "failed".
+    """
+    try:
+        data, seq, _ = atw.read_save(path)
+        if not isinstance(data, dict) or "name" not in data:
+            return path, "failed", "bukan file save"
+        data, start = atw.migrate_save(data)
+        if start == atw.SCHEMA_VERSION:
+            return path, "current", f"v{start}"
+        if not dry_run:
+            atw.write_save_file(path, data, seq, atw.save_file_codec(path))
+        return path, "upgraded", f"v{start} -> v{atw.SCHEMA_VERSION}"
+    except Exception as e:
+        return path, "failed", f"{type(e).__name__}: {e}"
+
+def _migrate_chunk(paths, dry_run):
+    return [migrate_file(p, dry_run) for p in paths]
+
+def migrate_dir(folder, workers=None, dry_run=False, pattern="*", chunk=32):
+    """Migrasi semua save di `folder` paralel; hasil per file dalam urutan nama."""
+    paths = list(save_files(folder, pattern))
+    chunks = [paths[i:i + chunk] for i in range(0, len(paths), chunk)]
+    if workers == 1 or len(chunks) <= 1:
+        return [row for c in chunks for row in _migrate_chunk(c, dry_run)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_migrate_chunk, chunks, [dry_run] * len(chunks))
+        return [row for rows in results for row in rows]
+
+# === CLI ===
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Alat file save Adventure Text World")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    cp = sub.add_parser("convert", help="ubah format save (JSON <-> biner)")
+    cp.add_argument("src")
+    cp.add_argument("dst")
+    cp.add_argument("--codec", choices=atw.SAVE_CODECS, default="bin+zlib")
+    ip = sub.add_parser("info", help="format, ukuran dan isi ringkas file save")
+    ip.add_argument("paths", nargs="+")
+    mp = sub.add_parser("migrate", help="naikkan semua save di folder ke skema terbaru")
+    mp.add_argument("folder")
+    mp.add_argument("--workers", type=int, default=None, help="jumlah proses (default: jumlah core)")
+    mp.add_argument("--pattern", default="*", help="pola nama file save (mis. *.json)")
+    mp.add_argument("--dry-run", action="store_true", help="hanya laporkan, jangan tulis")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "migrate":
+        rows = migrate_dir(args.folder, args.workers, args.dry_run, args.pattern)
+        counts = {"upgraded": 0, "current": 0, "failed": 0}
+        for path, status, detail in rows:
+            counts[status] += 1
+            if status != "current":
+                print(f"{status.upper():<9} {path}  {detail}")
+        verb = "perlu migrasi" if args.dry_run else "dimigrasi"
+        print(f"{len(rows)} save: {counts['upgraded']} {verb}, {counts['current']} sudah terbaru, "
+              f"{counts['failed']} gagal (skema v{atw.SCHEMA_VERSION})")
+        sys.exit(1 if counts["failed"] else 0)
+
+    if args.cmd == "convert":
+        try:
+            before, after = convert(args.src, args.dst, args.codec)
+        except (OSError, ValueError) as e:
+            sys.exit(f"❌ Gagal konversi {args.src}: {e}")
+        print(f"{args.src} -> {args.dst} ({args.codec}): {before} -> {after} byte")
+        return
+    for path in args.paths:
+        try:
+            row = info(path)
+        except (OSError, ValueError) as e:
+            print(f"{path:<32} ERROR {e}")
+            continue
+        print(f"{path:<32} {row['codec']:<9} {row['bytes']:>10} byte  {row['items']:>7} item  "
+              f"journal {row['journal_records']}")
+
+if __name__ == "__main__":
+    main()
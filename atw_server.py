@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""Server multi-sesi (telnet/TCP) untuk Adventure Text World.
+
+Setiap koneksi mendapat Session sendiri (player, slot save, output). Semua
+I/O jaringan berjalan non-blocking di event loop asyncio; logika game tetap
+kode sinkron yang sama dengan mode terminal, jadi tiap sesi dijalankan di
+thread pekerja dan ask()/out() sesi itu diteruskan ke socket lewat loop.
+
+Batasnya: tiap pemain yang terhubung memegang satu thread (dibuat saat
+perlu), jadi --max-sessions (default 512) adalah batas pemain sekaligus dan
+koneksi berikutnya ditolak. Yang menjalankan kode game bersamaan dibatasi
+--workers "kursi"; sesi melepas kursinya selama menunggu input, jadi
+pemain yang diam tidak membuat pemain lain antri. Pemain yang diam lebih
+dari --idle-timeout detik diputus supaya threadnya kembali ke pool.
+
+    python atw_server.py serve --port 4000 --saves saves
+    telnet 127.0.0.1 4000
+
+    python atw_server.py loadgen --clients 300 --actions 20 --local
+"""
+import argparse, asyncio, contextvars, logging, os, re, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+import Adventure_Text_World as atw
+
+_TELNET_CMD = re.compile(rb"\xff[\xfb-\xfe].|\xff[\xf0-\xfa]", re.S)
+_SLOT_CHARS = re.compile(r"[^A-Za-z0-9_-]")
+DEFAULT_WORKERS = 64
+IDLE_TIMEOUT = 300.0
+log = logging.getLogger("atw.server")
+
+# === JEMBATAN I/O SESI <-> EVENT LOOP ===
+class _NetStream:
+    """Stream tulis untuk Output: data dikirim lewat event loop saat flush."""
+
+    def __init__(self, loop, writer):
+        self.loop = loop
+        self.writer = writer
+        self._parts = []
+
+    def write(self, text):
+        self._parts.append(text)
+
+    def flush(self):
+        if not self._parts:
+            return
+        data = "".join(self._parts).replace("\n", "\r\n").encode()
+        self._parts.clear()
+        self.loop.call_soon_threadsafe(self.writer.write, data)
+
+class LineTooLong(Exception):
+    """Baris input pemain melebihi batas StreamReader."""
+
+class _Seats:
+    """Batas sesi yang menjalankan kode game bersamaan (bukan yang menunggu input)."""
+
+    def __init__(self, n, waits=None):
+        self._sem = threading.BoundedSemaphore(n)
+        self.waits = waits   # list detik antri per ambil kursi (untuk loadgen), None = tidak dicatat
+
+    def take(self):
+        t0 = time.perf_counter()
+        self._sem.acquire()
+        if self.waits is not None:
+            self.waits.append(time.perf_counter() - t0)
+
+    def give(self):
+        self._sem.release()
+
+class _NetReader:
+    """Pengganti input(): tunggu satu baris dari socket di event loop."""
+
+    def __init__(self, loop, reader, timeout=IDLE_TIMEOUT, seats=None):
+        self.loop = loop
+        self.reader = reader
+        self.timeout = timeout
+        self.seats = seats
+
+    def __call__(self):
+        read = asyncio.wait_for(self.reader.readline(), self.timeout)
+        if self.seats is not None:
+            self.seats.give()   # menunggu input tidak memakai kursi
+        try:
+            line = asyncio.run_coroutine_threadsafe(read, self.loop).result()
+        except asyncio.TimeoutError:
+            raise EOFError("pemain diam terlalu lama") from None
+        except (asyncio.LimitOverrunError, ValueError) as e:
+            # StreamReader.readline(): baris melebihi `limit`
+            raise LineTooLong(str(e)) from None
+        finally:
+            if self.seats is not None:
+                self.seats.take()
+        if not line:
+            raise EOFError("koneksi ditutup")
+        return _TELNET_CMD.sub(b"", line).decode(errors="replace").rstrip("\r\n")
+
+def _run_session(sess, seats):
+    seats.take()
+    with sess.active():
+        try:
+            atw.main_menu()
+        except EOFError:
+            pass  # pemain memutus koneksi; transaksi save sudah di-commit
+        except LineTooLong as e:
+            log.warning("sesi %s diputus: %s", sess.save_file, e)
+        finally:
+            seats.give()
+            sess.out.flush()
+
+# === SERVER ===
+async def serve(host="127.0.0.1", port=4000, save_dir="saves", max_sessions=512, ready=None,
+                seed=None, workers=DEFAULT_WORKERS, idle_timeout=IDLE_TIMEOUT, queue_waits=None):
+    """Sampai `max_sessions` pemain (satu thread tiap pemain); paling banyak
+    `workers` di antaranya menjalankan kode game bersamaan."""
+    os.makedirs(save_dir, exist_ok=True)
+    pool = ThreadPoolExecutor(max_workers=max_sessions, thread_name_prefix="atw-session")
+    seats = _Seats(max(1, workers), queue_waits)
+    connected = [0]
+    active = set()
+    counter = [0]
+
+    async def handle(reader, writer):
+        loop = asyncio.get_running_loop()
+        if connected[0] >= max_sessions:
+            writer.write("Server penuh, coba lagi nanti.\r\n".encode())
+            writer.close()
+            return
+        connected[0] += 1
+        counter[0] += 1
+        conn = counter[0]
+        slot = None
+        try:
+            writer.write("=== Adventure Text World (online) ===\r\nNama slot save: ".encode())
+            try:
+                line = await asyncio.wait_for(reader.readline(), idle_timeout)
+            except (asyncio.TimeoutError, ValueError):
+                return
+            slot = _SLOT_CHARS.sub("", _TELNET_CMD.sub(b"", line).decode(errors="replace"))[:32]
+            slot = slot or f"tamu{conn}"
+            if slot in active:
+                writer.write(f"Slot {slot} sedang dipakai.\r\n".encode())
+                slot = None
+                return
+            active.add(slot)
+            out = atw.Output(stream=_NetStream(loop, writer), mode="instant", flush_on="screen",
+                             reader=_NetReader(loop, reader, idle_timeout, seats))
+            # seed tetap (seed + nomor koneksi) hanya untuk uji; default acak per sesi
+            sess = atw.Session(save_file=os.path.join(save_dir, slot + ".json"), out=out,
+                               seed=None if seed is None else seed + conn)
+            await loop.run_in_executor(pool, contextvars.copy_context().run, _run_session, sess, seats)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            connected[0] -= 1
+            if slot is not None:
+                active.discard(slot)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    # backlog sebesar jumlah sesi supaya lonjakan koneksi tidak menggantung
+    server = await asyncio.start_server(handle, host, port, limit=2 ** 16,
+                                        backlog=max(100, max_sessions))
+    if ready is not None:
+        ready.set_result(server.sockets[0].getsockname()[1])
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        pool.shutdown(wait=False)
+
+# === LOAD GENERATOR ===
+# Klien bot membaca output sampai prompt, lalu menjawab sesuai penanda
+# menu yang terakhir muncul. Latensi aksi = kirim jawaban -> prompt berikut.
+_PROMPT_END = re.compile(r"(> |: |\.\.\.)$")
+_BOT_PLAN = ["1", "2", "2", "5", "3", "4", "7"]
+_BOT_MARKERS = [
+    ("Nama slot save", "slot"),
+    ("Muat Game", "1"),
+    ("Tekan ENTER", ""),
+    ("Tekan Enter", ""),
+    ("Masukkan nama", "slot"),
+    ("Keluar Toko", "k"),
+    ("MENU INVENTORY", "5"),
+    ("Tolak", "1"),
+    ("Kabur", "1"),
+    ("Target>", "1"),
+    ("Wilayah>", "1"),
+    ("MENU UTAMA", "menu"),
+]
+
+def _bot_reply(text, st):
+    best, reply = -1, ""
+    for marker, answer in _BOT_MARKERS:
+        pos = text.rfind(marker)
+        if pos > best:
+            best, reply = pos, answer
+    if reply == "slot":
+        return st["slot"]
+    if reply == "menu":
+        st["actions"] += 1
+        if st["actions"] > st["limit"]:
+            return "8"
+        return _BOT_PLAN[st["actions"] % len(_BOT_PLAN)]
+    return reply
+
+async def _read_prompt(reader, timeout):
+    buf = ""
+    while not _PROMPT_END.search(buf):
+        chunk = await asyncio.wait_for(reader.read(4096), timeout)
+        if not chunk:
+            return None
+        buf += chunk.decode(errors="replace").replace("\r\n", "\n")
+    return buf
+
+async def _bot(i, host, port, actions, latencies, starts, timeout):
+    reader, writer = await asyncio.open_connection(host, port)
+    st = {"slot": f"bot{i}", "actions": 0, "limit": actions}
+    sent_at, started = None, False
+    try:
+        while True:
+            text = await _read_prompt(reader, timeout)
+            if text is None:
+                return True
+            if sent_at is not None:
+                # jawaban pertama (nama slot) -> layar game pertama = mulai sesi
+                (latencies if started else starts).append(time.perf_counter() - sent_at)
+                started = True
+            writer.write((_bot_reply(text, st) + "\n").encode())
+            await writer.drain()
+            sent_at = time.perf_counter()
+    except (asyncio.TimeoutError, ConnectionError):
+        return False
+    finally:
+        writer.close()
+
+def _percentile(sorted_vals, q):
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+async def loadgen(clients=300, actions=20, host="127.0.0.1", port=4000, local=False,
+                  save_dir="saves_loadgen", timeout=30.0, workers=DEFAULT_WORKERS):
+    server_task, queue_waits = None, []
+    if local:
+        ready = asyncio.get_running_loop().create_future()
+        server_task = asyncio.create_task(serve(host, 0, save_dir, max(clients, 1), ready, seed=0,
+                                                  workers=workers, queue_waits=queue_waits))
+        port = await ready
+    latencies, starts = [], []
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    results = await asyncio.gather(*(_bot(i, host, port, actions, latencies, starts, timeout)
+                                     for i in range(clients)), return_exceptions=True)
+    wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+    if server_task is not None:
+        server_task.cancel()
+        try:
+            await server_task
+        except asyncio.CancelledError:
+            pass
+    ok = sum(1 for r in results if r is True)
+    lat, start = sorted(latencies), sorted(starts)
+    report = {
+        "clients": clients,
+        "sessions_ok": ok,
+        "actions": len(lat),
+        "wall_s": round(wall, 3),
+        "actions_per_s": round(len(lat) / wall, 1) if wall else 0.0,
+        "p50_ms": round(_percentile(lat, 0.50) * 1000, 2),
+        "p99_ms": round(_percentile(lat, 0.99) * 1000, 2),
+        "start_p50_ms": round(_percentile(start, 0.50) * 1000, 2),
+        "start_p99_ms": round(_percentile(start, 0.99) * 1000, 2),
+        "cores": os.cpu_count(),
+    }
+    if local:
+        # waktu tunggu kursi --workers di server (sudah termasuk di p50/p99 aksi)
+        waits = sorted(queue_waits)
+        report["queue_p50_ms"] = round(_percentile(waits, 0.50) * 1000, 2)
+        report["queue_p99_ms"] = round(_percentile(waits, 0.99) * 1000, 2)
+        # server dan bot satu proses: CPU yang terpakai dibagi ke sesi
+        report["cpu_s"] = round(cpu, 3)
+        report["sessions_per_core_s"] = round(ok / cpu, 1) if cpu else 0.0
+    return report
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Server multi-sesi Adventure Text World")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sp = sub.add_parser("serve", help="jalankan server telnet/TCP")
+    sp.add_argument("--host", default="127.0.0.1")
+    sp.add_argument("--port", type=int, default=4000)
+    sp.add_argument("--saves", default="saves", help="folder slot save per pemain")
+    sp.add_argument("--max-sessions", type=int, default=512,
+                    help="pemain terhubung maksimal (satu thread per pemain)")
+    sp.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                    help="sesi yang menjalankan kode game bersamaan (yang menunggu input tidak dihitung)")
+    sp.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                    help="detik tanpa input sebelum sesi diputus")
+    lp = sub.add_parser("loadgen", help="buka banyak klien bot bernaskah")
+    lp.add_argument("--host", default="127.0.0.1")
+    lp.add_argument("--port", type=int, default=4000)
+    lp.add_argument("--clients", type=int, default=300)
+    lp.add_argument("--actions", type=int, default=20, help="aksi menu utama per bot")
+    lp.add_argument("--local", action="store_true", help="jalankan server di proses yang sama")
+    lp.add_argument("--saves", default="saves_loadgen")
+    lp.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="kursi kode game server --local")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "serve":
+        print(f"Server berjalan di {args.host}:{args.port} (Ctrl+C untuk berhenti)")
+        try:
+            asyncio.run(serve(args.host, args.port, args.saves, args.max_sessions,
+                              workers=args.workers, idle_timeout=args.idle_timeout))
+        except KeyboardInterrupt:
+            pass
+    else:
+        report = asyncio.run(loadgen(args.clients, args.actions, args.host, args.port,
+                                     args.local, args.saves, workers=args.workers))
+        for k, v in report.items():
+            print(f"{k:<20} {v}")
+
+if __name__ == "__main__":
+    main()
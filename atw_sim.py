@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""Simulator pertarungan batch (headless) untuk Adventure Text World.
+
+Menjalankan ribuan pertarungan sekaligus sebagai array NumPy memakai rumus
+yang sama dengan battle() (dmg_serang / dmg_slash / dmg_magic / dmg_enemy),
+tanpa input(), slow() maupun save_game(). Dipakai untuk menyetel
+ENEMIES_BASE dan MINI_BOSSES.
+
+Sapuan wilayah (--region) meniru random_hunt(): musuh diundi dari tabel
+wilayah termasuk kawanannya dan dilawan lewat run_battle() milik game.
+
+Runner dungeon memainkan 10 lantai pertama enter_dungeon() (lantai dibuat
+dari seed seperti di game; harta, mata air, mini boss dan Dark Lord
+termasuk) lewat run_battle() milik game, jadi kawanan, spd dan summon ikut
+disimulasikan, tanpa jeda dan tanpa input, dan bisa disebar ke banyak proses.
+
+    python atw_sim.py --lvl 5 --enemy Goblin --policy slash -n 20000
+    python atw_sim.py --lvl 10 --all
+    python atw_sim.py --lvl 12 --region gua -n 50000
+    python atw_sim.py --lvl 15 --dungeon --runs 20000 --workers 4
+"""
+import argparse, json, os, time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import Adventure_Text_World as atw
+
+# Kode aksi sama dengan nomor menu di battle()
+ACT_SERANG, ACT_SLASH, ACT_MAGIC, ACT_ITEM, ACT_KABUR = 1, 2, 3, 4, 5
+
+# === SNAPSHOT PEMAIN ===
+def player_at_level(lvl, magic=None, weapon_atk=2, armor_def=1, inventory=None):
+    """Buat snapshot pemain sintetis dengan stat sesuai level_up_check()."""
+    p = atw.default_player()
+    p["lvl"] = lvl
+    p["hp"] = atw.max_hp_for(lvl)
+    p["mp"] = atw.max_mp_for(lvl)
+    p["atk"] += 4 * (lvl - 1)
+    p["def"] += 3 * (lvl - 1)
+    p["weapon"] = dict(p["weapon"], atk=weapon_atk)
+    p["armor"] = dict(p["armor"])
+    p["armor"]["def"] = armor_def
+    if magic is not None:
+        p["magic"] = dict(magic)
+    if inventory is not None:
+        p["inventory"] = list(inventory)
+    return p
+
+class BattleState:
+    """Keadaan semua pertarungan dalam satu batch (satu elemen = satu fight)."""
+
+    def __init__(self, player, enemy, n):
+        self.n = n
+        self.lvl = player["lvl"]
+        self.max_hp = atw.max_hp_for(self.lvl)
+        self.magic = player.get("magic", {"name": "Tidak ada skill", "mp_cost": 0, "power": 0})
+        self.has_magic = self.magic.get("name") != "Tidak ada skill"
+        self.turn = 0
+        self.php = np.full(n, player["hp"], dtype=np.int64)
+        self.pmp = np.full(n, player["mp"], dtype=np.int64)
+        self.ehp = np.full(n, enemy["hp"], dtype=np.int64)
+        # potion per jenis, diurutkan dari heal terbesar
+        inv = player.get("inventory", [])
+        kinds = sorted((k for k in atw.BATTLE_HEALS if k in inv), key=lambda k: -atw.BATTLE_HEALS[k])
+        self.potion_kinds = kinds
+        self.potion_heal = np.array([atw.BATTLE_HEALS[k] for k in kinds], dtype=np.int64)
+        self.potions = np.tile(np.array([inv.count(k) for k in kinds], dtype=np.int64), (n, 1))
+
+        # damage per aksi konstan sepanjang fight (atk/def tidak berubah)
+        weapon_atk = player.get("weapon", {}).get("atk", 0)
+        armor_def = player.get("armor", {}).get("def", 0)
+        self.dmg_serang = max(atw.MIN_DMG_SERANG, atw.dmg_serang(player["atk"], weapon_atk, self.lvl, enemy["def"]))
+        self.dmg_slash = max(atw.MIN_DMG_SLASH, atw.dmg_slash(player["atk"], weapon_atk, self.lvl, enemy["def"]))
+        self.dmg_magic = max(atw.MIN_DMG_MAGIC, atw.dmg_magic(player["atk"], self.lvl, self.magic.get("power", 0), enemy["def"]))
+        self.dmg_enemy = max(atw.MIN_DMG_ENEMY, atw.dmg_enemy(enemy["atk"], player["def"], armor_def))
+
+    def has_potion(self):
+        return self.potions.sum(axis=1) > 0 if self.potions.size else np.zeros(self.n, dtype=bool)
+
+# === KEBIJAKAN AKSI ===
+# Policy = callable(state) -> array kode aksi (panjang n). Aksi yang tidak
+# mungkin dijalankan (MP kurang, tanpa magic) diganti Serang.
+def policy_serang(state):
+    return np.full(state.n, ACT_SERANG)
+
+def policy_slash(state):
+    return np.where(state.pmp >= atw.SLASH_MP_COST, ACT_SLASH, ACT_SERANG)
+
+def policy_magic(state):
+    act = policy_slash(state)
+    if state.has_magic:
+        act = np.where(state.pmp >= state.magic["mp_cost"], ACT_MAGIC, act)
+    return act
+
+def policy_heal(state, threshold=0.3):
+    """Minum potion saat HP di bawah `threshold` dari HP maksimal, selain itu Slash."""
+    act = policy_slash(state)
+    low = state.php < state.max_hp * threshold
+    return np.where(low & state.has_potion(), ACT_ITEM, act)
+
+POLICIES = {
+    "serang": policy_serang,
+    "slash": policy_slash,
+    "magic": policy_magic,
+    "heal": policy_heal,
+}
+
+# === MESIN PERTARUNGAN ===
+def simulate_battles(player, enemy, policy="slash", n=10000, max_turns=500, seed=None):
+    """Jalankan `n` pertarungan player vs enemy sekaligus.
+
+    `enemy` adalah dict seperti hasil scaled_enemy(). Mengembalikan dict
+    berisi win/loss/flee/timeout rate, distribusi jumlah giliran dan sisa HP.
+    """
+    if isinstance(policy, str):
+        policy = POLICIES[policy]
+    rng = np.random.default_rng(seed)
+    st = BattleState(player, enemy, n)
+    active = np.ones(n, dtype=bool)
+    outcome = np.zeros(n, dtype=np.int8)      # 0 timeout, 1 menang, 2 kalah, 3 kabur
+    turns = np.zeros(n, dtype=np.int64)
+
+    for t in range(1, max_turns + 1):
+        if not active.any():
+            break
+        st.turn = t
+        act = np.asarray(policy(st))
+        # fallback seperti menu: aksi yang tidak valid jadi Serang
+        bad_slash = (act == ACT_SLASH) & (st.pmp < atw.SLASH_MP_COST)
+        bad_magic = (act == ACT_MAGIC) & ((not st.has_magic) | (st.pmp < st.magic.get("mp_cost", 0)))
+        act = np.where(bad_slash | bad_magic, ACT_SERANG, act)
+        turns[active] = t
+
+        m = active & (act == ACT_SERANG)
+        st.ehp[m] -= st.dmg_serang
+
+        m = active & (act == ACT_SLASH)
+        st.ehp[m] -= st.dmg_slash
+        st.pmp[m] -= atw.SLASH_MP_COST
+
+        m = active & (act == ACT_MAGIC)
+        st.ehp[m] -= st.dmg_magic
+        st.pmp[m] -= st.magic.get("mp_cost", 0)
+
+        m = active & (act == ACT_ITEM)
+        if st.potions.size and m.any():
+            # pakai potion terkuat yang masih ada; tanpa potion giliran hangus
+            avail = st.potions > 0
+            m &= avail.any(axis=1)
+            idx = np.argmax(avail, axis=1)
+            rows = np.nonzero(m)[0]
+            st.potions[rows, idx[rows]] -= 1
+            st.php[rows] = np.minimum(st.php[rows] + st.potion_heal[idx[rows]], st.max_hp)
+
+        flee = active & (act == ACT_KABUR)
+        fled = flee & (rng.random(n) < atw.FLEE_CHANCE)
+        outcome[fled] = 3
+        active &= ~fled
+
+        won = active & (st.ehp <= 0)
+        outcome[won] = 1
+        active &= ~won
+
+        # gagal kabur tidak memberi giliran ke musuh (sama dengan battle())
+        hit = active & ~flee
+        st.php[hit] -= st.dmg_enemy
+        lost = hit & (st.php <= 0)
+        outcome[lost] = 2
+        active &= ~lost
+
+    wins = outcome == 1
+    hp_left = st.php[wins]
+    return {
+        "n": n,
+        "enemy": enemy["name"],
+        "win_rate": float(wins.mean()),
+        "loss_rate": float((outcome == 2).mean()),
+        "flee_rate": float((outcome == 3).mean()),
+        "timeout_rate": float((outcome == 0).mean()),
+        "turns_mean": float(turns.mean()),
+        "turns_hist": np.bincount(turns).tolist(),
+        "hp_left_mean": float(hp_left.mean()) if hp_left.size else 0.0,
+        "hp_left_p10": float(np.percentile(hp_left, 10)) if hp_left.size else 0.0,
+        "hp_left_p50": float(np.percentile(hp_left, 50)) if hp_left.size else 0.0,
+        "outcome": outcome,
+        "turns": turns,
+        "hp_left": hp_left,
+    }
+
+def sweep(player, enemies, policy="slash", n=10000, seed=None):
+    """Simulasikan player melawan tiap musuh dasar (diskalakan ke level player)."""
+    results = []
+    for base in enemies:
+        enemy = atw.scaled_enemy(base, player["lvl"])
+        results.append(simulate_battles(player, enemy, policy=policy, n=n, seed=seed))
+    return results
+
+# === DUNGEON RUNNER ===
+# Versi non-interaktif dari enter_dungeon(): pertarungan dijalankan oleh
+# run_battle() milik game (TurnQueue berdasarkan spd, kawanan, summon,
+# respawn saat kalah) dengan policy sebagai pengganti input; pemilihan
+# musuh, reward dan RNG juga memakai kode game di Session sendiri dengan
+# output dibuang dan save hanya ditandai dirty. Run berhenti di lantai
+# tempat pemain gugur, sama seperti enter_dungeon().
+def _act_serang(p, enemy):
+    return ACT_SERANG
+
+def _act_slash(p, enemy):
+    return ACT_SLASH if p.mp >= atw.SLASH_MP_COST else ACT_SERANG
+
+def _act_magic(p, enemy):
+    if p.magic["name"] != "Tidak ada skill" and p.mp >= p.magic["mp_cost"]:
+        return ACT_MAGIC
+    return _act_slash(p, enemy)
+
+def _act_heal(p, enemy, threshold=0.3):
+    if p.hp < atw.max_hp_for(p.lvl) * threshold and atw.battle_potions(p):
+        return ACT_ITEM
+    return _act_slash(p, enemy)
+
+class ActPolicy(atw.BattlePolicy):
+    """Bungkus callable(p, enemy) -> kode aksi angka menjadi BattlePolicy game."""
+
+    def __init__(self, name, act):
+        self.name = name
+        self.act = act
+
+    def choose(self, p, enemy):
+        return str(self.act(p, enemy))
+
+# nama -> pembuat policy (dibuat baru per run: expectimax menyimpan memo)
+DUNGEON_POLICIES = {
+    name: (lambda name=name, act=act: ActPolicy(name, act))
+    for name, act in (("serang", _act_serang), ("slash", _act_slash),
+                      ("magic", _act_magic), ("heal", _act_heal))
+}
+DUNGEON_POLICIES.update(atw.AUTO_POLICIES)
+
+def make_policy(policy):
+    """Nama, BattlePolicy atau callable(p, enemy) -> BattlePolicy siap pakai."""
+    if isinstance(policy, str):
+        return DUNGEON_POLICIES[policy]()
+    if isinstance(policy, atw.BattlePolicy):
+        return policy
+    return ActPolicy(getattr(policy, "__name__", "custom"), policy)
+
+def fight(p, enemies, policy):
+    """Satu pertarungan tanpa I/O lewat run_battle(); kembalikan (hasil, [(musuh, drop)]).
+
+    Hasil "menang", "kalah" atau "kabur" seperti battle(); harus dipanggil di
+    dalam Session aktif milik `p`.
+    """
+    group = atw.BattleGroup(p, enemies)
+    return atw.run_battle(group, policy), group.defeated
+
+def _drop_names(drop):
+    if not drop:
+        return []
+    return drop if isinstance(drop, list) else [drop]
+
+def run_dungeon(player, seed=None, policy="heal"):
+    """Mainkan satu run dungeon penuh dari snapshot `player` (dict atau Player)."""
+    policy = make_policy(policy)
+    snap = player.to_dict() if isinstance(player, atw.Player) else player
+    out = atw.Output(stream=atw.NullStream(), mode="instant", flush_on="screen")
+    sess = atw.Session(player=atw.Player.from_dict(snap), out=out, seed=seed,
+                       save_file=os.devnull)
+    sess.tx["depth"] = 1   # save_game() hanya menandai dirty
+    p = sess.player
+    start_gold, start_lvl = p.gold, p.lvl
+    exp_gained, loot = 0, Counter()
+    result = {"cleared": False, "death_floor": None, "fled": 0}
+
+    with sess.active():
+        floors = atw.dungeon_floors(sess.rng.getrandbits(32))
+        for _ in range(atw.DUNGEON_FLOORS):
+            floor = next(floors)
+            outcome = "menang"
+            for room in floor.rooms:
+                if room[0] == atw.ROOM_TREASURE:
+                    atw.open_treasure(room)
+                    if room[2]:
+                        loot[room[2]] += 1
+                    continue
+                if room[0] == atw.ROOM_SPRING:
+                    atw.rest_at_spring(room)
+                    continue
+                outcome, defeated = fight(p, atw.dungeon_encounter(room, floor), policy)
+                for enemy, drop in defeated:
+                    exp_gained += enemy.exp
+                    loot.update(_drop_names(drop))
+                if outcome == "kabur":
+                    result["fled"] += 1
+                    if room[0] == atw.ROOM_BOSS:
+                        break
+                elif outcome == "kalah":
+                    break
+            if outcome == "kalah":
+                # battle() sudah me-respawn pemain; run berakhir di lantai ini
+                result["death_floor"] = floor.number
+                break
+            if floor.boss:
+                if outcome == "kabur":
+                    break
+                reward = atw.DUNGEON_CLEAR_REWARD
+                p.exp += reward["exp"]
+                p.gold += reward["gold"]
+                p.inventory.add(reward["item"])
+                exp_gained += reward["exp"]
+                loot[reward["item"]] += 1
+                atw.level_up_check()
+                result["cleared"] = True
+
+    result.update(exp=exp_gained, gold=p.gold - start_gold, levels=p.lvl - start_lvl, loot=dict(loot))
+    return result
+
+# === WILAYAH (campuran encounter) ===
+# Sama dengan random_hunt(): musuh dasar diundi dari tabel wilayah, kawanan
+# lewat pack_size(), lalu dilawan dengan run_battle() (urutan spd, summon).
+# Tiap pertarungan mulai dari snapshot pemain yang sama.
+class _TurnCounter(atw.BattlePolicy):
+    """Teruskan ke policy lain sambil menghitung giliran pemain."""
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.name = policy.name
+        self.turns = 0
+
+    def choose(self, p, enemy):
+        self.turns += 1
+        return self.policy.choose(p, enemy)
+
+    def pick_item(self, p):
+        return self.policy.pick_item(p)
+
+def region_sweep(player, region, policy="slash", n=10000, seed=None):
+    """`n` perburuan di wilayah `region` pada level player; hasil per musuh dasar."""
+    reg = atw.REGIONS[region]
+    if atw.encounter_table(reg, player["lvl"]) is None:
+        raise ValueError(f"wilayah {region} belum terbuka di Lv.{player['lvl']}")
+    snap = player.to_dict() if isinstance(player, atw.Player) else player
+    counter = _TurnCounter(make_policy(policy))
+    out = atw.Output(stream=atw.NullStream(), mode="instant", flush_on="screen")
+    sess = atw.Session(out=out, seed=seed, save_file=os.devnull)
+    sess.tx["depth"] = 1   # save_game() hanya menandai dirty
+    stats = {}
+    with sess.active():
+        for _ in range(n):
+            p = sess.player = atw.Player.from_dict(snap)
+            base = atw.encounter_base(reg, p.lvl)
+            foes = [atw.scaled_enemy(base, p.lvl) for _ in range(atw.pack_size(base))]
+            counter.turns = 0
+            outcome, _ = fight(p, foes, counter)
+            st = stats.setdefault(base["name"], {"n": 0, "foes": 0, "turns": 0, "hp_left": [],
+                                                 "menang": 0, "kalah": 0, "kabur": 0})
+            st["n"] += 1
+            st["foes"] += len(foes)
+            st["turns"] += counter.turns
+            st[outcome] += 1
+            if outcome == "menang":
+                st["hp_left"].append(p.hp)
+    results = []
+    for name, st in stats.items():
+        hp_left = st["hp_left"]
+        results.append({
+            "n": st["n"],
+            "enemy": name,
+            "share": st["n"] / n,
+            "pack_mean": st["foes"] / st["n"],
+            "win_rate": st["menang"] / st["n"],
+            "loss_rate": st["kalah"] / st["n"],
+            "flee_rate": st["kabur"] / st["n"],
+            "turns_mean": st["turns"] / st["n"],
+            "hp_left_mean": sum(hp_left) / len(hp_left) if hp_left else 0.0,
+        })
+    return results
+
+def _run_chunk(args):
+    player, seeds, policy = args
+    return [run_dungeon(player, s, policy) for s in seeds]
+
+def run_dungeons(player, runs=1000, policy="heal", seed=0, workers=None, chunk=None):
+    """Jalankan `runs` dungeon (seed, seed+1, ...) di ProcessPoolExecutor lalu agregasi."""
+    snap = player.to_dict() if isinstance(player, atw.Player) else player
+    workers = workers or os.cpu_count() or 1
+    chunk = chunk or max(1, runs // (workers * 4))
+    seeds = list(range(seed, seed + runs))
+    jobs = [(snap, seeds[i:i + chunk], policy) for i in range(0, runs, chunk)]
+    t0 = time.perf_counter()
+    if workers == 1:
+        parts = map(_run_chunk, jobs)
+        results = [r for part in parts for r in part]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [r for part in pool.map(_run_chunk, jobs) for r in part]
+    wall = time.perf_counter() - t0
+    return summarize_dungeons(results, wall, workers)
+
+def summarize_dungeons(results, wall=0.0, workers=1):
+    runs = len(results)
+    deaths = Counter(r["death_floor"] for r in results if r["death_floor"] is not None)
+    loot = Counter()
+    for r in results:
+        loot.update(r["loot"])
+    return {
+        "runs": runs,
+        "clear_rate": sum(r["cleared"] for r in results) / runs if runs else 0.0,
+        "death_floor_hist": {f: deaths[f] for f in sorted(deaths)},
+        "flee_mean": sum(r["fled"] for r in results) / runs if runs else 0.0,
+        "exp_mean": sum(r["exp"] for r in results) / runs if runs else 0.0,
+        "gold_mean": sum(r["gold"] for r in results) / runs if runs else 0.0,
+        "levels_mean": sum(r["levels"] for r in results) / runs if runs else 0.0,
+        "loot_per_run": {k: v / runs for k, v in sorted(loot.items())},
+        "workers": workers,
+        "wall_s": round(wall, 3),
+        "runs_per_s": round(runs / wall, 1) if wall else 0.0,
+    }
+
+def _summary(res):
+    return {k: v for k, v in res.items() if k not in ("outcome", "turns", "hp_left")}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Simulator pertarungan batch Adventure Text World")
+    ap.add_argument("--lvl", type=int, default=1, help="level pemain sintetis")
+    ap.add_argument("--save", help="pakai snapshot pemain dari file save (json)")
+    ap.add_argument("--enemy", help="nama musuh di ENEMIES_BASE / MINI_BOSSES")
+    ap.add_argument("--all", action="store_true", help="sapu semua musuh normal dan mini boss")
+    ap.add_argument("--region", choices=sorted(atw.REGIONS), help="undi musuh dari tabel encounter wilayah")
+    ap.add_argument("--policy", default="slash", choices=sorted(set(POLICIES) | set(DUNGEON_POLICIES)),
+                    help="greedy/rule/expectimax hanya untuk --dungeon dan --region")
+    ap.add_argument("-n", type=int, default=10000)
+    ap.add_argument("--seed", type=int)
+    ap.add_argument("--json", action="store_true", help="cetak hasil sebagai JSON")
+    ap.add_argument("--dungeon", action="store_true", help="jalankan run dungeon 10 lantai")
+    ap.add_argument("--runs", type=int, default=1000, help="jumlah run dungeon")
+    ap.add_argument("--workers", type=int, help="jumlah proses (default: semua core)")
+    args = ap.parse_args(argv)
+
+    if args.save:
+        player, _ = atw.ensure_fields(atw.read_save(args.save)[0])
+    else:
+        player = player_at_level(args.lvl, inventory=["Potion"])
+
+    if args.policy not in (DUNGEON_POLICIES if args.dungeon or args.region else POLICIES):
+        ap.error(f"policy {args.policy} tidak tersedia untuk mode ini")
+    if args.dungeon:
+        report = run_dungeons(player, args.runs, args.policy, args.seed or 0, args.workers)
+        if args.json:
+            print(json.dumps(report, indent=2))
+            return
+        for k, v in report.items():
+            print(f"{k:<18} {v}")
+        return
+
+    if args.region:
+        try:
+            results = [_summary(r) for r in region_sweep(player, args.region, args.policy, args.n, args.seed)]
+        except ValueError as e:
+            ap.error(str(e))
+        if args.json:
+            print(json.dumps(results, indent=2))
+            return
+        print(f"Lv.{player['lvl']} wilayah={args.region} policy={args.policy} n={args.n}")
+        print(f"{'Musuh':<22} {'porsi':>7} {'kawanan':>8} {'menang':>7} {'kalah':>7} {'giliran':>8} {'sisa HP':>8}")
+        for r in results:
+            print(f"{r['enemy'][:22]:<22} {r['share']:>7.1%} {r['pack_mean']:>8.2f} {r['win_rate']:>7.1%} "
+                  f"{r['loss_rate']:>7.1%} {r['turns_mean']:>8.1f} {r['hp_left_mean']:>8.1f}")
+        print(f"{'total':<22} {1:>7.0%} {sum(r['share'] * r['pack_mean'] for r in results):>8.2f} "
+              f"{sum(r['share'] * r['win_rate'] for r in results):>7.1%} "
+              f"{sum(r['share'] * r['loss_rate'] for r in results):>7.1%}")
+        return
+
+    roster = atw.ENEMIES_BASE + atw.MINI_BOSSES
+    if args.enemy:
+        roster = [e for e in roster if e["name"] == args.enemy]
+        if not roster:
+            ap.error(f"musuh tidak dikenal: {args.enemy}")
+    elif not args.all:
+        ap.error("pilih --enemy NAMA atau --all")
+
+    results = [_summary(r) for r in sweep(player, roster, args.policy, args.n, args.seed)]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"Lv.{player['lvl']} policy={args.policy} n={args.n}")
+    print(f"{'Musuh':<22} {'menang':>7} {'kalah':>7} {'giliran':>8} {'sisa HP':>8}")
+    for r in results:
+        print(f"{r['enemy'][:22]:<22} {r['win_rate']:>7.1%} {r['loss_rate']:>7.1%} "
+              f"{r['turns_mean']:>8.1f} {r['hp_left_mean']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
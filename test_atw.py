@@ -0,0 +1,440 @@
+"""Tes dasar save (codec, migrasi) dan struktur data inti.
+
+    python -m pytest -q test_atw.py
+"""
+import json, os, random
+
+import pytest
+
+import Adventure_Text_World as atw
+
+def _crafted(name="Battle Axe", seed=3):
+    """Gear hasil crafting persis seperti yang dibuat game (roll dari katalog)."""
+    with atw.Session(seed=seed).active():
+        return atw._crafted_item(name)[0]
+
+CRAFTED = _crafted()
+
+def _save_data(inventory):
+    p = atw.Player.from_dict(atw.default_player())
+    p.inventory = inventory
+    return dict(p)
+
+def _plain(data):
+    """Bentuk yang ditulis ke disk (Inventory/Equipment -> dict biasa)."""
+    return json.loads(json.dumps(data, default=atw._json_default))
+
+def _inventory(*items):
+    inv = atw.Inventory()
+    for it in items:
+        inv.add(it)
+    return inv
+
+# === CODEC SAVE ===
+@pytest.mark.parametrize("codec", atw.SAVE_CODECS)
+def test_codec_roundtrip_with_unique_items(codec):
+    inv = _inventory("Potion", "Potion", "Hi-Potion", CRAFTED, dict(CRAFTED, atk=30))
+    data = _save_data(inv)
+    blob = atw.encode_save(data, codec)
+    assert atw.save_codec_of(blob if isinstance(blob, bytes) else blob.encode()) == codec
+    back = atw.decode_save(blob)
+    assert back == _plain(data)
+    assert back["inventory"]["unique"][1]["atk"] == 30
+
+@pytest.mark.parametrize("codec", atw.SAVE_CODECS)
+def test_codec_roundtrip_empty_inventory(codec):
+    data = _save_data(atw.Inventory())
+    back = atw.decode_save(atw.encode_save(data, codec))
+    assert back == _plain(data)
+    assert back["inventory"] == {"stacks": {}, "unique": []}
+
+@pytest.mark.parametrize("codec", atw.SAVE_CODECS)
+def test_save_file_roundtrip(tmp_path, codec):
+    path = str(tmp_path / "atw.json")
+    data = _save_data(_inventory("Potion", CRAFTED))
+    atw.write_save_file(path, data, seq=7, codec=codec)
+    assert atw.save_file_codec(path) == codec
+    back, seq, records = atw.read_save(path)
+    assert (seq, records) == (7, 0)
+    assert back == _plain(data)
+
+def test_decode_rejects_unknown_binary_version():
+    blob = bytearray(atw.encode_save(_save_data(atw.Inventory()), "bin"))
+    blob[4] = 0xFF
+    with pytest.raises(atw.SaveFormatError):
+        atw.decode_save(bytes(blob))
+
+# === MIGRASI SAVE LAMA ===
+def test_migrate_unversioned_save():
+    old = {
+        "name": "Lama", "lvl": 3, "gold": 120,
+        "inventory": ["Potion", ["Potion", "Hi-Potion"], CRAFTED],
+        "quest": {"target_name": "Slime", "target": 3, "progress": 1,
+                  "reward": {"exp": 50, "gold": 20}},
+        "weapon": "Iron Sword",
+    }
+    data, changed = atw.ensure_fields(old)
+    assert changed
+    assert data["schema_version"] == atw.SCHEMA_VERSION
+    assert (data["lvl"], data["gold"], data["atk"]) == (3, 120, 10)
+    # senjata berbentuk string lama diganti senjata awal
+    assert data["weapon"]["name"] == "Wooden Sword"
+    inv = data["inventory"]
+    assert (inv.count("Potion"), inv.count("Hi-Potion"), inv.count("Battle Axe")) == (2, 1, 1)
+    assert "quest" not in data
+    [q] = data["quests"]
+    assert (q["count"], q["progress"], q["reward"]["gold"]) == (3, 1, 20)
+    assert (data["kills"], data["shop"], data["dungeon"]) == (0, None, None)
+    assert atw.Player.from_dict(data).name == "Lama"
+
+def test_migrate_current_save_is_untouched():
+    data = _plain(_save_data(_inventory("Potion")))
+    data, changed = atw.ensure_fields(data)
+    assert not changed
+    assert data["inventory"].count("Potion") == 1
+
+def test_migrate_rejects_newer_schema():
+    with pytest.raises(ValueError):
+        atw.migrate_save({"schema_version": atw.SCHEMA_VERSION + 1})
+
+# === INVENTORY ===
+def test_inventory_stacks_and_uniques():
+    inv = _inventory("Potion", "Potion", CRAFTED)
+    assert len(inv) == 3
+    assert inv.count("Potion") == 2 and "Battle Axe" in inv
+    assert inv.consumables() == ["Potion"]
+    assert not inv.remove("Potion", 3)
+    assert inv.remove("Potion", 2)
+    assert "Potion" not in inv and inv.consumables() == []
+    # item unik dihapus per instance, bukan per nama
+    assert not inv.remove(dict(CRAFTED))
+    assert inv.remove(inv.unique[0])
+    assert not inv
+
+def test_inventory_from_legacy_formats():
+    assert atw.Inventory.from_data({"Potion": 2}).count("Potion") == 2
+    inv = atw.Inventory.from_data(["Potion", ["Potion", CRAFTED]])
+    assert inv.to_data() == {"stacks": {"Potion": 2}, "unique": [CRAFTED]}
+    assert inv.ops == []
+
+# === TURN QUEUE ===
+def test_turn_queue_speed_order():
+    q = atw.TurnQueue()
+    q.add("pemain", 10)
+    q.add("musuh", 5)
+    order = []
+    for _ in range(30):
+        actor, spd = q.pop()
+        order.append(actor)
+        q.requeue(actor, spd)
+    # seri (waktu sama) dipecah urutan masuk antrian
+    assert order[:6] == ["pemain", "musuh", "pemain", "musuh", "pemain", "pemain"]
+    # spd dua kali lipat = dua aksi per aksi lawan
+    assert order.count("pemain") == 2 * order.count("musuh")
+
+def test_turn_queue_equal_speed_alternates():
+    q = atw.TurnQueue()
+    q.add("pemain", 7)
+    q.add("musuh", 7)
+    order = []
+    for _ in range(4):
+        actor, spd = q.pop()
+        order.append(actor)
+        q.requeue(actor, spd)
+    assert order == ["pemain", "musuh", "pemain", "musuh"]
+
+# === ALIAS TABLE ===
+def test_alias_table_distribution():
+    weights = {"Slime": 40, "Goblin": 30, "Wolf": 20, "Kelelawar": 10, "Naga": 0}
+    table = atw.AliasTable(list(weights), list(weights.values()))
+    n = 100000
+    picks = table.sample_many(n, random.Random(0))
+    total = sum(weights.values())
+    for name, w in weights.items():
+        assert abs(picks.count(name) / n - w / total) < 0.01
+    assert table.sample(random.Random(1)) in weights
+
+# === REKAM & REPLAY ===
+def _record(tmp_path, inputs, seed=5):
+    """Rekam sesi bernaskah (input habis = akhir sesi); kembalikan dict rekaman."""
+    answers = iter(inputs)
+
+    def reader():
+        try:
+            return next(answers)
+        except StopIteration:
+            raise EOFError from None
+
+    tmp_path = tmp_path / f"rec{len(list(tmp_path.iterdir()))}"
+    tmp_path.mkdir()
+    out = atw.Output(stream=atw.NullStream(), mode="instant", flush_on="screen", reader=reader)
+    sess = atw.Session(save_file=str(tmp_path / "atw.json"), out=out, seed=seed)
+    atw.start_recording(sess)
+    error = None
+    with sess.active():
+        try:
+            atw.main_menu()
+        except Exception as e:
+            error = e
+    path = str(tmp_path / "rec.rec.json")
+    atw.finish_recording(path, sess, error=error or EOFError())
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+# game baru, berburu sekali dengan Auto, lalu keluar lewat menu (compact_save)
+HUNT_SCRIPT = ["", "Tester", "", "2", "1", "6", "8"]
+
+def test_replay_matches_recording(tmp_path):
+    rec = _record(tmp_path, HUNT_SCRIPT)
+    assert rec["error"] is None and rec["final"]["kills"] == 1
+    ok, final = atw.replay(rec)
+    assert ok and final == rec["final"]
+
+def test_replay_crash_is_a_mismatch(tmp_path, monkeypatch):
+    rec = _record(tmp_path, HUNT_SCRIPT)
+
+    def boom(*args, **kwargs):
+        raise RuntimeError("rusak")
+
+    monkeypatch.setattr(atw, "compact_save", boom)
+    assert atw.replay(rec)[0] is False
+    # sesi asli yang memang berhenti di error yang sama tetap cocok
+    crashed = _record(tmp_path, HUNT_SCRIPT)
+    assert crashed["error"] == "RuntimeError"
+    assert atw.replay(crashed)[0] is True
+
+# === BENCHMARK ===
+def test_bench_compare_flags_errors_and_missing_cases():
+    import atw_bench
+    base = {"a": {"median_s": 1.0}, "b": {"median_s": 1.0}, "c": {"median_s": 1.0}}
+    rows = atw_bench.compare({"a": {"median_s": 1.1}, "b": {"error": "ValueError: x"}}, base)
+    assert rows == [("a", 1.1, False), ("b", None, True), ("c", None, True)]
+    # kasus di luar --only tidak dianggap hilang
+    assert atw_bench.compare({"a": {"median_s": 1.5}}, base, names=["a"]) == [("a", 1.5, True)]
+
+def test_replay_uses_recorded_auto_policy(tmp_path, monkeypatch):
+    monkeypatch.setattr(atw, "AUTO_POLICY", "greedy")
+    rec = _record(tmp_path, HUNT_SCRIPT)
+    assert rec["auto_policy"] == "greedy"
+    monkeypatch.setattr(atw, "AUTO_POLICY", "expectimax")
+    used = []
+    real = atw.AUTO_POLICIES["greedy"]
+    monkeypatch.setitem(atw.AUTO_POLICIES, "greedy", lambda: used.append(1) or real())
+    assert atw.replay(rec)[0] is True
+    assert used
+
+# === CRAFTING ===
+def test_crafted_gear_rolls_from_catalog(monkeypatch):
+    import dataclasses
+    real = atw.item_info
+    axe = dataclasses.replace(real("Battle Axe"), atk=(40, 40),
+                              bonus=atw.MappingProxyType({"hp": (9, 9), "mp": 4}))
+    monkeypatch.setattr(atw, "item_info", lambda name: axe if name == "Battle Axe" else real(name))
+    with atw.Session(seed=1).active():
+        item, msg = atw._crafted_item("Battle Axe")
+    assert item == {"name": "Battle Axe", "atk": 40, "bonus_hp_weapon": 9, "bonus_mp_weapon": 4,
+                    "desc": "Battle Axe (+40 ATK, +9 HP, +4 MP)"}
+    assert "(+40 ATK, +9 HP, +4 MP)" in msg
+
+# === SIMULATOR ===
+def test_region_sweep_fights_packs_through_run_battle():
+    pytest.importorskip("numpy")
+    import atw_sim
+    player = atw_sim.player_at_level(1, inventory=["Potion"])
+    results = atw_sim.region_sweep(player, "hutan", "slash", n=400, seed=1)
+    by_name = {r["enemy"]: r for r in results}
+    assert abs(sum(r["share"] for r in results) - 1) < 1e-9
+    # Slime kadang datang berkawanan, Goblin selalu sendiri
+    assert by_name["Slime"]["pack_mean"] > 1 and by_name["Goblin"]["pack_mean"] == 1
+
+# === SERVER ===
+def test_server_idle_players_do_not_hold_worker_seats(tmp_path):
+    import asyncio
+    import atw_server
+
+    async def screen(port, slot):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(slot.encode() + b"\n")
+        buf = b""
+        while b"Tekan ENTER" not in buf:
+            buf += await asyncio.wait_for(reader.read(4096), 5)
+        return reader, writer
+
+    async def run():
+        ready = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(atw_server.serve("127.0.0.1", 0, str(tmp_path), 4, ready,
+                                                    seed=0, workers=1, idle_timeout=5))
+        port = await ready
+        # satu kursi, dua pemain yang sama-sama diam di prompt: keduanya tetap main
+        conns = [await screen(port, "a"), await screen(port, "b")]
+        for _, writer in conns:
+            writer.close()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+
+# === JOURNAL SAVE ===
+def _session(tmp_path, seed=1):
+    out = atw.Output(stream=atw.NullStream(), mode="instant", flush_on="screen")
+    return atw.Session(save_file=str(tmp_path / "atw.json"), out=out, seed=seed)
+
+def _on_disk(path):
+    data, seq, records = atw.read_save(path)
+    return _plain(data), records
+
+def test_journal_roundtrip_and_compaction(tmp_path):
+    sess = _session(tmp_path)
+    path = sess.save_file
+    with sess.active():
+        p = sess.player
+        atw.save_game()                      # snapshot pertama
+        assert _on_disk(path) == (_plain(p), 0)
+
+        with atw.save_transaction():
+            p.gold += 25
+            p.kills += 3
+            p.inventory.add("Potion", 2)
+            p.inventory.add(dict(CRAFTED))
+            p.inventory.remove("Potion")
+            atw.save_game()
+            atw.save_game()
+        # satu transaksi = satu baris journal, snapshot tidak ditulis ulang
+        assert sess.save_stats == {"requests": 3, "writes": 2}
+        with open(atw.journal_path(path)) as f:
+            assert len(f.readlines()) == 1
+        assert _on_disk(path) == (_plain(p), 1)
+
+        with atw.save_transaction():
+            p.inventory.remove(p.inventory.unique[0])
+            p.name = "Baru"
+            atw.save_game()
+        assert _on_disk(path) == (_plain(p), 2)
+
+        atw.compact_save()
+        assert _on_disk(path) == (_plain(p), 0)
+        assert os.path.getsize(atw.journal_path(path)) == 0
+
+def test_journal_ignores_truncated_last_line(tmp_path):
+    sess = _session(tmp_path)
+    with sess.active():
+        atw.save_game()
+        with atw.save_transaction():
+            sess.player.gold += 5
+            atw.save_game()
+        expected = _plain(sess.player)
+    with open(atw.journal_path(sess.save_file), "a") as f:
+        f.write('{"seq": 99, "ops": [{"op": "add", "k": "go')   # crash di tengah penulisan
+    assert _on_disk(sess.save_file) == (expected, 1)
+
+def test_journal_compacts_after_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(atw, "JOURNAL_COMPACT_EVERY", 3)
+    sess = _session(tmp_path)
+    with sess.active():
+        atw.save_game()
+        for _ in range(3):
+            with atw.save_transaction():
+                sess.player.gold += 1
+                atw.save_game()
+        assert _on_disk(sess.save_file) == (_plain(sess.player), 0)
+
+# === QUEST LOG ===
+def test_one_kill_progresses_every_matching_quest(tmp_path):
+    sess = _session(tmp_path)
+    with sess.active():
+        p = sess.player
+        p.quests = atw.QuestLog.from_data([
+            {"title": "Bunuh 5 Slime", "target": "Slime", "count": 5, "reward": {"exp": 80, "gold": 40}},
+            {"title": "Pembasmi Lendir", "target": " slime ", "count": 2},
+            {"title": "Lama", "target_name": "Slime", "target": 1, "progress": 0},  # format save lama
+            {"title": "Bunuh 5 Goblin", "target": "Goblin", "count": 5},
+        ])
+        slime = atw.ENEMIES_BASE[0]
+        atw.handle_enemy_defeat(atw.Enemy.from_dict(slime))
+        assert [q["progress"] for q in p.quests] == [1, 1, 1, 0]
+        assert [q["title"] for q in p.quests.completed()] == ["Lama"]
+
+        atw.handle_enemy_defeat(atw.Enemy.from_dict(slime))
+        assert [q["progress"] for q in p.quests] == [2, 2, 1, 0]   # tidak melewati count
+        assert [q["title"] for q in p.quests.completed()] == ["Pembasmi Lendir", "Lama"]
+        assert p.kills == 2
+
+# === SHOP ===
+def test_shop_stock_survives_reload(tmp_path):
+    sess = _session(tmp_path)
+    with sess.active():
+        atw.save_game()
+        with atw.save_transaction():
+            items = atw.generate_shop_items()   # restock pertama ikut tersimpan
+        stock = dict(sess.player.shop["stock"])
+
+    again = _session(tmp_path, seed=2)          # seed lain: stok harus dari save, bukan diacak ulang
+    with again.active():
+        assert atw.load_game()
+        assert again.player.shop["stock"] == stock
+        assert atw.generate_shop_items() == items
+
+def test_shop_restocks_every_restock_kills(tmp_path):
+    sess = _session(tmp_path)
+    with sess.active():
+        p = sess.player
+        first = atw.shop_state()
+        p.shop["sold"] = {"Potion": 3}
+        p.kills += atw.SHOP_RESTOCK_KILLS - 1
+        assert atw.shop_state() is first
+        assert first["restocked_at"] == 0
+
+        p.kills += 1
+        st = atw.shop_state()
+        assert st is not first
+        assert st["restocked_at"] == p.kills == atw.SHOP_RESTOCK_KILLS
+        assert st["sold"] == {"Potion": 1}       # volume jual berkurang setengah
+        assert atw.shop_state() is st
+
+# === DUNGEON ===
+def test_dungeon_floor_is_deterministic():
+    for number in (1, 4, atw.DUNGEON_FLOORS, atw.DUNGEON_FLOORS + 3):
+        assert atw.dungeon_floor(777, number) == atw.dungeon_floor(777, number)
+    floors = atw.dungeon_floors(777, 4)
+    assert [next(floors) for _ in range(3)] == [atw.dungeon_floor(777, n) for n in (4, 5, 6)]
+    assert any(atw.dungeon_floor(777, n) != atw.dungeon_floor(778, n) for n in range(1, 8))
+
+def test_dungeon_resume_regenerates_saved_floor(tmp_path, monkeypatch):
+    sess = _session(tmp_path)
+    with sess.active():
+        sess.player.dungeon = {"seed": 777, "floor": 4}
+        atw.save_game()
+
+    seen = []
+    def fake_encounter(room, floor):
+        seen.append((room, floor))
+        return []
+    monkeypatch.setattr(atw, "dungeon_encounter", fake_encounter)
+    monkeypatch.setattr(atw, "battle", lambda foes: "kalah")
+
+    answers = iter(["1"])                      # 1 = lanjutkan progress tersimpan
+    again = _session(tmp_path, seed=9)
+    again.out.reader = lambda: next(answers)
+    with again.active():
+        assert atw.load_game()
+        atw.enter_dungeon()
+    expected = atw.dungeon_floor(777, 4)
+    first_fight = next(r for r in expected.rooms if r[0] not in (atw.ROOM_TREASURE, atw.ROOM_SPRING))
+    assert seen == [(first_fight, expected)]
+    assert again.player.dungeon is None       # gugur: progress run hilang
+
+# === WILAYAH ===
+def test_poll_regions_checks_file_at_most_once_per_interval(monkeypatch):
+    calls = []
+    monkeypatch.setattr(atw, "reload_regions", lambda: calls.append(1) or [])
+    monkeypatch.setitem(atw._REGION_STATE, "checked", 100.0)
+    every = atw.REGION_RELOAD_EVERY
+    for now in (100.0, 100.0 + every / 2, 100.0 + every - 0.01):
+        atw.poll_regions(now)
+    assert calls == []
+    atw.poll_regions(100.0 + every)
+    atw.poll_regions(100.0 + every + 1)
+    assert calls == [1]
+    atw.poll_regions(100.0 + 2 * every)
+    assert calls == [1, 1]